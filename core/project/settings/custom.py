@@ -3,3 +3,35 @@ Custom settings for the project, Not related to Django or third-party packages.
 """
 
 IN_DOCKER = False
+
+# Trading bot: read quotes from the terminal's websocket frames (DevTools performance log);
+# the frame schema is unverified (tested on synthetic frames only), keep off until checked on a real capture
+TRADING_BOT_CDP_FEED = False
+
+# Trading bot: open H1/M15 charts in their own tabs at login instead of switching the M5 chart
+TRADING_BOT_PINNED_CHARTS = False
+
+# Trading bot: background bid/ask sampling rate in Hz (0 = read the price once per loop only)
+TRADING_BOT_TICK_HZ = 5
+
+# Trading bot: where M5 bar volume comes from: "ticks" (sampled quote changes) or "dom" (chart volume pane)
+TRADING_BOT_VOLUME_SOURCE = "ticks"
+
+# Trading bot: persistent Chrome profile, cached driver and saved session per account (False = cold login every start)
+TRADING_BOT_WARM_START = True
+
+# Trading bot: idle pre-launched browsers kept ready for account starts (0 = launch on demand),
+# bounded by the estimated memory of all bot browsers on this host
+TRADING_BOT_BROWSER_POOL_SIZE = 0
+TRADING_BOT_BROWSER_POOL_MEMORY_MB = 3000
+
+# Trading bot: run demo accounts that share a broker login as tabs of one browser, taking turns at the driver
+TRADING_BOT_SHARED_BROWSER = False
+
+# Trading bot: lean Chrome (no images/fonts/trackers, small window, background throttling) with the
+# renderer's JS heap capped at TRADING_BOT_LEAN_JS_HEAP_MB
+TRADING_BOT_LEAN_BROWSER = False
+TRADING_BOT_LEAN_JS_HEAP_MB = 1024
+
+# Trading bot: reload the terminal page at a safe moment once its JS heap passes this many MB (0 = never)
+TRADING_BOT_HEAP_RELOAD_MB = 600
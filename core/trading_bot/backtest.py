@@ -0,0 +1,348 @@
+"""
+Vectorized backtest of the brain's signal hierarchy over historical OHLCV bars.
+
+All signal masks (VWAP bias, liquidity sweeps, volume spikes, volume profile
+extremes, DXY filter) are computed for every bar at once with numpy, using the same
+120-bar window the live loop feeds get_market_decision. Only the position walk is
+sequential, and it jumps from one entry straight to its exit with vectorized
+searches, so the cost scales with the number of trades rather than bars.
+
+Run from the project root:
+    python -m core.trading_bot.backtest gold_m5.csv --no-dxy --json result.json
+"""
+import argparse
+import json
+
+import numpy as np
+
+from . import indicators
+
+# Mirrors the live constants in brain.py / controller.py
+DEFAULT_PARAMS = {
+    'window': 120,                 # Bars passed to get_market_decision each tick
+    'liquidity_lookback': 30,
+    'volume_ma_length': 20,
+    'volume_big': 1.5,             # brain.VOLUME_BIG_RATIO
+    'vp_bins': 25,                 # brain.VOLUME_PROFILE_BINS
+    'atr_length': 14,
+    'sl_atr_premium': 1.5,         # brain.SL_ATR_PREMIUM (confidence >= 90)
+    'sl_atr': 2.0,                 # brain.SL_ATR
+    'tp_atr_premium': 3.0,         # brain.TP_ATR_PREMIUM
+    'tp_atr': 4.0,                 # brain.TP_ATR
+    'min_sl_gap': 30.0,            # controller.MIN_SL_GAP
+    'max_sl_gap': 40.0,            # controller.MAX_SL_GAP
+    'be_trigger': 1.00,            # brain.MIN_PROFIT_FOR_BE
+    'be_offset': 0.40,             # brain.BE_OFFSET
+    'trail_trigger': 3.00,         # brain.TRAIL_TRIGGER_PNL
+    'trail_distance': 1.00,        # brain.TRAIL_DISTANCE
+    'hard_stop': 9.00,             # -controller.HARD_STOP_PNL
+    'pnl_per_point': 1.0,          # $ per 1.00 price move (0.01 lot GOLD)
+    'spread': 0.0,
+    'close_on_reversal': True,
+    'require_dxy': True,
+}
+
+CONFIDENCE = {'PREMIUM': 95, 'BOOSTED': 85, 'SWEEP': 80, 'SCALP': 75}
+
+
+def _rolling_sum(x, window):
+    csum = np.concatenate(([0.0], np.nancumsum(x)))
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = csum[window:] - csum[:-window]
+    return out
+
+
+def _rolling_extreme(x, window, func):
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = func(np.lib.stride_tricks.sliding_window_view(x, window), axis=1)
+    return out
+
+
+# --- 1. SIGNAL MASKS ---
+def volume_profile_flags(high, low, close, volume, idx, window, bins, chunk=256):
+    """
+    (extreme_bullish, extreme_bearish) for the windows ending at each index in `idx`,
+    same math as brain.volume_profile_from_arrays, batched over windows.
+    """
+    bull = np.zeros(len(idx), dtype=bool)
+    bear = np.zeros(len(idx), dtype=bool)
+    if not len(idx):
+        return bull, bear
+
+    views = [np.lib.stride_tricks.sliding_window_view(a, window) for a in (high, low, close, volume)]
+    for s in range(0, len(idx), chunk):
+        rows = idx[s:s + chunk] - window + 1
+        h, lo, c, v = (view[rows] for view in views)
+
+        valid = ~(np.isnan(h) | np.isnan(lo) | np.isnan(c) | np.isnan(v))
+        highest = np.nanmax(h, axis=1)
+        lowest = np.nanmin(lo, axis=1)
+        price_range = highest - lowest
+        ok = price_range > 0
+        safe_range = np.where(ok, price_range, 1.0)
+
+        bin_size = safe_range / bins
+        levels = lowest[:, None] + np.arange(bins) * bin_size[:, None] + bin_size[:, None] / 2
+
+        in_range = (levels[:, None, :] >= lo[:, :, None]) & (levels[:, None, :] <= h[:, :, None]) & valid[:, :, None]
+        closeness = 1 - np.abs(levels[:, None, :] - c[:, :, None]) / safe_range[:, None, None]
+        vap = np.where(in_range, np.nan_to_num(v)[:, :, None] * closeness, 0.0).sum(axis=1)
+
+        ok &= vap.max(axis=1) > 0
+        order = np.argsort(-vap, axis=1, kind='stable')
+        sorted_vap = np.take_along_axis(vap, order, axis=1)
+        before = np.cumsum(sorted_vap, axis=1) - sorted_vap
+        in_va = before < (vap.sum(axis=1) * 0.7)[:, None]
+        sorted_levels = np.take_along_axis(levels, order, axis=1)
+        va_high = np.where(in_va, sorted_levels, -np.inf).max(axis=1)
+        va_low = np.where(in_va, sorted_levels, np.inf).min(axis=1)
+
+        current = c[:, -1]
+        bull[s:s + chunk] = ok & (current < va_low)
+        bear[s:s + chunk] = ok & (current > va_high)
+    return bull, bear
+
+
+def compute_signals(data, params=None):
+    """
+    Evaluates get_market_decision's rules on every bar.
+    Returns {'action': int8 (+1 BUY / -1 SELL / 0 HOLD), 'confidence', 'sl_distance', 'tp_distance'}.
+    """
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    high, low, close, volume = data['high'], data['low'], data['close'], data['volume']
+    n = len(close)
+    window = p['window']
+
+    # VWAP over the same window the live loop sees
+    vp = (high + low + close) / 3 * volume
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vwap = _rolling_sum(vp, window) / _rolling_sum(volume, window)
+    is_premium = close > vwap
+    is_discount = close < vwap
+
+    # Liquidity: brain takes the tail including the current bar
+    lookback = p['liquidity_lookback']
+    recent_high = _rolling_extreme(high, lookback, np.max)
+    recent_low = _rolling_extreme(low, lookback, np.min)
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    swept_high = (close > recent_high) & (prev_close <= recent_high)
+    swept_low = (close < recent_low) & (prev_close >= recent_low)
+
+    volume_ma = indicators.sma(volume, p['volume_ma_length'])
+    is_volume_big = volume > volume_ma * p['volume_big']
+
+    if p['require_dxy'] and data.get('dxy_change') is not None:
+        dxy_strength = data['dxy_change'] > 0
+        dxy_weakness = data['dxy_change'] < 0
+    elif p['require_dxy']:
+        dxy_strength = dxy_weakness = np.zeros(n, dtype=bool)
+    else:
+        dxy_strength = dxy_weakness = np.ones(n, dtype=bool)
+
+    warm = np.arange(n) >= window - 1
+    sweep_buy = warm & swept_low & is_discount & dxy_weakness & is_volume_big
+    sweep_sell = warm & swept_high & is_premium & dxy_strength & is_volume_big
+    scalp_buy = warm & is_discount & dxy_weakness & is_volume_big & ~swept_low
+    scalp_sell = warm & is_premium & dxy_strength & is_volume_big & ~swept_high
+
+    # Volume profile only matters where a base signal fires
+    candidates = np.flatnonzero(sweep_buy | sweep_sell | scalp_buy | scalp_sell)
+    bull_c, bear_c = volume_profile_flags(high, low, close, volume, candidates, window, p['vp_bins'])
+    extreme_bullish = np.zeros(n, dtype=bool)
+    extreme_bearish = np.zeros(n, dtype=bool)
+    extreme_bullish[candidates] = bull_c
+    extreme_bearish[candidates] = bear_c
+
+    # Hierarchy, lowest priority first so higher tiers overwrite
+    action = np.zeros(n, dtype=np.int8)
+    confidence = np.zeros(n, dtype=np.int16)
+    tiers = [
+        (scalp_sell, -1, 'SCALP'), (scalp_buy, 1, 'SCALP'),
+        (sweep_sell, -1, 'SWEEP'), (sweep_buy, 1, 'SWEEP'),
+        ((sweep_sell | scalp_sell) & extreme_bearish, -1, 'BOOSTED'),
+        ((sweep_buy | scalp_buy) & extreme_bullish, 1, 'BOOSTED'),
+        (sweep_sell & extreme_bearish, -1, 'PREMIUM'), (sweep_buy & extreme_bullish, 1, 'PREMIUM'),
+    ]
+    for mask, side, tier in tiers:
+        action[mask] = side
+        confidence[mask] = CONFIDENCE[tier]
+
+    atr = indicators.atr(high, low, close, p['atr_length'])
+    premium = confidence >= 90
+    sl_distance = atr * np.where(premium, p['sl_atr_premium'], p['sl_atr'])
+    tp_distance = atr * np.where(premium, p['tp_atr_premium'], p['tp_atr'])
+    # The controller clamps the SL gap before converting to pips
+    sl_distance = np.clip(sl_distance, p['min_sl_gap'], p['max_sl_gap'])
+
+    action[np.isnan(atr)] = 0
+    return {'action': action, 'confidence': confidence, 'sl_distance': sl_distance, 'tp_distance': tp_distance}
+
+
+# --- 2. POSITION WALK ---
+def _find_exit(data, start, side, entry, sl, tp, p, opposite, chunk=512):
+    """First bar after `start` where the trade closes. Returns (index, price, reason)."""
+    high, low, open_, close = data['high'], data['low'], data['open'], data['close']
+    n = len(close)
+    hard_stop = p['hard_stop'] / p['pnl_per_point']
+    peak = entry
+    s = start + 1
+    while s < n:
+        e = min(s + chunk, n)
+        fav = high[s:e] if side > 0 else low[s:e]
+        adverse = low[s:e] if side > 0 else high[s:e]
+
+        # Best price seen before each bar: the stop for bar j uses the move up to bar j-1
+        running = np.maximum.accumulate(side * fav)
+        best_before = np.maximum(np.concatenate(([side * peak], running[:-1])), side * entry)
+        profit = (best_before - side * entry) * p['pnl_per_point']
+
+        # Stops expressed as side * price; -inf where a rule isn't armed yet
+        break_even = np.where(profit > p['be_trigger'], side * entry + p['be_offset'], -np.inf)
+        trail = np.where(profit > p['trail_trigger'], best_before - p['trail_distance'], -np.inf)
+        stop = np.maximum(np.maximum(np.full(e - s, side * sl), break_even), trail)
+        stop = np.maximum(stop, side * entry - hard_stop)
+
+        stop_hit = side * adverse <= stop
+        tp_hit = side * fav >= side * tp
+        reversal = opposite[s:e] if p['close_on_reversal'] else np.zeros(e - s, dtype=bool)
+
+        events = stop_hit | tp_hit | reversal
+        if events.any():
+            j = int(np.argmax(events))
+            i = s + j
+            if stop_hit[j]:
+                # A gap through the stop fills at the open
+                level = side * stop[j]
+                price = min(level, open_[i]) if side > 0 else max(level, open_[i])
+                # Whichever rule set the stop names the exit
+                if stop[j] <= side * entry - hard_stop + 1e-12:
+                    reason = 'HARD_STOP'
+                elif stop[j] <= side * sl + 1e-12:
+                    reason = 'SL'
+                elif trail[j] >= stop[j] - 1e-12:
+                    reason = 'TRAIL'
+                else:
+                    reason = 'BREAK_EVEN'
+                return i, price, reason
+            if tp_hit[j]:
+                return i, tp, 'TP'
+            return i, close[i], 'REVERSAL'
+        peak = side * running[-1]
+        s = e
+    return n - 1, close[-1], 'END'
+
+
+def run_backtest(data, params=None, signals=None):
+    """
+    Replays the strategy over `data` ({'open','high','low','close','volume'[, 'time', 'dxy_change']}
+    numpy arrays). One position at a time, entries at the signal bar's close.
+    Returns {'trades': [...], 'equity': ndarray, 'stats': {...}}.
+    """
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    data = {k: (indicators.as_array(v) if v is not None and k != 'time' else v) for k, v in data.items()}
+    if signals is None:
+        signals = compute_signals(data, p)
+
+    action = signals['action']
+    close = data['close']
+    n = len(close)
+    entries = np.flatnonzero(action != 0)
+    buy_signal = action > 0
+    sell_signal = action < 0
+
+    trades = []
+    pnl_at = np.zeros(n)
+    pos = 0
+    while pos < len(entries):
+        i = int(entries[pos])
+        side = int(action[i])
+        entry = close[i] + side * p['spread'] / 2
+        sl = entry - side * signals['sl_distance'][i]
+        tp = entry + side * signals['tp_distance'][i]
+        opposite = sell_signal if side > 0 else buy_signal
+
+        exit_idx, exit_price, reason = _find_exit(data, i, side, entry, sl, tp, p, opposite)
+        pnl = side * (exit_price - entry) * p['pnl_per_point']
+        pnl_at[exit_idx] += pnl
+        trades.append({
+            'entry_index': i,
+            'exit_index': exit_idx,
+            'entry_time': data['time'][i] if data.get('time') is not None else i,
+            'exit_time': data['time'][exit_idx] if data.get('time') is not None else exit_idx,
+            'direction': 'BUY' if side > 0 else 'SELL',
+            'confidence': int(signals['confidence'][i]),
+            'entry': float(entry),
+            'exit': float(exit_price),
+            'sl': float(sl),
+            'tp': float(tp),
+            'reason': reason,
+            'pnl': float(pnl),
+        })
+        # Next trade: first signal after this one closed
+        pos = int(np.searchsorted(entries, exit_idx, side='right'))
+
+    equity = np.cumsum(pnl_at)
+    return {'trades': trades, 'equity': equity, 'stats': trade_stats(trades, equity)}
+
+
+# --- 3. STATS ---
+def trade_stats(trades, equity):
+    pnl = np.array([t['pnl'] for t in trades], dtype=float)
+    if not len(pnl):
+        return {'trades': 0, 'net_pnl': 0.0, 'win_rate': 0.0, 'profit_factor': 0.0,
+                'avg_trade': 0.0, 'max_drawdown': 0.0, 'sharpe': 0.0}
+
+    wins = pnl[pnl > 0]
+    losses = pnl[pnl < 0]
+    drawdown = np.maximum.accumulate(np.concatenate(([0.0], equity))) - np.concatenate(([0.0], equity))
+    std = pnl.std(ddof=1) if len(pnl) > 1 else 0.0
+    return {
+        'trades': int(len(pnl)),
+        'net_pnl': round(float(pnl.sum()), 2),
+        'win_rate': round(float(len(wins) / len(pnl)), 4),
+        'profit_factor': round(float(wins.sum() / -losses.sum()), 3) if len(losses) else float('inf'),
+        'avg_trade': round(float(pnl.mean()), 4),
+        'max_drawdown': round(float(drawdown.max()), 2),
+        # Per-trade Sharpe scaled by sqrt(trade count); comparable across configs on the same data
+        'sharpe': round(float(pnl.mean() / std * np.sqrt(len(pnl))), 3) if std > 0 else 0.0,
+    }
+
+
+# --- 4. DATA ---
+def load_ohlcv_csv(path, dxy_column=None):
+    """Reads a CSV with time/open/high/low/close/volume columns (any case) into float64 arrays."""
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    df.columns = [c.strip().lower() for c in df.columns]
+    data = {k: indicators.as_array(df[k]) for k in ('open', 'high', 'low', 'close')}
+    volume_column = 'volume' if 'volume' in df else 'tick_volume'
+    data['volume'] = indicators.as_array(df[volume_column]) if volume_column in df else np.full(len(df), np.nan)
+    if 'time' in df:
+        data['time'] = df['time'].to_numpy()
+    if dxy_column:
+        data['dxy_change'] = indicators.as_array(df[dxy_column.lower()])
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Backtest the brain rules over an OHLCV CSV.')
+    parser.add_argument('csv')
+    parser.add_argument('--dxy-column', help='Column with DXY change percent per bar')
+    parser.add_argument('--no-dxy', action='store_true', help='Treat the DXY filter as always satisfied')
+    parser.add_argument('--json', help='Write trades, equity and stats to this file')
+    args = parser.parse_args(argv)
+
+    data = load_ohlcv_csv(args.csv, args.dxy_column)
+    result = run_backtest(data, {'require_dxy': not args.no_dxy})
+    print(json.dumps(result['stats'], indent=2))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({**result, 'equity': result['equity'].tolist()}, f, default=str)
+
+
+if __name__ == '__main__':
+    main()
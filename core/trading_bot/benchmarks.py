@@ -0,0 +1,214 @@
+"""
+Timing suite for the decision hot path.
+
+Builds seeded synthetic gold bars (trend / chop / spike regimes), times every brain
+component at several history lengths and writes percentiles to JSON so two runs
+(e.g. before and after a change) can be compared.
+
+Run from the project root:
+    python -m core.trading_bot.benchmarks --json bench.json
+    python -m core.trading_bot.benchmarks --json bench_new.json --compare bench.json
+"""
+import argparse
+import json
+import platform
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from . import brain
+from .candle_buffer import CandleBuffer
+from .decision_cache import DECISION_CACHES
+from .indicator_engine import reset_indicator_engine
+
+SIZES = (120, 1000, 10000)
+REPEATS = 200
+PERCENTILES = (50, 90, 99)
+BAR_SECONDS = 300
+BENCH_ACCOUNT = '__bench__'
+
+# Per-regime (drift per bar, volatility per bar, volume multiplier) in dollars; M5 gold
+REGIMES = {
+    'trend': (0.35, 1.2, 1.0),
+    'chop': (0.0, 0.9, 0.8),
+    'spike': (0.0, 4.5, 3.0),
+}
+
+
+# --- 1. SYNTHETIC DATA ---
+def synthetic_candles(n, seed=0, start_price=2350.0, start_time=1_700_000_000):
+    """
+    Seeded M5 gold-like bars as a list of candle dicts. Regimes alternate in blocks of
+    50-400 bars: trends drift up or down, chop mean-reverts, spikes are short bursts
+    of wide ranges and heavy volume.
+    """
+    rng = np.random.default_rng(seed)
+    closes = np.empty(n)
+    opens = np.empty(n)
+    highs = np.empty(n)
+    lows = np.empty(n)
+    volumes = np.empty(n)
+
+    price = start_price
+    i = 0
+    while i < n:
+        regime = rng.choice(['trend', 'trend', 'chop', 'chop', 'spike'])
+        drift, vol, vol_mult = REGIMES[regime]
+        length = int(rng.integers(5, 30) if regime == 'spike' else rng.integers(50, 400))
+        direction = rng.choice([-1.0, 1.0])
+        anchor = price
+        for _ in range(min(length, n - i)):
+            step = rng.normal(0.0, vol)
+            if regime == 'trend':
+                step += direction * drift
+            elif regime == 'chop':
+                step += 0.05 * (anchor - price)
+            opens[i] = price
+            price = max(price + step, 1.0)
+            closes[i] = price
+            wick = np.abs(rng.normal(0.0, vol * 0.6, 2))
+            highs[i] = max(opens[i], price) + wick[0]
+            lows[i] = min(opens[i], price) - wick[1]
+            volumes[i] = max(rng.lognormal(6.0, 0.4) * vol_mult * (1 + abs(step) / vol), 1.0)
+            i += 1
+
+    times = start_time + np.arange(n) * BAR_SECONDS
+    return [
+        {'time': int(t), 'open': round(o, 2), 'high': round(h, 2), 'low': round(l, 2), 'close': round(c, 2), 'volume': round(v)}
+        for t, o, h, l, c, v in zip(times, opens, highs, lows, closes, volumes)
+    ]
+
+
+# --- 2. TIMING ---
+def summarize(samples):
+    ms = np.asarray(samples) * 1000.0
+    result = {f'p{p}': round(float(np.percentile(ms, p)), 4) for p in PERCENTILES}
+    result.update({
+        'mean': round(float(ms.mean()), 4),
+        'min': round(float(ms.min()), 4),
+        'max': round(float(ms.max()), 4),
+        'runs': len(ms),
+    })
+    return result
+
+
+def time_call(func, repeats, setup=None):
+    """Runs func() `repeats` times (setup() before each, untimed) and returns per-call seconds."""
+    samples = []
+    for _ in range(repeats):
+        if setup: setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _components(candles, df):
+    price = candles[-1]['close']
+    trade = SimpleNamespace(ticket_id=1, trade_type='BUY', entry_price=price - 4.0, sl=price - 6.0, tp=price + 8.0)
+    return {
+        'calculate_vwap': lambda: brain.calculate_vwap(df),
+        'detect_liquidity_levels': lambda: brain.detect_liquidity_levels(df),
+        'calculate_volume_profile': lambda: brain.calculate_volume_profile(df),
+        'calculate_ema_trend': lambda: brain.calculate_ema_trend(df),
+        'calculate_delta_flow': lambda: brain.calculate_delta_flow(df),
+        'detect_volume_spike': lambda: brain.detect_volume_spike(df),
+        'apply_emergency_break': lambda: brain.apply_emergency_break(trade, price),
+        'get_market_decision': lambda: brain.get_market_decision(price, {}, candles, []),
+    }
+
+
+def _streaming_decision(size, repeats, seed):
+    """
+    get_market_decision as the live loop calls it: one CandleBuffer per account and a
+    new bar per call, so the indicator engine runs incrementally and the cache misses.
+    """
+    feed = synthetic_candles(size + repeats, seed)
+    buf = CandleBuffer(capacity=size)
+    buf.load(feed[:size])
+    reset_indicator_engine(BENCH_ACCOUNT)
+    DECISION_CACHES.pop(BENCH_ACCOUNT, None)
+    brain.get_market_decision(feed[size - 1]['close'], {}, buf, [], account_id=BENCH_ACCOUNT)
+
+    bars = iter(feed[size:])
+
+    def setup():
+        buf.push(next(bars))
+
+    def call():
+        brain.get_market_decision(buf[-1]['close'], {}, buf, [], account_id=BENCH_ACCOUNT)
+
+    return time_call(call, repeats, setup)
+
+
+def run_benchmarks(sizes=SIZES, repeats=REPEATS, seed=0):
+    results = {}
+    for size in sizes:
+        candles = synthetic_candles(size, seed)
+        df = pd.DataFrame(candles)
+        timings = {}
+        for name, func in _components(candles, df).items():
+            func()  # warm-up
+            timings[name] = summarize(time_call(func, repeats))
+        timings['get_market_decision_streaming'] = summarize(_streaming_decision(size, repeats, seed))
+        results[str(size)] = timings
+
+    return {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'seed': seed,
+            'repeats': repeats,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, key='p50'):
+    """Rows of (size, component, baseline, current, ratio) for components present in both runs."""
+    rows = []
+    for size, timings in current['results'].items():
+        old = baseline['results'].get(size, {})
+        for name, stats in timings.items():
+            if name not in old: continue
+            before, after = old[name][key], stats[key]
+            rows.append((size, name, before, after, round(after / before, 2) if before else None))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the brain components on synthetic gold bars.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--compare', help='Earlier results file to compare p50 timings against')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.repeats, args.seed)
+
+    for size, timings in report['results'].items():
+        print(f"\n{size} bars")
+        for name, stats in timings.items():
+            print(f"  {name:<32} p50 {stats['p50']:>9.3f} ms   p90 {stats['p90']:>9.3f} ms   p99 {stats['p99']:>9.3f} ms")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nvs {args.compare} (p50, ratio > 1 is slower)")
+        for size, name, before, after, ratio in compare(report, baseline):
+            print(f"  {size:>6} {name:<32} {before:>9.3f} -> {after:>9.3f} ms  x{ratio}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,43 +1,54 @@
-import json
-import os
+import logging
+import time
 import pandas as pd
-import pandas_ta as ta
 import numpy as np
 
 from core.trading_bot.personas.analyst import AnalystPersona
 from core.trading_bot.personas.reckless import RecklessPersona
 from core.trading_bot.personas.wise import WisePersona
 from .council import COUNCIL_MEMBERS 
+from . import indicators
+from .candle_buffer import CandleBuffer
+from .indicator_engine import get_indicator_engine
+from .decision_cache import get_decision_cache, market_fingerprint
+from .profiling import get_component_timer, log_sampled
+from .dxy_state import get_dxy
+
+logger = logging.getLogger(__name__)
 
 # --- CONFIGURATION ---
 MIN_PROFIT_FOR_BE = 1.00 
 STRATEGIC_BREAK_PNL = 5.00 
+BE_OFFSET = 0.40
+TRAIL_TRIGGER_PNL = 3.00
+TRAIL_DISTANCE = 1.00
+VOLUME_BIG_RATIO = 1.5
+VOLUME_HUGE_RATIO = 2.5
+DELTA_BIG_RATIO = 1.8
+SL_ATR_PREMIUM = 1.5  # confidence >= 90
+SL_ATR = 2.0
+TP_ATR_PREMIUM = 3.0
+TP_ATR = 4.0
+VOLUME_PROFILE_BINS = 25
+VOLUME_PROFILE_LOOKBACK = None  # None = every bar passed in
+TICK_SIZE = 0.01  # Price resolution used by the decision cache fingerprint
 
 reckless = RecklessPersona()
 analyst = AnalystPersona()
 wise = WisePersona()
 
+def _log_component(name, value):
+    log_sampled(logger, logging.DEBUG, name, "%s: %s", name.upper(), value)
+
+
+def _log_component_error(name, error):
+    log_sampled(logger, logging.WARNING, name + '_error', "%s error: %s", name.upper(), error)
+
+
 # Helper function to read DXY data
 def get_dxy_from_file():
-    """Read latest DXY data from the background service"""
-    dxy_file = 'dxy_latest.json'
-    default_data = {
-        'price': 100.0,
-        'change_percent': 0,
-        'strength': False,
-        'weakness': False,
-        'timestamp': None
-    }
-    
-    try:
-        if os.path.exists(dxy_file):
-            with open(dxy_file, 'r') as f:
-                data = json.load(f)
-                return data
-    except Exception as e:
-        print(f"Error reading DXY file: {e}")
-    
-    return default_data
+    """Latest DXY from the shared feed (in-process service or its file), with 'age' and 'stale'"""
+    return get_dxy()
 
 # --- 1. VWAP CALCULATION ---
 def calculate_vwap(df):
@@ -46,14 +57,8 @@ def calculate_vwap(df):
         if df is None or len(df) < 10:
             return None
             
-        df['typical'] = (df['high'] + df['low'] + df['close']) / 3
-        df['vp'] = df['typical'] * df['volume']
-        
-        df['cum_vp'] = df['vp'].cumsum()
-        df['cum_vol'] = df['volume'].cumsum()
-        
-        vwap = df['cum_vp'] / df['cum_vol']
-        latest_vwap = vwap.iloc[-1]
+        vwap = indicators.vwap(df['high'], df['low'], df['close'], df['volume'])
+        latest_vwap = vwap[-1]
         
         if pd.isna(latest_vwap):
             return None
@@ -98,7 +103,7 @@ def detect_liquidity_levels(df, lookback=30):
             'is_discount': is_discount
         }
     except Exception as e:
-        print(f"Liquidity error: {e}")
+        log_sampled(logger, logging.WARNING, 'liquidity_error', "Liquidity error: %s", e)
         return {
             'high': None, 'low': None, 
             'swept_high': False, 'swept_low': False,
@@ -106,245 +111,271 @@ def detect_liquidity_levels(df, lookback=30):
         }
 
 # --- 3. VOLUME PROFILE (POC, Value Area) ---
-def calculate_volume_profile(df, bins=25):
+def calculate_volume_profile(df, bins=None, lookback=None):
     """Calculate Point of Control and Value Area"""
     try:
+        bins = bins or VOLUME_PROFILE_BINS
+        lookback = lookback or VOLUME_PROFILE_LOOKBACK
+        if lookback:
+            df = df.tail(lookback)
         if len(df) < 20:
             return {'poc': None, 'va_high': None, 'va_low': None}
         
-        highest = df['high'].max()
-        lowest = df['low'].min()
-        
-        # Check if highest/lowest are valid
-        if pd.isna(highest) or pd.isna(lowest):
-            return {'poc': None, 'va_high': None, 'va_low': None, 
-                    'extreme_bullish': False, 'extreme_bearish': False, 'inside_va': False}
-        
-        price_range = highest - lowest
-        if price_range <= 0:
-            return {'poc': None, 'va_high': None, 'va_low': None, 
-                    'extreme_bullish': False, 'extreme_bearish': False, 'inside_va': False}
-        
-        bin_size = price_range / bins
-        
-        # Initialize price levels and volume at price
-        price_levels = []
-        volume_at_price = []
-        
-        for i in range(bins):
-            price_levels.append(lowest + (i * bin_size) + (bin_size / 2))
-            volume_at_price.append(0.0)
-        
-        # Accumulate volume
-        for i in range(len(df)):
-            bar_low = df['low'].iloc[i]
-            bar_high = df['high'].iloc[i]
-            bar_volume = df['volume'].iloc[i]
-            bar_close = df['close'].iloc[i]
-            
-            # Skip if any value is invalid
-            if pd.isna(bar_low) or pd.isna(bar_high) or pd.isna(bar_volume) or pd.isna(bar_close):
-                continue
-                
-            for j in range(bins):
-                if price_levels[j] >= bar_low and price_levels[j] <= bar_high:
-                    closeness = 1 - abs(price_levels[j] - bar_close) / price_range
-                    volume_at_price[j] += bar_volume * closeness
-        
-        # Find POC (highest volume)
-        max_volume = max(volume_at_price)
-        if max_volume <= 0:
-            return {'poc': None, 'va_high': None, 'va_low': None, 
-                    'extreme_bullish': False, 'extreme_bearish': False, 'inside_va': False}
-        
-        poc_idx = volume_at_price.index(max_volume)
-        poc = price_levels[poc_idx]
-        
-        # Find Value Area (70% of volume)
-        total_volume = sum(volume_at_price)
-        if total_volume <= 0:
-            return {'poc': poc, 'va_high': poc, 'va_low': poc, 
-                    'extreme_bullish': False, 'extreme_bearish': False, 'inside_va': True}
-        
-        target_volume = total_volume * 0.7
-        
-        # Sort by volume
-        sorted_indices = sorted(range(bins), key=lambda i: volume_at_price[i], reverse=True)
-        
-        # Build value area
-        va_volume = 0
-        va_levels = []
-        for idx in sorted_indices:
-            if va_volume >= target_volume:
-                break
-            va_volume += volume_at_price[idx]
-            va_levels.append(price_levels[idx])
-        
-        va_high = max(va_levels) if va_levels else poc
-        va_low = min(va_levels) if va_levels else poc
-        
-        current_price = float(df['close'].iloc[-1])
-        
-        # SAFE COMPARISONS with null checks
-        extreme_bullish = va_low is not None and current_price < va_low
-        extreme_bearish = va_high is not None and current_price > va_high
-        inside_va = (va_low is not None and va_high is not None and 
-                     va_low <= current_price <= va_high)
-        
-        return {
-            'poc': poc,
-            'va_high': va_high,
-            'va_low': va_low,
-            'extreme_bullish': extreme_bullish,
-            'extreme_bearish': extreme_bearish,
-            'inside_va': inside_va
-        }
+        return volume_profile_from_arrays(
+            df['high'].to_numpy(dtype=float),
+            df['low'].to_numpy(dtype=float),
+            df['close'].to_numpy(dtype=float),
+            df['volume'].to_numpy(dtype=float),
+            bins
+        )
     except Exception as e:
-        print(f"Volume profile error: {e}")
+        log_sampled(logger, logging.WARNING, 'volume_profile_error', "Volume profile error: %s", e)
         return {'poc': None, 'va_high': None, 'va_low': None, 
                 'extreme_bullish': False, 'extreme_bearish': False, 'inside_va': False}
 
+def volume_profile_from_arrays(high, low, close, volume, bins=25):
+    """
+    Vectorized volume profile: every bar spreads its volume over the bin centers
+    inside its high/low range, weighted by closeness to its close.
+    """
+    empty = {'poc': None, 'va_high': None, 'va_low': None, 
+             'extreme_bullish': False, 'extreme_bearish': False, 'inside_va': False}
+    
+    highest = np.nanmax(high)
+    lowest = np.nanmin(low)
+    
+    # Check if highest/lowest are valid
+    if np.isnan(highest) or np.isnan(lowest):
+        return empty
+    
+    price_range = highest - lowest
+    if price_range <= 0:
+        return empty
+    
+    bin_size = price_range / bins
+    price_levels = lowest + np.arange(bins) * bin_size + bin_size / 2
+    
+    # Skip bars with any invalid value
+    valid = ~(np.isnan(high) | np.isnan(low) | np.isnan(close) | np.isnan(volume))
+    bar_high, bar_low = high[valid], low[valid]
+    bar_close, bar_volume = close[valid], volume[valid]
+    
+    # (bars x bins) in-range mask and closeness weights, summed over bars.
+    # Chunked so thousands of bars at 200 bins stay within a few MB.
+    volume_at_price = np.zeros(bins)
+    chunk = max(1, 200_000 // bins)
+    for start in range(0, len(bar_close), chunk):
+        stop = start + chunk
+        in_range = (price_levels >= bar_low[start:stop, None]) & (price_levels <= bar_high[start:stop, None])
+        closeness = 1 - np.abs(price_levels - bar_close[start:stop, None]) / price_range
+        volume_at_price += np.where(in_range, bar_volume[start:stop, None] * closeness, 0.0).sum(axis=0)
+    
+    # Find POC (highest volume)
+    poc_idx = int(np.argmax(volume_at_price))
+    if volume_at_price[poc_idx] <= 0:
+        return empty
+    poc = float(price_levels[poc_idx])
+    
+    # Find Value Area (70% of volume): bins by volume, taken while the running total is below target
+    target_volume = volume_at_price.sum() * 0.7
+    sorted_indices = np.argsort(-volume_at_price, kind='stable')
+    running = np.cumsum(volume_at_price[sorted_indices])
+    before = np.concatenate(([0.0], running[:-1]))
+    va_levels = price_levels[sorted_indices[before < target_volume]]
+    
+    va_high = float(va_levels.max()) if len(va_levels) else poc
+    va_low = float(va_levels.min()) if len(va_levels) else poc
+    
+    current_price = float(close[-1])
+    
+    return {
+        'poc': poc,
+        'va_high': va_high,
+        'va_low': va_low,
+        'extreme_bullish': current_price < va_low,
+        'extreme_bearish': current_price > va_high,
+        'inside_va': va_low <= current_price <= va_high
+    }
+
 
 # --- 4. EMA TREND FILTER ---
 def calculate_ema_trend(df, fast=9, slow=21):
     """Calculate EMA trend alignment"""
     try:
-        df['ema_fast'] = ta.ema(df['close'], length=fast)
-        df['ema_slow'] = ta.ema(df['close'], length=slow)
-        
-        # EMA alignment
-        bullish_alignment = df['ema_fast'].iloc[-1] > df['ema_slow'].iloc[-1]
-        bearish_alignment = df['ema_fast'].iloc[-1] < df['ema_slow'].iloc[-1]
-        
-        # Price position relative to EMAs
-        current_price = df['close'].iloc[-1]
-        price_above_ema = current_price > df['ema_fast'].iloc[-1] and current_price > df['ema_slow'].iloc[-1]
-        price_below_ema = current_price < df['ema_fast'].iloc[-1] and current_price < df['ema_slow'].iloc[-1]
-        
-        return {
-            'bullish': bullish_alignment,
-            'bearish': bearish_alignment,
-            'price_above': price_above_ema,
-            'price_below': price_below_ema,
-            'fast': df['ema_fast'].iloc[-1],
-            'slow': df['ema_slow'].iloc[-1]
-        }
+        ema_fast = indicators.ema(df['close'], fast)[-1]
+        ema_slow = indicators.ema(df['close'], slow)[-1]
+        return ema_trend_from_values(float(df['close'].iloc[-1]), ema_fast, ema_slow)
     except:
         return {'bullish': False, 'bearish': False, 'price_above': False, 'price_below': False}
 
+def ema_trend_from_values(current_price, ema_fast, ema_slow):
+    """EMA alignment from the latest fast/slow values"""
+    return {
+        'bullish': ema_fast > ema_slow,
+        'bearish': ema_fast < ema_slow,
+        'price_above': current_price > ema_fast and current_price > ema_slow,
+        'price_below': current_price < ema_fast and current_price < ema_slow,
+        'fast': ema_fast,
+        'slow': ema_slow
+    }
+
 # --- 5. DELTA FLOW (Buying/Selling Pressure) ---
 def calculate_delta_flow(df):
     """Calculate delta and momentum"""
     try:
-        # Delta = ((close - open) / (high - low)) * volume
-        df['delta'] = ((df['close'] - df['open']) / (df['high'] - df['low']).replace(0, 1)) * df['volume']
-        df['delta_ma'] = ta.sma(df['delta'].abs(), length=20)
-        
-        # Delta status
-        latest_delta = df['delta'].iloc[-1]
-        latest_delta_ma = df['delta_ma'].iloc[-1]
-        
-        if latest_delta > latest_delta_ma:
-            delta_status = "STRONG_BUYING"
-        elif latest_delta < -latest_delta_ma:
-            delta_status = "STRONG_SELLING"
-        else:
-            delta_status = "NEUTRAL"
+        # Delta = ((close - open) / (high - low)) * volume, or up - down ticks where the volume feed has them
+        delta = indicators.delta_flow(df['open'], df['high'], df['low'], df['close'], df['volume'])
+        if 'delta' in df:
+            tick_delta = indicators.as_array(df['delta'])
+            delta = np.where(np.isnan(tick_delta), delta, tick_delta)
+        delta_ma = indicators.sma(np.abs(delta), 20)
         
         # Delta momentum
         if len(df) >= 5:
-            delta_momentum = df['delta'].iloc[-1] - df['delta'].iloc[-5]
+            delta_momentum = delta[-1] - delta[-5]
         else:
             delta_momentum = 0
         
-        return {
-            'delta': latest_delta,
-            'delta_ma': latest_delta_ma,
-            'status': delta_status,
-            'momentum': delta_momentum,
-            'is_big_buying': latest_delta > latest_delta_ma * 1.8,
-            'is_big_selling': latest_delta < -latest_delta_ma * 1.8
-        }
+        return delta_flow_from_values(delta[-1], delta_ma[-1], delta_momentum)
     except:
         return {'status': 'NEUTRAL', 'momentum': 0, 'is_big_buying': False, 'is_big_selling': False}
 
+def delta_flow_from_values(latest_delta, latest_delta_ma, delta_momentum):
+    """Delta status from the latest delta, its moving average and momentum"""
+    if latest_delta > latest_delta_ma:
+        delta_status = "STRONG_BUYING"
+    elif latest_delta < -latest_delta_ma:
+        delta_status = "STRONG_SELLING"
+    else:
+        delta_status = "NEUTRAL"
+    
+    return {
+        'delta': latest_delta,
+        'delta_ma': latest_delta_ma,
+        'status': delta_status,
+        'momentum': delta_momentum,
+        'is_big_buying': latest_delta > latest_delta_ma * DELTA_BIG_RATIO,
+        'is_big_selling': latest_delta < -latest_delta_ma * DELTA_BIG_RATIO
+    }
+
 # --- 6. VOLUME SPIKE DETECTION ---
 def detect_volume_spike(df):
     """Check if current volume is significantly above average"""
     try:
-        df['volume_ma'] = ta.sma(df['volume'], length=20)
-        latest_volume = df['volume'].iloc[-1]
-        latest_ma = df['volume_ma'].iloc[-1]
-        
-        return {
-            'is_big': latest_volume > latest_ma * 1.5,
-            'is_huge': latest_volume > latest_ma * 2.5,
-            'ratio': latest_volume / latest_ma if latest_ma > 0 else 1
-        }
+        volume = indicators.as_array(df['volume'])
+        return volume_spike_from_values(volume[-1], indicators.sma(volume, 20)[-1])
     except:
         return {'is_big': False, 'is_huge': False, 'ratio': 1}
 
+def volume_spike_from_values(latest_volume, latest_ma):
+    """Volume spike flags from the latest volume and its moving average"""
+    return {
+        'is_big': latest_volume > latest_ma * VOLUME_BIG_RATIO,
+        'is_huge': latest_volume > latest_ma * VOLUME_HUGE_RATIO,
+        'ratio': latest_volume / latest_ma if latest_ma > 0 else 1
+    }
+
 # --- 7. MAIN DECISION ENGINE ---
-def get_market_decision(price, context, candles, history, active_trade=None):
+def get_market_decision(price, context, candles, history, active_trade=None, account_id=None):
     try:
         if not candles or len(candles) < 30:
             return {'action': 'HOLD', 'sl': 0, 'tp': 0, 'reason': 'Insufficient data'}
 
-        # Create DataFrame
-        df = pd.DataFrame(candles)
-        df.columns = [c.lower() for c in df.columns]
+        timer = get_component_timer(account_id)
+        decision_start = time.perf_counter()
         
         # Get DXY data
-        dxy = get_dxy_from_file()
+        with timer.measure('dxy_read'):
+            dxy = get_dxy_from_file()
+        
+        # Same bars, same price tick, same DXY print and same trade -> same decision
+        cache = get_decision_cache(account_id) if account_id is not None else None
+        if cache is not None:
+            fingerprint = market_fingerprint(price, candles, dxy, active_trade, TICK_SIZE)
+            cached = cache.get(fingerprint)
+            if cached is not None:
+                return cached
+        
+        # Create DataFrame (columnar buffers are already lowercase numpy arrays)
+        if isinstance(candles, CandleBuffer):
+            df = pd.DataFrame(candles.view(), copy=False)
+        else:
+            df = pd.DataFrame(candles)
+            df.columns = [c.lower() for c in df.columns]
+        
+        # Rolling indicators (O(1) per tick) when the caller identifies the account
+        with timer.measure('indicators'):
+            ind = get_indicator_engine(account_id).update(candles) if account_id is not None else None
         
-        # --- CALCULATE ALL COMPONENTS WITH DEBUG ---
+        # --- CALCULATE ALL COMPONENTS (timed, sampled debug logging) ---
         try:
-            vwap = calculate_vwap(df)
-            print(f"DEBUG - VWAP: {vwap}")
+            with timer.measure('vwap'):
+                vwap = ind['vwap'] if ind else calculate_vwap(df)
+            _log_component('vwap', vwap)
         except Exception as e:
-            print(f"DEBUG - VWAP ERROR: {e}")
+            _log_component_error('vwap', e)
             vwap = None
         
         try:
-            liquidity = detect_liquidity_levels(df, lookback=30)
-            print(f"DEBUG - LIQUIDITY: {liquidity}")
+            with timer.measure('liquidity'):
+                liquidity = detect_liquidity_levels(df, lookback=30)
+            _log_component('liquidity', liquidity)
         except Exception as e:
-            print(f"DEBUG - LIQUIDITY ERROR: {e}")
+            _log_component_error('liquidity', e)
             liquidity = {'high': None, 'low': None, 'swept_high': False, 'swept_low': False, 'is_premium': False, 'is_discount': False}
         
         try:
-            volume_profile = calculate_volume_profile(df)
-            print(f"DEBUG - VOLUME PROFILE: {volume_profile}")
+            with timer.measure('volume_profile'):
+                volume_profile = calculate_volume_profile(df)
+            _log_component('volume_profile', volume_profile)
         except Exception as e:
-            print(f"DEBUG - VOLUME PROFILE ERROR: {e}")
+            _log_component_error('volume_profile', e)
             volume_profile = {'poc': None, 'va_high': None, 'va_low': None, 'extreme_bullish': False, 'extreme_bearish': False, 'inside_va': False}
         
         try:
-            ema_trend = calculate_ema_trend(df)
-            print(f"DEBUG - EMA TREND: {ema_trend}")
+            with timer.measure('ema'):
+                if ind:
+                    ema_trend = ema_trend_from_values(ind['close'], ind['ema_fast'], ind['ema_slow'])
+                else:
+                    ema_trend = calculate_ema_trend(df)
+            _log_component('ema', ema_trend)
         except Exception as e:
-            print(f"DEBUG - EMA ERROR: {e}")
+            _log_component_error('ema', e)
             ema_trend = {'bullish': False, 'bearish': False, 'price_above': False, 'price_below': False}
         
         try:
-            delta = calculate_delta_flow(df)
-            print(f"DEBUG - DELTA: {delta}")
+            with timer.measure('delta'):
+                if ind and pd.isna(ind['delta']):
+                    raise ValueError("no volume for delta")
+                if ind:
+                    delta = delta_flow_from_values(ind['delta'], ind['delta_ma'], ind['delta_momentum'])
+                else:
+                    delta = calculate_delta_flow(df)
+            _log_component('delta', delta)
         except Exception as e:
-            print(f"DEBUG - DELTA ERROR: {e}")
+            _log_component_error('delta', e)
             delta = {'status': 'NEUTRAL', 'momentum': 0, 'is_big_buying': False, 'is_big_selling': False}
         
         try:
-            volume_spike = detect_volume_spike(df)
-            print(f"DEBUG - VOLUME SPIKE: {volume_spike}")
+            with timer.measure('volume_spike'):
+                if ind:
+                    volume_spike = volume_spike_from_values(ind['volume'], ind['volume_ma'])
+                else:
+                    volume_spike = detect_volume_spike(df)
+            _log_component('volume_spike', volume_spike)
         except Exception as e:
-            print(f"DEBUG - VOLUME SPIKE ERROR: {e}")
+            _log_component_error('volume_spike', e)
             volume_spike = {'is_big': False, 'is_huge': False, 'ratio': 1}
         
         try:
-            atr = ta.atr(df['high'], df['low'], df['close'], length=14).iloc[-1] if len(df) > 14 else 1.0
-            print(f"DEBUG - ATR: {atr}")
+            with timer.measure('atr'):
+                if ind:
+                    atr = ind['atr'] if len(df) > 14 else 1.0
+                else:
+                    atr = indicators.atr(df['high'], df['low'], df['close'], 14)[-1] if len(df) > 14 else 1.0
+            _log_component('atr', atr)
         except Exception as e:
-            print(f"DEBUG - ATR ERROR: {e}")
+            _log_component_error('atr', e)
             atr = 1.0
         
         # --- DETERMINE SIGNAL TYPES ---
@@ -354,9 +385,10 @@ def get_market_decision(price, context, candles, history, active_trade=None):
         is_premium = vwap is not None and price_f > vwap
         is_discount = vwap is not None and price_f < vwap
         
-        # DXY conditions
-        dxy_weakness = dxy.get('weakness', False)
-        dxy_strength = dxy.get('strength', False)
+        # DXY conditions (a stale quote confirms nothing)
+        dxy_live = not dxy.get('stale', False)
+        dxy_weakness = dxy_live and dxy.get('weakness', False)
+        dxy_strength = dxy_live and dxy.get('strength', False)
         
         # Volume conditions
         is_volume_big = volume_spike['is_big']
@@ -421,8 +453,8 @@ def get_market_decision(price, context, candles, history, active_trade=None):
         
         # --- DYNAMIC SL/TP ---
         if action != "HOLD":
-            sl_distance = atr * (1.5 if confidence >= 90 else 2.0)
-            tp_distance = atr * (3.0 if confidence >= 90 else 4.0)
+            sl_distance = atr * (SL_ATR_PREMIUM if confidence >= 90 else SL_ATR)
+            tp_distance = atr * (TP_ATR_PREMIUM if confidence >= 90 else TP_ATR)
             
             if action == "BUY":
                 sl = round(price_f - sl_distance, 2)
@@ -435,7 +467,7 @@ def get_market_decision(price, context, candles, history, active_trade=None):
             tp = 0.0
         
         reason_parts = [
-            f"DXY: {'+' if dxy_strength else '-' if dxy_weakness else '='}{dxy.get('change_percent', 0):.1f}%",
+            f"DXY: {'+' if dxy_strength else '-' if dxy_weakness else '='}{dxy.get('change_percent', 0):.1f}%" + ("" if dxy_live else " (stale)"),
             f"VP: {'Below' if price_f < volume_profile.get('poc', price_f) else 'Above'}",
             f"Vol: {volume_spike['ratio']:.1f}x"
         ]
@@ -457,6 +489,9 @@ def get_market_decision(price, context, candles, history, active_trade=None):
             }
         }
         
+        if cache is not None:
+            cache.store(fingerprint, final)
+        timer.record('decision', time.perf_counter() - decision_start)
         return final
         
     except Exception as e:
@@ -495,21 +530,21 @@ def apply_emergency_break(trade, current_price):
         new_sl = None
 
         # Break even after $1.00 profit
-        if profit > 1.00:
+        if profit > MIN_PROFIT_FOR_BE:
             if trade.trade_type == "BUY":
-                desired_sl = entry_p + 0.40
+                desired_sl = entry_p + BE_OFFSET
                 if sl_p < desired_sl: new_sl = desired_sl
             else:
-                desired_sl = entry_p - 0.40
+                desired_sl = entry_p - BE_OFFSET
                 if sl_p == 0 or sl_p > desired_sl: new_sl = desired_sl
 
         # Trailing after $3.00 profit
-        if profit > 3.00:
+        if profit > TRAIL_TRIGGER_PNL:
             if trade.trade_type == "BUY":
-                trail_sl = current_p - 1.00
+                trail_sl = current_p - TRAIL_DISTANCE
                 if trail_sl > sl_p: new_sl = trail_sl
             else:
-                trail_sl = current_p + 1.00
+                trail_sl = current_p + TRAIL_DISTANCE
                 if sl_p == 0 or trail_sl < sl_p: new_sl = trail_sl
 
         if new_sl:
@@ -0,0 +1,174 @@
+"""
+Pool of pre-launched, idle Chrome instances.
+
+Account starts take a browser that is already running instead of paying the cold boot;
+a background thread health-checks the idle ones, replaces dead ones and refills the
+pool up to its size while the estimated memory of all browsers fits the budget.
+Browsers that served an account are quit on release (cookies and storage of one
+account must never reach another) and a fresh one is launched in their place.
+"""
+import threading
+import time
+from collections import deque
+
+from .process_stats import children_map, driver_rss_mb
+
+HEALTH_CHECK_SECONDS = 30
+DEFAULT_BROWSER_MB = 450  # Estimate until a launched browser has been measured
+
+# GLOBAL STATE
+BROWSER_POOLS = {}  # { "default": BrowserPool }
+
+
+def is_alive(driver):
+    try:
+        _ = driver.title
+        return True
+    except Exception:
+        return False
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+class BrowserPool:
+    """
+    `launcher()` returns a new driver; `in_use()` returns the drivers currently serving
+    accounts (they count against the memory budget too).
+    """
+
+    def __init__(self, launcher, size, memory_budget_mb, in_use=None, log_func=None):
+        self.launcher = launcher
+        self.size = size
+        self.memory_budget_mb = memory_budget_mb
+        self.in_use = in_use or (lambda: [])
+        self.log = log_func or (lambda msg: None)
+        self.idle = deque()
+        self.lock = threading.Lock()
+        self.launching = 0
+        self.browser_mb = DEFAULT_BROWSER_MB
+        self.launched = 0
+        self.replaced = 0
+        self.handed_out = 0
+        self.running = False
+        self.thread = None
+
+    # --- MEMORY ---
+    def memory_mb(self):
+        """Measured RSS of every pooled and in-use browser (estimated where /proc isn't available)."""
+        children = children_map()
+        total = 0.0
+        with self.lock:
+            drivers = list(self.idle)
+        for driver in drivers + list(self.in_use()):
+            measured = driver_rss_mb(driver, children)
+            if measured:
+                self.browser_mb = self.browser_mb * 0.8 + measured * 0.2
+            total += measured if measured else self.browser_mb
+        return total
+
+    def _has_room(self):
+        return self.memory_mb() + (self.launching + 1) * self.browser_mb <= self.memory_budget_mb
+
+    # --- MAINTENANCE ---
+    def check_idle(self):
+        """Drops idle browsers that stopped answering; returns how many were dropped."""
+        with self.lock:
+            drivers = list(self.idle)
+        dead = [d for d in drivers if not is_alive(d)]
+        if dead:
+            with self.lock:
+                for driver in dead:
+                    if driver in self.idle: self.idle.remove(driver)
+            for driver in dead:
+                _quit(driver)
+            self.replaced += len(dead)
+            self.log(f"🩺 Browser pool: replacing {len(dead)} dead idle browser(s)")
+        return len(dead)
+
+    def fill(self):
+        """Launches browsers until the pool is full or the memory budget is reached."""
+        while self.running:
+            with self.lock:
+                missing = self.size - len(self.idle) - self.launching
+                if missing <= 0:
+                    return
+            if not self._has_room():
+                return
+            with self.lock:
+                self.launching += 1
+            try:
+                driver = self.launcher()
+            except Exception as e:
+                self.log(f"⚠️ Browser pool launch failed: {e}")
+                return
+            finally:
+                with self.lock:
+                    self.launching -= 1
+            with self.lock:
+                self.idle.append(driver)
+            self.launched += 1
+
+    def _loop(self):
+        while self.running:
+            try:
+                self.check_idle()
+                self.fill()
+            except Exception as e:
+                self.log(f"⚠️ Browser pool error: {e}")
+            next_check = time.time() + HEALTH_CHECK_SECONDS
+            while self.running and time.time() < next_check:
+                time.sleep(0.1)
+
+    def start(self):
+        if self.running:
+            return self.thread
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def stop(self):
+        """Stops maintenance and quits the idle browsers (in-use ones are left alone)."""
+        self.running = False
+        with self.lock:
+            drivers, self.idle = list(self.idle), deque()
+        for driver in drivers:
+            _quit(driver)
+
+    # --- HAND-OUT ---
+    def acquire(self):
+        """A live idle browser, or None when the pool is empty."""
+        while True:
+            with self.lock:
+                if not self.idle:
+                    return None
+                driver = self.idle.popleft()
+            if is_alive(driver):
+                self.handed_out += 1
+                return driver
+            _quit(driver)
+            self.replaced += 1
+
+    def release(self, driver):
+        """Takes a browser back from an account: it is recycled (quit) and the pool refills in the background."""
+        _quit(driver)
+
+    def stats(self):
+        with self.lock:
+            idle, launching = len(self.idle), self.launching
+        return {
+            'size': self.size,
+            'idle': idle,
+            'launching': launching,
+            'memory_mb': round(self.memory_mb(), 1),
+            'memory_budget_mb': self.memory_budget_mb,
+            'browser_mb': round(self.browser_mb, 1),
+            'launched': self.launched,
+            'replaced': self.replaced,
+            'handed_out': self.handed_out,
+        }
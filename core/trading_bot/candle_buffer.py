@@ -0,0 +1,152 @@
+import numpy as np
+
+FIELDS = ('time', 'open', 'high', 'low', 'close', 'volume', 'delta')  # delta: up - down ticks, when known
+TIME, OPEN, HIGH, LOW, CLOSE, VOLUME, DELTA = range(len(FIELDS))
+
+DEFAULT_CAPACITY = 500
+
+# GLOBAL STATE
+CANDLE_BUFFERS = {}  # { account_id: { "h1": CandleBuffer, "m15": CandleBuffer, "m5": CandleBuffer } }
+
+
+def get_candle_buffer(account_id, timeframe, capacity=DEFAULT_CAPACITY):
+    """Returns the account's buffer for a timeframe label ("m5", "m15", "h1", ...)."""
+    buffers = CANDLE_BUFFERS.setdefault(account_id, {})
+    buf = buffers.get(timeframe)
+    if buf is None:
+        buf = CandleBuffer(capacity)
+        buffers[timeframe] = buf
+    return buf
+
+
+class CandleBuffer:
+    """
+    Fixed-capacity columnar ring buffer of OHLCV bars.
+
+    Every value is written twice (at pos and pos + capacity), so the newest n bars
+    are always one contiguous slice and view() never copies. Memory is fixed at
+    2 * capacity * 7 float64 values regardless of how long the bot runs.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._data = np.full((len(FIELDS), 2 * capacity), np.nan)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, idx):
+        """Single bar as a dict (negative indices allowed)."""
+        if idx < 0: idx += self._size
+        if not 0 <= idx < self._size:
+            raise IndexError('candle index out of range')
+        col = self._data[:, self._start + idx]
+        return {f: float(col[i]) for i, f in enumerate(FIELDS)}
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+    # --- WRITES ---
+    def _write(self, pos, candle):
+        for i, f in enumerate(FIELDS):
+            val = candle.get(f)
+            val = np.nan if val is None else float(val)
+            self._data[i, pos] = val
+            self._data[i, pos + self.capacity] = val
+
+    def append(self, candle):
+        if self._size < self.capacity:
+            pos = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            pos = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._write(pos, candle)
+
+    def update_last(self, candle):
+        if not self._size:
+            return self.append(candle)
+        self._write((self._start + self._size - 1) % self.capacity, candle)
+
+    def push(self, candle):
+        """Appends a new bar, or updates the forming bar when it has the same open time."""
+        if self._size and candle.get('time') is not None and float(candle['time']) == self.last_time:
+            self.update_last(candle)
+        else:
+            self.append(candle)
+
+    def load(self, candles):
+        """Replaces the contents with a list of candle dicts (oldest -> newest)."""
+        candles = candles[-self.capacity:]
+        n = len(candles)
+        self.clear()
+        if not n: return
+        block = np.array([[c.get(f, np.nan) for f in FIELDS] for c in candles], dtype=float).T
+        self._data[:, :n] = block
+        self._data[:, self.capacity:self.capacity + n] = block
+        self._size = n
+
+    def merge(self, candles):
+        """
+        Overwrites the bars from candles[0]'s open time onwards with `candles` and keeps
+        everything older (e.g. backfilled history under a locally rebuilt tail).
+        """
+        if not candles: return
+        if not self._size:
+            return self.load(candles)
+        times = self.column('time')
+        keep = int(np.searchsorted(times, float(candles[0]['time']), side='left'))
+        self._size = keep
+        for candle in candles:
+            self.append(candle)
+
+    def write_column(self, field, values):
+        """Overwrites one field of the newest len(values) bars (e.g. volume attached after a scrape)."""
+        n = min(len(values), self._size)
+        if not n: return
+        end = self._start + self._size
+        pos = np.arange(end - n, end) % self.capacity
+        row = FIELDS.index(field)
+        values = np.asarray(values[len(values) - n:], dtype=float)
+        self._data[row, pos] = values
+        self._data[row, pos + self.capacity] = values
+
+    # --- READS ---
+    @property
+    def last_time(self):
+        return float(self._data[TIME, self._start + self._size - 1]) if self._size else None
+
+    def last(self):
+        return self[-1] if self._size else None
+
+    def column(self, field, n=None):
+        """Zero-copy view of one field for the newest n bars (all if n is None)."""
+        n = self._size if n is None else min(n, self._size)
+        end = self._start + self._size
+        return self._data[FIELDS.index(field), end - n:end]
+
+    def view(self, n=None):
+        """Zero-copy { field: ndarray } views of the newest n bars."""
+        return {f: self.column(f, n) for f in FIELDS}
+
+    def to_dicts(self, n=None):
+        """List of candle dicts for JSON payloads; missing volume/delta are left out."""
+        cols = {f: self.column(f, n).tolist() for f in FIELDS}
+        out = []
+        for i in range(len(cols['time'])):
+            candle = {
+                'time': int(cols['time'][i]),
+                'open': cols['open'][i],
+                'high': cols['high'][i],
+                'low': cols['low'][i],
+                'close': cols['close'][i],
+            }
+            if cols['volume'][i] == cols['volume'][i]:
+                candle['volume'] = cols['volume'][i]
+            if cols['delta'][i] == cols['delta'][i]:
+                candle['delta'] = cols['delta'][i]
+            out.append(candle)
+        return out
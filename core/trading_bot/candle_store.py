@@ -0,0 +1,134 @@
+import numpy as np
+
+from .candle_buffer import get_candle_buffer, DEFAULT_CAPACITY
+from .resampler import TIMEFRAMES
+
+MAX_SHIFT = 5  # Bars the clock may run ahead of / behind the chart before we stop re-stamping
+
+# GLOBAL STATE
+CANDLE_STORES = {}  # { account_id: { "m5": CandleStore, "h1": CandleStore, ... } }
+
+
+def get_candle_store(account_id, timeframe, capacity=DEFAULT_CAPACITY):
+    """The account's store for a timeframe label; it writes into the matching get_candle_buffer()."""
+    stores = CANDLE_STORES.setdefault(account_id, {})
+    store = stores.get(timeframe)
+    if store is None:
+        store = CandleStore(get_candle_buffer(account_id, timeframe, capacity), timeframe)
+        stores[timeframe] = store
+    return store
+
+
+def _ohlc(candle):
+    # Scrapes carry no volume, so bars are matched on prices alone
+    return (candle['open'], candle['high'], candle['low'], candle['close'])
+
+
+class CandleStore:
+    """
+    Keeps one continuous, boundary-aligned series per timeframe across scrapes.
+
+    Each scrape is a window of the newest bars stamped from the wall clock. merge()
+    lines it up against the bars already stored, rewrites the overlap (forming bar,
+    rescaled chart), appends new bars and reports what changed as events:
+        ('bar_closed', candle)  a bar that will not change any more
+        ('gap', {'from': ms, 'to': ms, 'missing': n})  bars that were never seen
+    """
+
+    def __init__(self, buffer, timeframe):
+        self.buffer = buffer
+        self.timeframe = timeframe
+        self.interval_ms = TIMEFRAMES[timeframe] * 1000
+        self.listeners = []
+        self.closed_count = 0
+        self.gap_count = 0
+        self.calibrated = False  # Holds axis-calibrated (price) bars rather than pixel ones
+
+    def subscribe(self, callback):
+        """callback(event) is called for every event merge() returns."""
+        self.listeners.append(callback)
+
+    def _clock_offset(self, candles):
+        """
+        Correction (ms) for the scrape's clock-based times. Around a bar boundary the clock
+        can move on before the chart draws the new bar (or the other way round); the last
+        two closed bars we hold are found in the scrape and its times are shifted to match.
+        0 when they can't be found (e.g. the chart rescaled and every pixel price moved).
+        """
+        buf = self.buffer
+        if len(buf) < 3 or len(candles) < 3:
+            return 0
+        anchor_prev, anchor = buf[-3], buf[-2]
+        key_prev, key = _ohlc(anchor_prev), _ohlc(anchor)
+        for idx in range(len(candles) - 1, 0, -1):
+            if _ohlc(candles[idx]) == key and _ohlc(candles[idx - 1]) == key_prev:
+                offset = int(anchor['time']) - int(candles[idx]['time'])
+                if abs(offset) <= MAX_SHIFT * self.interval_ms:
+                    return offset
+                return 0
+        return 0
+
+    def _carry_volume(self, candles):
+        """Copies volume/delta attached earlier (volume_feed) onto scraped bars that have none."""
+        buf = self.buffer
+        times = buf.column('time')
+        stamps = np.array([c['time'] for c in candles], dtype=float)
+        pos = np.minimum(np.searchsorted(times, stamps), len(times) - 1)
+        match = times[pos] == stamps
+        if not match.any():
+            return candles
+        volume, delta = buf.column('volume'), buf.column('delta')
+        out = []
+        for candle, i, hit in zip(candles, pos.tolist(), match.tolist()):
+            if hit and 'volume' not in candle:
+                candle = dict(candle, volume=float(volume[i]), delta=float(delta[i]))
+            out.append(candle)
+        return out
+
+    def merge(self, candles, calibrated=None):
+        """
+        Merges a scrape (oldest -> newest, aligned open times) and returns the events.
+        `calibrated` overrides the scrape's own flag (bars resampled from another store).
+        """
+        if not candles:
+            return []
+        buf = self.buffer
+        if calibrated is None:
+            calibrated = candles[-1].get('calibrated')  # Still None: the scrape doesn't say (cache)
+        if len(buf) and calibrated is not None and calibrated != self.calibrated:
+            if self.calibrated:
+                return []  # Pixel-space scrape: never mixed into price bars
+            buf.clear()  # First calibrated scrape: the pixel-space history is useless next to it
+        if not len(buf):
+            buf.load(candles)
+            if calibrated is not None: self.calibrated = calibrated
+            return []
+
+        offset = self._clock_offset(candles)
+        if offset:
+            candles = [dict(c, time=c['time'] + offset) for c in candles]
+        candles = self._carry_volume(candles)
+
+        forming_time = buf.last_time
+        events = []
+        first_time = candles[0]['time']
+        if first_time > forming_time + self.interval_ms:
+            missing = int((first_time - forming_time) // self.interval_ms) - 1
+            events.append(('gap', {'from': int(forming_time) + self.interval_ms, 'to': int(first_time), 'missing': missing}))
+            self.gap_count += 1
+
+        buf.merge(candles)
+
+        # Every stored bar between the old forming bar and the new one has closed
+        if buf.last_time > forming_time:
+            times = buf.column('time')
+            for idx in range(len(times) - 1):
+                if times[idx] >= forming_time:
+                    bar = buf.to_dicts(len(times) - idx)[0]
+                    events.append(('bar_closed', bar))
+                    self.closed_count += 1
+
+        for event in events:
+            for callback in self.listeners:
+                callback(event)
+        return events
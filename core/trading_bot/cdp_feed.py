@@ -0,0 +1,320 @@
+"""
+Tick feed decoded from the terminal's own websocket traffic.
+
+ChromeDriver's performance log carries the DevTools Network.webSocketFrameReceived
+events of the page, so one get_log('performance') call per tick returns every quote
+frame received since the last call, without touching the DOM. The driver needs the
+'goog:loggingPrefs' {'performance': 'ALL'} capability (see enable_performance_log).
+
+Frames can be recorded to JSONL and replayed offline:
+    python -m core.trading_bot.cdp_feed replay core/trading_bot/fixtures/cdp_frames_synthetic.jsonl
+
+The bundled fixture is synthetic: frames hand-built in the shapes QUOTE_KEYS and
+POSITION_KEYS guess at, not a capture of the live terminal. The decoding is unverified
+against the real schema, so TRADING_BOT_CDP_FEED stays off until a recorded session has
+been replayed through it.
+"""
+import argparse
+import json
+import time
+from collections import deque
+
+FRAME_EVENT = 'Network.webSocketFrameReceived'
+SYMBOLS = ('XAUUSD', 'GOLD')
+TICK_HISTORY = 5000
+FRESH_SECONDS = 2.0  # A tick older than this no longer overrides the DOM price
+POSITION_FRESH_SECONDS = 15.0  # Same for a position update vs the DOM positions table
+MAX_DEPTH = 6
+
+# Key names tried, in order, when decoding JSON frames (the terminal's schema isn't documented)
+QUOTE_KEYS = {
+    'symbol': ('symbol', 'symbolName', 'instrument', 's'),
+    'bid': ('bid', 'Bid', 'b'),
+    'ask': ('ask', 'Ask', 'a'),
+}
+POSITION_KEYS = {
+    'ticket': ('positionId', 'ticket', 'position_id'),
+    'symbol': ('symbol', 'symbolName', 'instrument'),
+    'direction': ('tradeSide', 'side', 'direction', 'type'),
+    'volume': ('volume', 'lots', 'quantity'),
+    'open_price': ('openPrice', 'entryPrice', 'price'),
+    'profit': ('profit', 'pnl', 'netProfit'),
+    'status': ('status', 'positionStatus', 'state'),
+}
+CLOSED_STATUSES = ('closed', 'position_status_closed', 'close')
+
+# GLOBAL STATE
+CDP_FEEDS = {}  # { account_id: CDPPriceFeed }
+
+
+def enable_performance_log(options):
+    """Adds the capability that makes ChromeDriver keep DevTools Network events for get_log()."""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+
+def get_cdp_feed(account_id, driver):
+    feed = CDP_FEEDS.get(account_id)
+    if feed is None or feed.driver is not driver:
+        feed = CDPPriceFeed(driver)
+        CDP_FEEDS[account_id] = feed
+    return feed
+
+
+# --- 1. DECODING ---
+def _pick(obj, keys):
+    for k in keys:
+        if k in obj:
+            return obj[k]
+    return None
+
+
+def _walk(obj, depth=0):
+    """Every dict inside a decoded frame (batches and envelopes nest them)."""
+    if depth > MAX_DEPTH:
+        return
+    if isinstance(obj, dict):
+        yield obj
+        for value in obj.values():
+            if isinstance(value, (dict, list)):
+                yield from _walk(value, depth + 1)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from _walk(value, depth + 1)
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _ticket_key(ticket):
+    # The DOM shows "#48213377", the websocket 48213377
+    return str(ticket or '').strip().lstrip('#')
+
+
+def decode_json_frame(payload, symbols=SYMBOLS):
+    """Quote and position messages in a JSON text frame as ('quote'|'position', dict) events."""
+    try:
+        data = json.loads(payload)
+    except (TypeError, ValueError):
+        return []
+
+    events = []
+    for obj in _walk(data):
+        symbol = _pick(obj, QUOTE_KEYS['symbol'])
+        if symbols and str(symbol).upper() not in symbols:
+            continue
+
+        ticket = _pick(obj, POSITION_KEYS['ticket'])
+        if ticket is not None:
+            status = str(_pick(obj, POSITION_KEYS['status']) or '').lower()
+            events.append(('position', {
+                'ticket_id': _ticket_key(ticket),
+                'symbol': symbol,
+                'direction': str(_pick(obj, POSITION_KEYS['direction']) or '').upper(),
+                'volume': _pick(obj, POSITION_KEYS['volume']),
+                'open_price': _float(_pick(obj, POSITION_KEYS['open_price'])),
+                'profit': _float(_pick(obj, POSITION_KEYS['profit'])),
+                'closed': status in CLOSED_STATUSES,
+            }))
+            continue
+
+        bid = _float(_pick(obj, QUOTE_KEYS['bid']))
+        ask = _float(_pick(obj, QUOTE_KEYS['ask']))
+        if bid is not None or ask is not None:
+            events.append(('quote', {'symbol': symbol, 'bid': bid, 'ask': ask}))
+    return events
+
+
+# Binary (opcode 2) frames arrive base64-encoded; add a decoder here if the terminal switches to them
+FRAME_DECODERS = {1: decode_json_frame}
+
+
+def frames_from_log(entries):
+    """(timestamp_seconds, opcode, payload) for every received websocket frame in performance-log entries."""
+    for entry in entries:
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, TypeError, ValueError):
+            continue
+        if message.get('method') != FRAME_EVENT:
+            continue
+        response = message.get('params', {}).get('response', {})
+        yield entry.get('timestamp', 0) / 1000.0, response.get('opcode', 1), response.get('payloadData', '')
+
+
+# --- 2. FEED ---
+class CDPPriceFeed:
+    """
+    Decodes websocket frames from the driver's performance log into a tick stream
+    (timestamp, bid, ask) and the latest known positions.
+    """
+
+    def __init__(self, driver, symbols=SYMBOLS, history=TICK_HISTORY, record_path=None):
+        self.driver = driver
+        self.symbols = symbols
+        self.ticks = deque(maxlen=history)
+        self.bid = None
+        self.ask = None
+        self.last_tick_at = None
+        self.positions = {}
+        self.position_events = []
+        self.closed = set()  # Tickets the websocket reported closed (the DOM table may lag behind)
+        self.frames = 0
+        self.record_path = record_path
+        self.available = True
+
+    def poll(self):
+        """Reads new log entries; returns the number of ticks added."""
+        try:
+            entries = self.driver.get_log('performance')
+        except Exception:
+            # Driver started without the performance log capability
+            self.available = False
+            return 0
+
+        if self.record_path and entries:
+            with open(self.record_path, 'a') as f:
+                for entry in entries:
+                    if FRAME_EVENT in entry.get('message', ''):
+                        f.write(json.dumps(entry) + '\n')
+
+        added = 0
+        self.position_events = []
+        for ts, opcode, payload in frames_from_log(entries):
+            decoder = FRAME_DECODERS.get(opcode)
+            if decoder is None:
+                continue
+            self.frames += 1
+            for kind, data in decoder(payload, self.symbols):
+                if kind == 'quote':
+                    self.bid = data['bid'] if data['bid'] is not None else self.bid
+                    self.ask = data['ask'] if data['ask'] is not None else self.ask
+                    self.ticks.append((ts, self.bid, self.ask))
+                    self.last_tick_at = ts
+                    added += 1
+                else:
+                    self._apply_position(dict(data, seen_at=ts))
+        return added
+
+    def _apply_position(self, data):
+        ticket = data['ticket_id']
+        if data['closed']:
+            self.closed.add(ticket)
+            if self.positions.pop(ticket, None) is not None:
+                self.position_events.append(('close', ticket))
+        else:
+            self.closed.discard(ticket)
+            if ticket not in self.positions:
+                self.position_events.append(('open', ticket))
+            self.positions[ticket] = data
+
+    def position_changes(self):
+        """Open/close events from the last poll, like PageBridge.position_changes()."""
+        return list(self.position_events)
+
+    def _trade(self, data):
+        """A decoded position in the shape of scraper._position_from_cells (text fields)."""
+        direction = data['direction']
+        if direction.startswith('B'): direction = 'BUY'
+        elif direction.startswith('S'): direction = 'SELL'
+        current = self.ask if direction == 'SELL' else self.bid  # The side it would close at
+        open_price = f"{data['open_price']:.2f}" if data['open_price'] is not None else "0.00"
+        trade = {
+            "ticket_id": data['ticket_id'],
+            "symbol": str(data['symbol'] or ''),
+            "direction": direction,
+            "volume": str(data['volume'] or ''),
+            "open_price": open_price,
+            "current_price": f"{current:.2f}" if current is not None else "",
+            "entry": open_price,
+        }
+        if data['profit'] is not None: trade["profit"] = f"{data['profit']:.2f}"
+        return trade
+
+    def is_fresh(self, now=None):
+        if self.last_tick_at is None:
+            return False
+        return (now or time.time()) - self.last_tick_at <= FRESH_SECONDS
+
+    def apply(self, snapshot, now=None):
+        """
+        Overrides the DOM bid/ask of a TerminalSnapshot with the latest websocket quote when
+        it is fresh, and merges the websocket positions into snapshot.positions: closed
+        tickets are dropped, recently updated ones override (or add to) the DOM rows.
+        Anything stale leaves the DOM values in place.
+        """
+        now = now or time.time()
+        if self.is_fresh(now):
+            if self.bid is not None: snapshot.bid = self.bid
+            if self.ask is not None: snapshot.ask = self.ask
+
+        if self.positions or self.closed:
+            merged = {_ticket_key(p.get('ticket_id')): p for p in snapshot.positions}
+            for ticket in self.closed:
+                merged.pop(ticket, None)
+            for ticket, data in self.positions.items():
+                if now - data['seen_at'] <= POSITION_FRESH_SECONDS:
+                    row = merged.get(ticket, {})
+                    merged[ticket] = dict(row, **self._trade(data))
+                    merged[ticket]['ticket_id'] = row.get('ticket_id', ticket)  # Keep the DOM's "#..." form
+            snapshot.positions = list(merged.values())
+        return snapshot
+
+
+class ReplayDriver:
+    """
+    Stands in for a WebDriver: get_log('performance') returns recorded entries in
+    batches, so a CDPPriceFeed can be run offline against a capture.
+    """
+
+    def __init__(self, path, batch=50):
+        with open(path) as f:
+            self.entries = [json.loads(line) for line in f if line.strip()]
+        self.batch = batch
+        self.pos = 0
+
+    @property
+    def exhausted(self):
+        return self.pos >= len(self.entries)
+
+    def get_log(self, kind):
+        out = self.entries[self.pos:self.pos + self.batch]
+        self.pos += len(out)
+        return out
+
+
+def replay(path, symbols=SYMBOLS):
+    driver = ReplayDriver(path)
+    feed = CDPPriceFeed(driver, symbols)
+    events = []
+    while not driver.exhausted:
+        feed.poll()
+        events.extend(feed.position_events)
+    return feed, events
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay recorded websocket frames through the CDP price feed.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    rp = sub.add_parser('replay')
+    rp.add_argument('path')
+    rp.add_argument('--symbols', nargs='*', default=list(SYMBOLS))
+    args = parser.parse_args(argv)
+
+    feed, events = replay(args.path, tuple(s.upper() for s in args.symbols))
+    print(f"frames: {feed.frames}  ticks: {len(feed.ticks)}  last bid/ask: {feed.bid}/{feed.ask}")
+    if feed.ticks:
+        spreads = [a - b for _, b, a in feed.ticks if a is not None and b is not None]
+        span = feed.ticks[-1][0] - feed.ticks[0][0]
+        print(f"span: {span:.1f}s  avg spread: {sum(spreads) / max(len(spreads), 1):.3f}")
+    for op, ticket in events:
+        print(f"position {op}: {ticket}")
+    print(f"open positions: {sorted(feed.positions)}")
+
+
+if __name__ == '__main__':
+    main()
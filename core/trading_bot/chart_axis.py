@@ -0,0 +1,111 @@
+import numpy as np
+
+PIXEL_OFFSET = 10000  # parseBar() reports prices as PIXEL_OFFSET - y
+AXIS_SELECTOR = ".price-axis, .highcharts-yaxis-labels, g.y-axis"
+PRICE_DIGITS = 2
+MAX_RESIDUAL = 0.25  # Worst label misfit allowed, as a fraction of the label spacing
+OHLC = ('open', 'high', 'low', 'close')
+
+# GLOBAL STATE
+AXIS_CALIBRATIONS = {}  # { "<account_id>:<chart>": AxisCalibration }  (chart: "main", or "h1"/"m15" for pinned tabs)
+
+# readAxis(container, knownKey): a cheap layout key (axis box, first label position, label
+# text) and, only when it differs from knownKey, every price label mapped into the
+# candle container's SVG coordinates as [y, price] pairs.
+AXIS_JS = """
+const AXIS_SELECTOR = '%(selector)s';
+
+function readAxis(container, knownKey) {
+    const axis = document.querySelector(AXIS_SELECTOR);
+    if (!axis || !container) return null;
+    const labels = axis.querySelectorAll('text, tspan, span');
+    const box = axis.getBoundingClientRect();
+    const first = labels.length ? labels[0].getBoundingClientRect().top : 0;
+    const key = [box.left, box.top, box.width, box.height, first, axis.textContent].join('|');
+    if (key === knownKey) return {key: key};
+
+    const points = [];
+    const ctm = container.getScreenCTM ? container.getScreenCTM() : null;
+    if (!ctm) return {key: key, points: points};
+    const inv = ctm.inverse();
+    for (const el of labels) {
+        if (el.children.length) continue;
+        const price = parseFloat(el.textContent.replace(/[^0-9.\\-]/g, ''));
+        const r = el.getBoundingClientRect();
+        if (!isFinite(price) || !r.height) continue;
+        const x = r.left + r.width / 2, y = r.top + r.height / 2;
+        points.push([inv.b * x + inv.d * y + inv.f, price]);
+    }
+    return {key: key, points: points};
+}
+""" % {'selector': AXIS_SELECTOR}
+
+
+def get_axis_calibration(account_id, chart='main'):
+    """The calibration of one account's chart; accounts never share a transform (each runs its own thread)."""
+    key = f"{account_id}:{chart}"
+    calibration = AXIS_CALIBRATIONS.get(key)
+    if calibration is None:
+        calibration = AxisCalibration()
+        AXIS_CALIBRATIONS[key] = calibration
+    return calibration
+
+
+class AxisCalibration:
+    """
+    Linear pixel -> price transform of one chart, fitted from its price-axis labels.
+
+    The page only sends labels when the layout key changes (resize, zoom, scroll or
+    rescale), so a tick costs one string compare. Bars are passed through in pixel space
+    while there is no valid fit (flagged calibrated=False, which CandleStore skips once it
+    holds prices). A layout change whose refit fails invalidates the old fit: it described
+    a different zoom/scale.
+    """
+
+    def __init__(self):
+        self.key = None
+        self.slope = None
+        self.intercept = None
+        self.fits = 0
+
+    @property
+    def valid(self):
+        return self.slope is not None
+
+    def update(self, axis):
+        """Applies a readAxis() result; returns True while a transform is available."""
+        if not axis or axis.get('key') == self.key:
+            return self.valid
+
+        # The layout changed: the old fit no longer applies, whether or not this read fits
+        self.key = None
+        self.slope = self.intercept = None
+
+        points = np.array(axis.get('points') or [], dtype=float).reshape(-1, 2)
+        if len(points) < 2:
+            return False
+        pixels = PIXEL_OFFSET - points[:, 0]
+        prices = points[:, 1]
+        if np.ptp(pixels) <= 0 or np.ptp(prices) <= 0:
+            return False
+
+        slope, intercept = np.polyfit(pixels, prices, 1)
+        spacing = np.ptp(prices) / (len(prices) - 1)
+        if slope <= 0 or np.abs(slope * pixels + intercept - prices).max() > MAX_RESIDUAL * spacing:
+            # Labels we picked up aren't an evenly spaced price scale (volume pane, crosshair, ...)
+            return False
+
+        # The key is only kept for a good fit, so a bad read is retried on the next tick
+        self.key = axis['key']
+        self.slope = float(slope)
+        self.intercept = float(intercept)
+        self.fits += 1
+        return True
+
+    def apply(self, raw_bars):
+        """Converts parseBar() dicts to prices in one vectorized step (unchanged while uncalibrated)."""
+        if not self.valid or not raw_bars:
+            return raw_bars
+        values = np.array([[bar[f] for f in OHLC] for bar in raw_bars], dtype=float)
+        prices = np.round(values * self.slope + self.intercept, PRICE_DIGITS)
+        return [dict(zip(OHLC, row)) for row in prices.tolist()]
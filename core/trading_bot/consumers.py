@@ -2,9 +2,11 @@ import json
 import traceback
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from rest_framework import serializers
 from .models import TradingAccount
 from .serializers import TradingAccountDetailSerializer
 from core.trading_bot.scraper import MTF_CONTEXT # <--- IMPORTED GLOBAL CONTEXT
+from core.trading_bot.profiling import set_timings_in_updates
 
 class BotConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -64,6 +66,28 @@ class BotConsumer(AsyncWebsocketConsumer):
                     "message": f"🔄 Strategy Switched to: {new_mode}"
                 }))
 
+            # 2. Component timings in analysis_update (per account)
+            elif data.get('type') == 'toggle_timings':
+                # The controller looks accounts up by their integer pk
+                try:
+                    account_id = int(data['account_id'])
+                except (KeyError, TypeError, ValueError):
+                    await self.send(text_data=json.dumps({
+                        "type": "log",
+                        "message": "⚠️ toggle_timings needs a numeric account_id"
+                    }))
+                    return
+                # Same parsing as the REST toggle: "false" / "0" mean off, junk is rejected
+                try:
+                    enabled = serializers.BooleanField().to_internal_value(data.get('enabled', True))
+                except serializers.ValidationError:
+                    await self.send(text_data=json.dumps({
+                        "type": "log",
+                        "message": "⚠️ toggle_timings needs a boolean 'enabled'"
+                    }))
+                    return
+                set_timings_in_updates(account_id, enabled)
+
         except Exception as e:
             print(f"❌ [Backend] Receive Error: {e}")
 
@@ -13,22 +13,39 @@ from core.trading_bot.models import TradePosition
 
 from .scraper import (
     MTF_CONTEXT, switch_timeframe, parse_candles, 
-    check_for_active_trades, get_account_metrics, 
-    get_active_positions, get_real_price
+    check_for_active_trades, get_terminal_snapshot, candle_trend,
+    CHART_WINDOWS, read_pinned_candles
 )
 from .navigator import close_current_trade, navigate_order_panel_to_gold, place_market_order, execute_trade_modification
 from .brain import get_market_decision, apply_emergency_break 
 from .database import save_trade_to_db, get_recent_history
 from .history_manager import sync_trade_history
+from .candle_buffer import get_candle_buffer
+from .candle_store import get_candle_store
+from .chart_axis import get_axis_calibration
+from .resampler import TIMEFRAMES, resample
+from .decision_cache import get_decision_cache
+from .profiling import TIMINGS_IN_UPDATES, get_component_timer
+from .page_bridge import get_page_bridge
+from .cdp_feed import get_cdp_feed
+from .tick_sampler import start_tick_sampler, stop_tick_sampler
+from .shared_browser import get_browser_scheduler
+from .process_stats import UsageMeter
+from .memory_guard import get_memory_guard
+from .volume_feed import attach_tick_volume, attach_dom_volume, read_dom_volume
 
 # CONSTANTS
-CHART_BUFFER = { "h1": [], "m15": [], "m5": [] }
+HARD_STOP_PNL = -9.00
+CONTRACT_SIZE = 100  # oz per lot on XAUUSD, for tick-based PnL estimates
+MIN_SL_GAP = 30.00
+MAX_SL_GAP = 40.00
+M5_HISTORY = 120  # Bars the brain sees: one chart scrape, now kept as a continuous series
+USAGE_REPORT_SECONDS = 300  # Browser RSS / CPU line in the dashboard log
+PINNED_READ_SECONDS = 10  # H1/M15 tab reads (a window switch + one parse each)
+USE_PAGE_BRIDGE = True  # In-page observers push deltas; False = full snapshot script every tick
 SCORES_FILE = os.path.join(settings.BASE_DIR, "persona_scores.json")
 CACHED_SCORES = {"WISE": 0, "RECKLESS": 0, "ANALYST": 0}
 
-def sanitize_candle(candle):
-    return {k.lower(): v for k, v in candle.items()}
-
 def update_persona_scores(account_id):
     """
     Recalculates scores from scratch based on the last 50 trades.
@@ -69,6 +86,17 @@ def update_persona_scores(account_id):
     CACHED_SCORES = scores
     return scores
 
+def estimate_pnl(trade, bid, ask):
+    """Position PnL at the given quote from its entry and size; None when it can't be computed."""
+    try:
+        entry = float(str(trade.get('open_price')).replace(',', ''))
+        volume = float(str(trade.get('volume')).split()[0])
+    except (TypeError, ValueError, IndexError):
+        return None
+    if trade.get('direction', 'BUY').upper() == 'BUY':
+        return None if bid is None else (bid - entry) * volume * CONTRACT_SIZE
+    return None if ask is None else (entry - ask) * volume * CONTRACT_SIZE
+
 def start_trading_loop(driver, account_id, stop_check_func, log_func):
     layout = Layout()
     layout.split_column(Layout(name="main", size=20), Layout(name="footer", size=10))
@@ -78,18 +106,50 @@ def start_trading_loop(driver, account_id, stop_check_func, log_func):
     last_history_sync = 0
     last_ui_update = 0
     last_trend_sync = 0
+    last_chart_update = 0
+    last_pinned_read = 0
     last_verbose_log = 0 
+    last_usage_report = time.time()
+    usage_meter = UsageMeter(driver)
+    usage_meter.sample()  # CPU baseline
+    memory_guard = get_memory_guard(account_id)
     
     START_TIME = time.time()
     WARMUP_SECONDS = 60 
     has_synced_once = False 
+    has_backfilled = False
+
+    # Shared browser: the driver is ours only between sleeps; a background sampler or the
+    # browser-wide performance log would read whichever account's tab has focus
+    scheduler = get_browser_scheduler(account_id)
+
+    sampler = None
+    if settings.TRADING_BOT_TICK_HZ and not scheduler:
+        sampler = start_tick_sampler(account_id, driver, settings.TRADING_BOT_TICK_HZ)
+    guard_trade = None  # Open position the tick guard watches while the loop sleeps
+    guard_woken = set()  # Tickets the guard already cut a sleep short for
+
+    def tick_guard_tripped():
+        """True once per position when sampled ticks put its estimated PnL past the hard stop."""
+        if not sampler or not guard_trade or guard_trade.get('ticket_id') in guard_woken:
+            return False
+        pnl = estimate_pnl(guard_trade, sampler.bid, sampler.ask)
+        if pnl is not None and pnl < HARD_STOP_PNL:
+            guard_woken.add(guard_trade.get('ticket_id'))
+            return True
+        return False
 
     def smart_sleep(seconds):
-        end_time = time.time() + seconds
-        while time.time() < end_time:
-            if stop_check_func(account_id): return True 
-            time.sleep(0.1)
-        return False
+        if scheduler: scheduler.release(account_id)  # Other accounts' turn at the browser
+        try:
+            end_time = time.time() + seconds
+            while time.time() < end_time:
+                if stop_check_func(account_id): return True 
+                if tick_guard_tripped(): return False  # Re-check the hard stop now
+                time.sleep(0.1)
+            return False
+        finally:
+            if scheduler: scheduler.acquire(account_id)
 
 
     def dash_log(acc_id, msg):
@@ -102,9 +162,25 @@ def start_trading_loop(driver, account_id, stop_check_func, log_func):
             )
         except: pass
 
+    calibration = get_axis_calibration(account_id)  # Main chart's pixel -> price fit, this account only
+    bridge = get_page_bridge(account_id, driver) if USE_PAGE_BRIDGE else None
+
+    cdp_feed = get_cdp_feed(account_id, driver) if settings.TRADING_BOT_CDP_FEED and not scheduler else None
+    logged_changes = set()  # (op, ticket) already logged from either source
+
+    def read_terminal():
+        snapshot = bridge.read() if bridge else get_terminal_snapshot(driver, calibration)
+        # Websocket quotes are newer than the rendered price text
+        if cdp_feed and cdp_feed.available:
+            cdp_feed.poll()
+            cdp_feed.apply(snapshot)
+        return snapshot
+
     # update_persona_scores(account_id) 
     dash_log(account_id, "🚀 Bot Engine Started. Syncing state...")
 
+    if scheduler: scheduler.acquire(account_id)
+
     with Live(layout, refresh_per_second=2, screen=True):
         while True:
             if stop_check_func(account_id): 
@@ -112,17 +188,26 @@ def start_trading_loop(driver, account_id, stop_check_func, log_func):
                 break
             
             try:
+                # Price, balance, positions and M5 candles in one browser round trip
+                snapshot = read_terminal()
+                # The websocket usually reports a change a tick before the DOM table does; log it once
+                changes = (bridge.position_changes() if bridge else []) + (cdp_feed.position_changes() if cdp_feed else [])
+                for op, ticket in changes:
+                    key = (op, str(ticket).lstrip('#'))
+                    if key in logged_changes: continue
+                    logged_changes.add(key)
+                    dash_log(account_id, f"{'📥 Position opened' if op == 'open' else '📤 Position closed'}: {ticket}")
+
                 # --- 1. UI UPDATES ---
                 if time.time() - last_ui_update > 2:
-                    metrics = get_account_metrics(driver)
                     async_to_sync(channel_layer.group_send)("bot_updates", {"type": "send_update", "data": {
                         "type": "balance_update", 
-                        "balance": metrics.get('balance', 0.0), 
-                        "equity": metrics.get('equity', 0.0), 
+                        "balance": snapshot.balance, 
+                        "equity": snapshot.equity, 
                         "scores": CACHED_SCORES
                     }})
-                    if metrics.get('balance', 0) > 0 and not has_synced_once:
-                        dash_log(account_id, f"✅ Connected. Balance: ${metrics['balance']}")
+                    if snapshot.balance > 0 and not has_synced_once:
+                        dash_log(account_id, f"✅ Connected. Balance: ${snapshot.balance}")
                         has_synced_once = True
                     last_ui_update = time.time()
 
@@ -130,53 +215,103 @@ def start_trading_loop(driver, account_id, stop_check_func, log_func):
                     if smart_sleep(1): break 
                     continue
                 
-                # --- 2. TREND SYNC ---
-                is_scheduled = (time.time() - last_trend_sync > 900)
-                is_retry = (MTF_CONTEXT.get("h1") == "UNKNOWN" and time.time() - last_trend_sync > 60)
-                
-                if is_scheduled or is_retry:
+                # --- 2. TREND BACKFILL ---
+                # H1/M15 come from pinned tabs or are rebuilt from M5 (step 3); without pinned
+                # tabs the chart is switched once to pull older history (retried every 15 min)
+                pinned = CHART_WINDOWS.get(account_id, {})
+                if not has_backfilled and len(pinned) > 1:
+                    has_backfilled = True  # The pinned tabs hold the full history
+
+                if not has_backfilled and time.time() - last_trend_sync > 900:
                     last_trend_sync = time.time()
-                    dash_log(account_id, "🔄 Syncing Trends (H1/M15)...")
+                    dash_log(account_id, "🔄 Backfilling H1/M15 history...")
                     try:
-                        updated_charts = {}
                         for tf, label in [("1 hour", "h1"), ("15 minutes", "m15")]:
                             if switch_timeframe(driver, tf, dash_log, account_id):
                                 smart_sleep(3)
-                                raw_candles = parse_candles(driver)
+                                raw_candles = parse_candles(driver, interval_ms=TIMEFRAMES[label] * 1000, calibration=calibration)
                                 if raw_candles:
-                                    candles = [sanitize_candle(c) for c in raw_candles]
-                                    CHART_BUFFER[label] = candles
-                                    last_c = candles[-1]
-                                    trend = "BULLISH" if last_c['close'] > last_c['open'] else "BEARISH"
-                                    MTF_CONTEXT[label] = trend
-                                    updated_charts[f"candles_{label}"] = candles
-                                    dash_log(account_id, f"📈 {label.upper()} Trend: {trend}")
-                        
-                        if updated_charts:
-                            async_to_sync(channel_layer.group_send)("bot_updates", {"type": "send_update", "data": {"type": "chart_update", **updated_charts}})
+                                    get_candle_store(account_id, label).merge(raw_candles)
+                                    has_backfilled = True
 
                         switch_timeframe(driver, "5 minutes", dash_log, account_id)
                         smart_sleep(3)
                     except Exception as e:
-                        dash_log(account_id, f"⚠️ Trend Sync Failed: {e}")
+                        dash_log(account_id, f"⚠️ Trend Backfill Failed: {e}")
+
+                    # The chart moved through H1/M15; re-read it now that M5 is back
+                    snapshot = read_terminal()
 
                 # --- 3. ANALYSIS & DATA PREP ---
-                raw_m5 = parse_candles(driver)
+                # parse_candles retries (and falls back to its cache) while the chart is redrawing
+                raw_m5 = snapshot.candles or parse_candles(driver, calibration=calibration)
                 if not raw_m5:
                     dash_log(account_id, "⚠️ No M5 Candles found! Retrying...")
                     smart_sleep(2); continue 
 
-                candles_m5 = [sanitize_candle(c) for c in raw_m5]
-                CHART_BUFFER["m5"] = candles_m5
-                ask_price = get_real_price(driver)
+                # Scrapes are merged into one aligned series: the forming bar is updated,
+                # new bars appended and closed bars streamed to the dashboard
+                store_m5 = get_candle_store(account_id, "m5", capacity=M5_HISTORY)
+                candle_events = [(kind, data, "m5") for kind, data in store_m5.merge(raw_m5)]
+                candles_m5 = store_m5.buffer
+                # The chart has no volume: tick counts from the sampler, or the volume pane's bars
+                if settings.TRADING_BOT_VOLUME_SOURCE == "dom":
+                    attach_dom_volume(store_m5, read_dom_volume(driver))
+                elif sampler:
+                    attach_tick_volume(store_m5, sampler)
+
+                # Higher timeframes: read from their pinned tabs when open, else rebuilt
+                # from the M5 series (aligned bars, backfilled history kept)
+                read_pinned = time.time() - last_pinned_read > PINNED_READ_SECONDS
+                for label in ("h1", "m15"):
+                    tf_store = get_candle_store(account_id, label)
+                    tf_buffer = tf_store.buffer
+                    calibrated = None
+                    if label in pinned:
+                        if not read_pinned: continue
+                        bars = read_pinned_candles(driver, account_id, label)
+                    else:
+                        bars = resample(candles_m5, label)
+                        calibrated = store_m5.calibrated  # Same units as the M5 bars they came from
+                    if bars:
+                        candle_events += [(kind, data, label) for kind, data in tf_store.merge(bars, calibrated)]
+                        trend = candle_trend(tf_buffer.last())
+                        if trend != MTF_CONTEXT.get(label):
+                            dash_log(account_id, f"📈 {label.upper()} Trend: {trend}")
+                        MTF_CONTEXT[label] = trend
+
+                if read_pinned: last_pinned_read = time.time()
+
+                for kind, data, label in candle_events:
+                    if kind == 'gap':
+                        dash_log(account_id, f"⚠️ {label.upper()} gap: {data['missing']} bars missing")
+                    else:
+                        async_to_sync(channel_layer.group_send)("bot_updates", {"type": "send_update", "data": {
+                            "type": "bar_closed", "timeframe": label, "candle": data
+                        }})
+
+                if time.time() - last_chart_update > 60:
+                    async_to_sync(channel_layer.group_send)("bot_updates", {"type": "send_update", "data": {
+                        "type": "chart_update",
+                        "candles_h1": get_candle_buffer(account_id, "h1").to_dicts(),
+                        "candles_m15": get_candle_buffer(account_id, "m15").to_dicts(),
+                    }})
+                    last_chart_update = time.time()
+
+                # Sampled ticks are fresher than the snapshot, unless websocket quotes are flowing
+                if sampler and not (cdp_feed and cdp_feed.is_fresh()):
+                    ask_price = sampler.price(default=snapshot.price)
+                else:
+                    ask_price = snapshot.price
 
                 try:
-                    vol_val = sum([c['high'] - c['low'] for c in candles_m5[-5:]]) / 5
+                    vol_val = float((candles_m5.column('high', 5) - candles_m5.column('low', 5)).sum()) / 5
                     vol_str = f"{vol_val:.2f}"
                 except: 
                     vol_str = "0.00"
 
-                active_trades_ui = get_active_positions(driver)
+                active_trades_ui = snapshot.positions
+                guard_trade = active_trades_ui[0] if active_trades_ui else None
                 trade_context = None
                 if active_trades_ui:
                     t = active_trades_ui[0]
@@ -187,7 +322,10 @@ def start_trading_loop(driver, account_id, stop_check_func, log_func):
                     }
 
                 # Get decision with error handling
-                decision = get_market_decision(ask_price, MTF_CONTEXT, candles_m5, get_recent_history(account_id), active_trade=trade_context)
+                decision = get_market_decision(
+                    ask_price, MTF_CONTEXT, candles_m5, get_recent_history(account_id),
+                    active_trade=trade_context, account_id=account_id
+                )
 
                 # Check if decision contains error
                 if 'error' in decision:
@@ -206,14 +344,18 @@ def start_trading_loop(driver, account_id, stop_check_func, log_func):
                     last_verbose_log = time.time()
 
                 # Fixed UI update - removed scores
-                async_to_sync(channel_layer.group_send)("bot_updates", {"type": "send_update", "data": {
+                update = {
                     "type": "analysis_update", 
                     "market_trend": MTF_CONTEXT.get('h1', 'UNKNOWN'), 
                     "volatility": vol_str, 
                     "decision_data": decision,
-                    "candles_m5": CHART_BUFFER["m5"][-50:], 
-                    "price": ask_price
-                }})
+                    "candles_m5": candles_m5.to_dicts(50), 
+                    "price": ask_price,
+                    "spread": sampler.spread() if sampler else None
+                }
+                if account_id in TIMINGS_IN_UPDATES:
+                    update["timings"] = get_component_timer(account_id).snapshot()
+                async_to_sync(channel_layer.group_send)("bot_updates", {"type": "send_update", "data": update})
 
                 if (time.time() - START_TIME) < WARMUP_SECONDS:
                     smart_sleep(1); continue
@@ -230,9 +372,14 @@ def start_trading_loop(driver, account_id, stop_check_func, log_func):
                         raw_pnl = t.get('profit', '0').replace('$', '').replace(',', '').strip()
                         raw_pnl = raw_pnl.replace('\u2009', '').replace('\xa0', '').replace(' ', '').replace('−', '-').replace('+', '')
                         pnl = float(raw_pnl)
-                        
+                        # The profit cell lags the market; the sampler's quote doesn't
+                        if sampler and sampler.is_fresh():
+                            live_pnl = estimate_pnl(t, sampler.bid, sampler.ask)
+                            if live_pnl is not None:
+                                pnl = round(live_pnl, 2)
+
                         # HARD STOP LOSS (keep this)
-                        if pnl < -9.00: 
+                        if pnl < HARD_STOP_PNL: 
                             dash_log(account_id, f"🛑 HARD STOP: PnL is {pnl}. Closing.")
                             close_current_trade(driver, dash_log, account_id)
                             smart_sleep(2); continue
@@ -253,7 +400,9 @@ def start_trading_loop(driver, account_id, stop_check_func, log_func):
 
 
                 # D. OPEN NEW TRADE
-                if not is_open and ask_price != "0.00" and decision['action'] in ["BUY", "SELL"]:
+                # (none while a page reload is pending: it runs once the account is flat)
+                reload_pending = memory_guard is not None and memory_guard.pending
+                if not is_open and not reload_pending and ask_price != "0.00" and decision['action'] in ["BUY", "SELL"]:
                     current_p = float(ask_price)
                     sl_level = float(decision.get('sl') or 0)
                     tp_level = float(decision.get('tp') or 0)
@@ -265,9 +414,8 @@ def start_trading_loop(driver, account_id, stop_check_func, log_func):
                     raw_sl_gap = abs(current_p - sl_level)
                     raw_tp_gap = abs(current_p - tp_level)
                     
-                    MIN_SL_GAP = 30.00 
                     if raw_sl_gap < MIN_SL_GAP: raw_sl_gap = MIN_SL_GAP
-                    if raw_sl_gap > 40.0: raw_sl_gap = 40.0
+                    if raw_sl_gap > MAX_SL_GAP: raw_sl_gap = MAX_SL_GAP
                     
                     sl_pips = round(raw_sl_gap * 10, 1) 
                     tp_pips = round(raw_tp_gap * 10, 1)
@@ -292,7 +440,8 @@ def start_trading_loop(driver, account_id, stop_check_func, log_func):
                                 decision['tp'], 
                                 decision['reason'],
                                 "",  # Empty voters string
-                                MTF_CONTEXT
+                                MTF_CONTEXT,
+                                candles=candles_m5
                             )
                             last_history_sync = 0
                         else: 
@@ -306,8 +455,31 @@ def start_trading_loop(driver, account_id, stop_check_func, log_func):
                     # update_persona_scores(account_id)
                     last_history_sync = time.time()
 
+                # 7. BROWSER RESOURCES
+                if time.time() - last_usage_report > USAGE_REPORT_SECONDS:
+                    usage = usage_meter.sample()
+                    if usage:
+                        profile = "lean" if settings.TRADING_BOT_LEAN_BROWSER else "full"
+                        dash_log(account_id, f"🧮 Browser ({profile}): {usage['rss_mb']} MB RSS | CPU {usage['cpu_pct']}%")
+                    last_usage_report = time.time()
+
+                # 8. MEMORY GUARD
+                # Reload the terminal page between ticks once its heap is too big; candle stores,
+                # history checkpoint and warm-up state are Python-side and carry straight over
+                if memory_guard and memory_guard.check():
+                    if memory_guard.is_safe(trade_pending=bool(active_trades_ui)):
+                        dash_log(account_id, f"♻️ Terminal heap {memory_guard.heap_mb} MB (limit {memory_guard.threshold_mb} MB). Reloading page...")
+                        ok, before, after = memory_guard.reload()
+                        if ok:
+                            dash_log(account_id, f"✅ Page reloaded: heap {before} → {after} MB")
+                        else:
+                            dash_log(account_id, "❌ Page reload failed; retrying after the cool-down")
+                        continue
+
+                cache_stats = get_decision_cache(account_id).stats
                 layout["main"].update(Panel(
-                    f"Price: {ask_price} | Signal: {decision.get('action')} ({decision.get('confidence', 0)}%)", 
+                    f"Price: {ask_price} | Signal: {decision.get('action')} ({decision.get('confidence', 0)}%)"
+                    f" | Cache: {cache_stats['hit_rate']:.0%} of {cache_stats['hits'] + cache_stats['misses']}", 
                     title="Live"
                 ))
 
@@ -316,4 +488,6 @@ def start_trading_loop(driver, account_id, stop_check_func, log_func):
 
             except Exception as e:
                 dash_log(account_id, f"⚠️ Loop Error: {str(e)[:30]}")
-                smart_sleep(2)
\ No newline at end of file
+                smart_sleep(2)
+    if sampler: stop_tick_sampler(account_id)
+    if scheduler: scheduler.release(account_id)
@@ -3,11 +3,14 @@ import json
 from django.utils import timezone
 from .models import TradePosition, TradingAccount
 
-def save_trade_to_db(account_id, action, price, sl, tp, reason, voters_str, mtf_context):
+SNAPSHOT_BARS = 30
+
+def save_trade_to_db(account_id, action, price, sl, tp, reason, voters_str, mtf_context, candles=None):
     """
     Saves a trade execution.
     Arguments matched to Controller: 
     (account_id, action, price, sl, tp, reason, voters_str, mtf_context)
+    `candles` is the account's M5 CandleBuffer; its last bars are stored as the entry snapshot.
     """
     try:
         account = TradingAccount.objects.get(id=account_id)
@@ -17,6 +20,8 @@ def save_trade_to_db(account_id, action, price, sl, tp, reason, voters_str, mtf_
         if isinstance(voters_str, list):
             voters_str = ",".join(voters_str)
         
+        candle_snapshot = json.dumps(candles.to_dicts(SNAPSHOT_BARS)) if candles is not None else None
+        
         TradePosition.objects.create(
             account=account,
             ticket_id=ticket_id,
@@ -33,6 +38,7 @@ def save_trade_to_db(account_id, action, price, sl, tp, reason, voters_str, mtf_
             
             ai_reasoning=reason,
             voters=voters_str,
+            candle_snapshot=candle_snapshot,
             
             is_closed=False
         )
@@ -0,0 +1,74 @@
+from .indicator_engine import bar_key
+
+# GLOBAL STATE
+DECISION_CACHES = {}  # { account_id: DecisionCache }
+
+
+def get_decision_cache(account_id):
+    cache = DECISION_CACHES.get(account_id)
+    if cache is None:
+        cache = DecisionCache()
+        DECISION_CACHES[account_id] = cache
+    return cache
+
+
+def market_fingerprint(price, candles, dxy, active_trade, tick_size):
+    """
+    Cheap key for everything get_market_decision reads: the last closed and forming
+    bars, the price rounded to the tick size, the DXY update time/staleness and the open trade.
+    """
+    try:
+        quantized = round(float(price) / tick_size)
+    except (TypeError, ValueError):
+        quantized = price
+
+    trade = None
+    if active_trade:
+        trade = (active_trade.get('direction'), active_trade.get('entry_price'))
+
+    return (
+        len(candles),
+        bar_key(candles[-2]) if len(candles) > 1 else None,
+        bar_key(candles[-1]),
+        quantized,
+        (dxy.get('timestamp'), dxy.get('stale')),
+        trade,
+    )
+
+
+class DecisionCache:
+    """Remembers the last decision and returns it while the market fingerprint is unchanged."""
+
+    def __init__(self):
+        self.fingerprint = None
+        self.decision = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, fingerprint):
+        if self.decision is not None and fingerprint == self.fingerprint:
+            self.hits += 1
+            return self.decision
+        self.misses += 1
+        return None
+
+    def store(self, fingerprint, decision):
+        # Never pin an error result; the next tick should retry the full pipeline
+        if 'error' in decision:
+            self.clear()
+            return
+        self.fingerprint = fingerprint
+        self.decision = decision
+
+    def clear(self):
+        self.fingerprint = None
+        self.decision = None
+
+    @property
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+        }
@@ -1,16 +1,20 @@
 # dxy_service.py - runs in background
 import requests
 import time
-import json
 from datetime import datetime
 import threading
 
+from .dxy_state import DXY_FILE, DXY_STATE, write_atomic
+
+
 class DXYService:
-    def __init__(self, token, update_interval=12):  # 12 seconds = 5 calls/minute
+    def __init__(self, token, update_interval=12, state=DXY_STATE, path=DXY_FILE):  # 12 seconds = 5 calls/minute
         self.token = token
         self.interval = update_interval
         self.latest_data = None
         self.running = False
+        self.state = state  # In-process readers
+        self.path = path  # Other processes (None = don't write the file)
         
     def fetch_dxy(self):
         url = "https://api-free.itick.org/indices/quote"
@@ -41,9 +45,14 @@ class DXYService:
                     'strength': data.get('chp', 0) > 0,  # Positive change = DXY strong
                     'weakness': data.get('chp', 0) < 0   # Negative change = DXY weak
                 }
-                # Save to file for main bot to read
-                with open('dxy_latest.json', 'w') as f:
-                    json.dump(self.latest_data, f)
+                received_at = time.time()
+                self.state.publish(self.latest_data, received_at)
+                # Save to file for a bot running in another process
+                if self.path:
+                    try:
+                        write_atomic(self.path, {**self.latest_data, 'received_at': received_at})
+                    except OSError as e:
+                        print(f"DXY write error: {e}")
             
             time.sleep(self.interval)
     
@@ -53,11 +62,3 @@ class DXYService:
         thread.daemon = True
         thread.start()
         return thread
-
-# In your main bot, simply read the file:
-def get_dxy():
-    try:
-        with open('dxy_latest.json', 'r') as f:
-            return json.load(f)
-    except:
-        return {'price': 100.0, 'strength': False, 'weakness': False}
\ No newline at end of file
@@ -0,0 +1,103 @@
+import json
+import logging
+import os
+import time
+
+from .profiling import log_sampled
+
+logger = logging.getLogger(__name__)
+
+DXY_FILE = 'dxy_latest.json'
+STALE_AFTER = 60  # seconds without a fresh quote before DXY stops counting as live
+
+DEFAULT_DXY = {
+    'price': 100.0,
+    'change_percent': 0,
+    'strength': False,
+    'weakness': False,
+    'timestamp': None,
+}
+
+
+def _with_age(snapshot, stale_after):
+    """Copy of a published snapshot with 'age' (seconds) and 'stale' filled in at read time."""
+    if snapshot is None:
+        return {**DEFAULT_DXY, 'age': None, 'stale': True}
+    age = time.time() - snapshot['received_at']
+    return {**snapshot, 'age': round(age, 1), 'stale': age > stale_after}
+
+
+class DXYState:
+    """
+    Latest DXY quote shared between the service thread and the bot threads.
+
+    publish() swaps in a new dict and read() only dereferences the attribute, so
+    readers never take a lock and never see a half-updated quote.
+    """
+
+    def __init__(self, stale_after=STALE_AFTER):
+        self.stale_after = stale_after
+        self._snapshot = None
+
+    @property
+    def has_data(self):
+        return self._snapshot is not None
+
+    def publish(self, data, received_at=None):
+        self._snapshot = {**data, 'received_at': received_at or time.time()}
+
+    def read(self):
+        return _with_age(self._snapshot, self.stale_after)
+
+
+class DXYFileReader:
+    """
+    Reads the file written by a DXYService running in another process.
+    The file is only re-parsed when its mtime or size changes (a file that failed to
+    parse is not retried until it is rewritten).
+    """
+
+    def __init__(self, path=DXY_FILE, stale_after=STALE_AFTER):
+        self.path = path
+        self.stale_after = stale_after
+        self._key = None
+        self._snapshot = None
+
+    def read(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return _with_age(self._snapshot, self.stale_after)
+
+        key = (st.st_mtime_ns, st.st_size)
+        if key != self._key:
+            self._key = key
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                # Files from older writers have no receive time; the write time is close enough
+                data.setdefault('received_at', st.st_mtime)
+                self._snapshot = data
+            except (OSError, ValueError) as e:
+                log_sampled(logger, logging.WARNING, 'dxy_read_error', "Error reading DXY file: %s", e)
+        return _with_age(self._snapshot, self.stale_after)
+
+
+def write_atomic(path, data):
+    """Writes JSON to a temp file next to `path` and renames it over, so readers see old or new, never half."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+# GLOBAL STATE
+DXY_STATE = DXYState()
+DXY_FILE_READER = DXYFileReader()
+
+
+def get_dxy():
+    """Latest DXY for the bot: the in-process feed when a service thread runs here, else the file."""
+    if DXY_STATE.has_data:
+        return DXY_STATE.read()
+    return DXY_FILE_READER.read()
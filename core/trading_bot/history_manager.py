@@ -9,8 +9,138 @@ from channels.layers import get_channel_layer
 # FIX 1: Import the Detail Serializer to calculate scores
 from core.trading_bot.serializers import TradePositionSerializer, TradingAccountDetailSerializer
 
-def sync_trade_history(driver, account_id, log_func):
+# GLOBAL STATE
+HISTORY_CHECKPOINTS = {}  # { account_id: (close_time, {tickets closed at that time}) }
+FULL_SCAN_REQUESTS = set()  # account_ids whose next sync re-scans the whole day
+
+HISTORY_ROWS_SELECTOR = ".history-container .data-table-content .data-table-row"
+
+# All visible history rows as arrays of cell texts, in one round trip
+HISTORY_ROWS_JS = """
+return Array.from(
+    document.querySelectorAll(arguments[0]),
+    (row) => Array.from(row.querySelectorAll('span'), (c) => (c.textContent || '').trim())
+);
+"""
+
+def request_full_scan(account_id):
+    """Makes the next sync ignore the checkpoint and walk all of today's history."""
+    FULL_SCAN_REQUESTS.add(account_id)
+
+def reset_history_checkpoint(account_id):
+    HISTORY_CHECKPOINTS.pop(account_id, None)
+
+def _clean_num(val):
+    if not val: return 0.0
+    val = str(val).replace('−', '-').replace('‐', '-')
+    val = re.sub(r'[^\d.-]', '', val)
+    try: return float(val)
+    except: return 0.0
+
+def _parse_close_time(full_date_str):
+    try: return datetime.strptime(full_date_str, "%d/%m/%Y %H:%M:%S")
+    except: return None
+
+def _is_seen(checkpoint, close_time, ticket):
+    """True for rows at or before the checkpoint (already processed by an earlier sync)."""
+    if not checkpoint or close_time is None: return False
+    cp_time, cp_tickets = checkpoint
+    return close_time < cp_time or (close_time == cp_time and ticket in cp_tickets)
+
+def _store_history_row(cells, account):
+    """Writes one history row (cell texts) to the DB; returns the created/updated trade or None."""
+    full_date_str = cells[0]
+    raw_ticket = cells[1]
+    raw_symbol = cells[2]
+    raw_type   = cells[4].upper()
+    raw_vol    = cells[5]
+    raw_comm   = cells[8]
+    raw_pnl    = cells[10]
+    raw_comment= cells[11]
+
+    # --- CLEAN & CONVERT ---
+    pnl_val = _clean_num(raw_pnl)
+    comm_val = _clean_num(raw_comm)
+    
+    # FIX: Convert Volume to String then Decimal for perfect DB matching
+    vol_float = _clean_num(raw_vol)
+    vol_decimal = Decimal(str(vol_float)) 
+    
+    net_profit = pnl_val + comm_val
+
+    # Skip empty rows
+    if net_profit == 0.0 and pnl_val == 0.0 and comm_val == 0.0: 
+        return None
+
+    # Reason Parsing
+    exit_reason = "MANUAL"
+    if "[sl" in raw_comment.lower(): exit_reason = "SL"
+    elif "[tp" in raw_comment.lower(): exit_reason = "TP"
+
+    # --- PARSE TIME ---
+    dt_obj = _parse_close_time(full_date_str) or datetime.now()
+
+    # --- MATCHING LOGIC ---
+    
+    # A. Check if this Real Ticket ID is already saved
+    existing_trade = TradePosition.objects.filter(ticket_id=raw_ticket).first()
+    
+    if existing_trade:
+        if float(existing_trade.profit) != net_profit:
+            existing_trade.profit = net_profit
+            existing_trade.save()
+            return existing_trade
+        return None
+
+    # B. Find the Matching "AUTO" Trade
+    matching_trade = TradePosition.objects.filter(
+        account=account,
+        symbol=raw_symbol,
+        trade_type=raw_type,
+        volume=vol_decimal,
+        is_closed=False
+    ).order_by('open_time').first()
+
+    if matching_trade:
+        # MATCH FOUND: Close the AUTO trade
+        matching_trade.ticket_id = raw_ticket 
+        matching_trade.profit = net_profit
+        matching_trade.close_time = dt_obj
+        matching_trade.is_closed = True
+        
+        if exit_reason != "MANUAL":
+             current_reason = matching_trade.ai_reasoning or ""
+             if "CLOSED BY" not in current_reason:
+                matching_trade.ai_reasoning = current_reason + f"\n[CLOSED BY {exit_reason}]"
+        
+        matching_trade.save()
+        return matching_trade
+
+    # NO MATCH: Create new Manual Trade entry
+    return TradePosition.objects.create(
+        account=account,
+        ticket_id=raw_ticket,
+        symbol=raw_symbol,
+        volume=vol_decimal,
+        trade_type=raw_type,
+        open_price=0, 
+        profit=net_profit,
+        close_time=dt_obj,
+        is_closed=True,
+        ai_reasoning=f"Manual/External Trade [{exit_reason}]"
+    )
+
+def sync_trade_history(driver, account_id, log_func, full_scan=False):
+    """
+    Reads today's closed trades from the History tab (newest first) into the DB.
+    Only rows newer than the account's checkpoint are processed and scrolling stops at
+    the checkpoint; full_scan (or request_full_scan) walks the whole day again.
+    """
     updated_trades_list = []
+    full_scan = full_scan or account_id in FULL_SCAN_REQUESTS
+    FULL_SCAN_REQUESTS.discard(account_id)
+    checkpoint = None if full_scan else HISTORY_CHECKPOINTS.get(account_id)
+
     try:
         # 1. Switch to History Tab
         try:
@@ -23,6 +153,9 @@ def sync_trade_history(driver, account_id, log_func):
         today_str = datetime.now().strftime("%d/%m/%Y") 
         
         processed_tickets = set()
+        stored = []  # (close_time, ticket) of the rows stored this run
+        oldest_failed = None  # Close time of the oldest row that failed to store (checkpoint stops below it)
+        failed_undated = False
         keep_scrolling = True
         scroll_attempts = 0
         max_scrolls = 20
@@ -33,132 +166,66 @@ def sync_trade_history(driver, account_id, log_func):
             return [] 
 
         while keep_scrolling and scroll_attempts < max_scrolls:
-            rows = driver.find_elements(By.CSS_SELECTOR, ".history-container .data-table-content .data-table-row")
+            rows = driver.execute_script(HISTORY_ROWS_JS, HISTORY_ROWS_SELECTOR)
             if not rows: break
             
-            found_older_date = False
+            reached_end = False
 
-            for row in rows:
+            for cells in rows:
                 try:
-                    cells = row.find_elements(By.TAG_NAME, "span")
                     if len(cells) < 12: continue
 
-                    def get_text(idx):
-                        return driver.execute_script("return arguments[0].textContent;", cells[idx]).strip()
-
-                    # --- 1. DATE CHECK ---
-                    full_date_str = get_text(0)
-                    date_part = full_date_str.split(' ')[0]
-
-                    if date_part != today_str:
-                        found_older_date = True
-                        keep_scrolling = False
+                    # --- 1. DATE / CHECKPOINT CHECK ---
+                    full_date_str = cells[0]
+                    if full_date_str.split(' ')[0] != today_str:
+                        reached_end = True
                         continue 
 
-                    # --- 2. EXTRACT DATA ---
-                    raw_ticket = get_text(1)
+                    raw_ticket = cells[1]
+                    close_time = _parse_close_time(full_date_str)
+                    if _is_seen(checkpoint, close_time, raw_ticket):
+                        reached_end = True
+                        continue
+
                     if raw_ticket in processed_tickets: continue
                     processed_tickets.add(raw_ticket)
 
-                    raw_symbol = get_text(2)
-                    raw_type   = get_text(4).upper()
-                    raw_vol    = get_text(5)
-                    raw_comm   = get_text(8)
-                    raw_pnl    = get_text(10)
-                    raw_comment= get_text(11)
-
-                    # --- 3. CLEAN & CONVERT ---
-                    def clean_num(val):
-                        if not val: return 0.0
-                        val = str(val).replace('−', '-').replace('‐', '-')
-                        val = re.sub(r'[^\d.-]', '', val)
-                        try: return float(val)
-                        except: return 0.0
-
-                    pnl_val = clean_num(raw_pnl)
-                    comm_val = clean_num(raw_comm)
-                    
-                    # FIX: Convert Volume to String then Decimal for perfect DB matching
-                    vol_float = clean_num(raw_vol)
-                    vol_decimal = Decimal(str(vol_float)) 
-                    
-                    net_profit = pnl_val + comm_val
-
-                    # Skip empty rows
-                    if net_profit == 0.0 and pnl_val == 0.0 and comm_val == 0.0: 
-                        continue
-
-                    # Reason Parsing
-                    exit_reason = "MANUAL"
-                    if "[sl" in raw_comment.lower(): exit_reason = "SL"
-                    elif "[tp" in raw_comment.lower(): exit_reason = "TP"
-
-                    # --- 4. PARSE TIME ---
-                    dt_obj = datetime.now()
-                    try: dt_obj = datetime.strptime(full_date_str, "%d/%m/%Y %H:%M:%S")
-                    except: pass
-
-                    # --- 5. MATCHING LOGIC ---
-                    
-                    # A. Check if this Real Ticket ID is already saved
-                    existing_trade = TradePosition.objects.filter(ticket_id=raw_ticket).first()
-                    
-                    if existing_trade:
-                        if float(existing_trade.profit) != net_profit:
-                            existing_trade.profit = net_profit
-                            existing_trade.save()
-                            updated_trades_list.append(existing_trade)
+                    # --- 2. STORE ---
+                    try:
+                        trade = _store_history_row(cells, account)
+                    except Exception:
+                        if close_time is None: failed_undated = True
+                        elif oldest_failed is None or close_time < oldest_failed: oldest_failed = close_time
                         continue
-
-                    # B. Find the Matching "AUTO" Trade
-                    matching_trade = TradePosition.objects.filter(
-                        account=account,
-                        symbol=raw_symbol,
-                        trade_type=raw_type,
-                        volume=vol_decimal,
-                        is_closed=False
-                    ).order_by('open_time').first()
-
-                    if matching_trade:
-                        # MATCH FOUND: Close the AUTO trade
-                        matching_trade.ticket_id = raw_ticket 
-                        matching_trade.profit = net_profit
-                        matching_trade.close_time = dt_obj
-                        matching_trade.is_closed = True
-                        
-                        if exit_reason != "MANUAL":
-                             current_reason = matching_trade.ai_reasoning or ""
-                             if "CLOSED BY" not in current_reason:
-                                matching_trade.ai_reasoning = current_reason + f"\n[CLOSED BY {exit_reason}]"
-                        
-                        matching_trade.save()
-                        updated_trades_list.append(matching_trade)
-                    else:
-                        # NO MATCH: Create new Manual Trade entry
-                        trade = TradePosition.objects.create(
-                            account=account,
-                            ticket_id=raw_ticket,
-                            symbol=raw_symbol,
-                            volume=vol_decimal,
-                            trade_type=raw_type,
-                            open_price=0, 
-                            profit=net_profit,
-                            close_time=dt_obj,
-                            is_closed=True,
-                            ai_reasoning=f"Manual/External Trade [{exit_reason}]"
-                        )
-                        updated_trades_list.append(trade)
+                    if trade: updated_trades_list.append(trade)
+                    if close_time is not None: stored.append((close_time, raw_ticket))
 
                 except Exception: continue
             
-            # --- 6. SCROLL ---
-            if not found_older_date:
+            # --- 3. SCROLL (only until the checkpoint / yesterday shows up) ---
+            if not reached_end:
                 driver.execute_script("arguments[0].scrollTop += 600;", table_container)
                 time.sleep(0.7)
                 scroll_attempts += 1
             else:
                 keep_scrolling = False
 
+        # The checkpoint only moves over stored rows, and never past a row that failed
+        # (it is retried on the next sync)
+        newest = None
+        if not failed_undated:
+            for close_time, ticket in stored:
+                if oldest_failed is not None and close_time >= oldest_failed: continue
+                if newest is None or close_time > newest[0]:
+                    newest = (close_time, {ticket})
+                elif close_time == newest[0]:
+                    newest[1].add(ticket)
+
+        if newest and (checkpoint is None or newest[0] >= checkpoint[0]):
+            if checkpoint and newest[0] == checkpoint[0]:
+                newest[1].update(checkpoint[1])
+            HISTORY_CHECKPOINTS[account_id] = newest
+
         if updated_trades_list:
             log_func(account_id, f"✅ History Synced: {len(updated_trades_list)} trades.")
             
@@ -183,12 +250,14 @@ def sync_trade_history(driver, account_id, log_func):
                 }
             )
             
-            try:
-                pos_tab = driver.find_element(By.XPATH, "//div[contains(@class, 'tab-label') and text()='Positions']")
-                driver.execute_script("arguments[0].click();", pos_tab)
-            except: pass
-            
     except Exception as e:
         log_func(account_id, f"Sync Error: {str(e)[:20]}")
 
+    finally:
+        # Back to Positions so the live positions table stays rendered
+        try:
+            pos_tab = driver.find_element(By.XPATH, "//div[contains(@class, 'tab-label') and text()='Positions']")
+            driver.execute_script("arguments[0].click();", pos_tab)
+        except: pass
+
     return updated_trades_list
\ No newline at end of file
@@ -0,0 +1,248 @@
+import math
+from collections import deque
+
+# GLOBAL STATE
+INDICATOR_ENGINES = {}  # { account_id: IndicatorEngine }
+
+NAN = float('nan')
+
+
+def get_indicator_engine(account_id):
+    """Returns the account's engine, creating it on first use."""
+    engine = INDICATOR_ENGINES.get(account_id)
+    if engine is None:
+        engine = IndicatorEngine()
+        INDICATOR_ENGINES[account_id] = engine
+    return engine
+
+
+def reset_indicator_engine(account_id):
+    INDICATOR_ENGINES.pop(account_id, None)
+
+
+def _num(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NAN
+
+
+def bar_key(candle):
+    volume = candle.get('volume')
+    if volume != volume: volume = None  # NaN never compares equal
+    return (candle['open'], candle['high'], candle['low'], candle['close'], volume)
+
+
+def _carry(prev, seed, value, x):
+    """Next (carry, seed) pair for a recursive average; x feeds the SMA seed until it is full."""
+    if prev is None and math.isnan(value):
+        seed.append(x)
+        return None, seed
+    return value, []
+
+
+class _RollingSum:
+    """Fixed-size window sum that tracks NaN entries instead of poisoning the sum."""
+
+    def __init__(self, size):
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.nans = 0
+
+    def push(self, value):
+        if self.values.maxlen and len(self.values) == self.values.maxlen:
+            old = self.values[0]
+            if math.isnan(old): self.nans -= 1
+            else: self.total -= old
+        self.values.append(value)
+        if math.isnan(value): self.nans += 1
+        else: self.total += value
+
+
+class IndicatorEngine:
+    """
+    Rolling indicator state for one account's M5 series.
+
+    The state is "committed" up to the last closed bar. The forming bar is evaluated
+    on top of it without mutating anything, so a price tick on the current bar is O(1)
+    and a newly closed bar is one O(1) commit. Only a rewritten history (no anchor
+    found between the stored tail and the new candles) triggers a full recompute.
+
+    EMAs carry their value across the whole series (recursion seeded with an SMA like
+    pandas_ta), ATR carries the running sums of pandas_ta's rma (adjusted ewm, same as
+    indicators.atr); VWAP and the SMAs use the same window as the candle list.
+    """
+
+    MAX_SHIFT = 5  # Bars that may close between two updates before we give up and recompute
+
+    def __init__(self, ema_fast=9, ema_slow=21, atr_length=14, ma_length=20, momentum_lag=4):
+        self.ema_fast_length = ema_fast
+        self.ema_slow_length = ema_slow
+        self.atr_length = atr_length
+        self.ma_length = ma_length
+        self.momentum_lag = momentum_lag
+
+        self.incremental_updates = 0
+        self.full_recomputes = 0
+        self.reset()
+
+    def reset(self, window=0):
+        self.window = window
+        self.closed_count = 0
+        self._closed_keys = deque(maxlen=2)
+
+        self._ema_fast = None
+        self._ema_slow = None
+        self._fast_seed = []
+        self._slow_seed = []
+        self._atr = (0.0, 0.0, 0)  # Adjusted-ewm numerator, denominator, true ranges seen
+        self._prev_close = None
+
+        self._vp = _RollingSum(max(window - 1, 0))
+        self._vol = _RollingSum(max(window - 1, 0))
+        self._vol_ma = _RollingSum(self.ma_length - 1)
+        self._delta_ma = _RollingSum(self.ma_length - 1)
+        self._deltas = deque(maxlen=self.momentum_lag)
+
+    # --- PUBLIC API ---
+    def update(self, candles):
+        """
+        Syncs the engine with the latest candles (list of dicts or CandleBuffer,
+        oldest -> newest, last one forming) and returns the values for the forming bar.
+        """
+        if not candles: return None
+
+        shift = self._find_shift(candles)
+        if shift is None:
+            self._recompute(candles)
+        else:
+            # The previous forming bar (in its final form) and anything after it closed
+            n = len(candles)
+            for i in range(n - shift - 1, n - 1):
+                self._commit(candles[i])
+            self.incremental_updates += 1
+
+        return self._evaluate(self._bar_values(candles[-1]))
+
+    @property
+    def stats(self):
+        return {
+            'incremental_updates': self.incremental_updates,
+            'full_recomputes': self.full_recomputes,
+            'closed_bars': self.closed_count,
+        }
+
+    # --- SYNC HELPERS ---
+    def _find_shift(self, candles):
+        """How many bars closed since the last update, or None if history was rewritten."""
+        n = len(candles)
+        if n != self.window or len(self._closed_keys) < 2:
+            return None
+
+        anchor_prev, anchor = self._closed_keys[0], self._closed_keys[1]
+        for shift in range(min(self.MAX_SHIFT, n - 3) + 1):
+            idx = n - 2 - shift
+            if bar_key(candles[idx]) == anchor and bar_key(candles[idx - 1]) == anchor_prev:
+                return shift
+        return None
+
+    def _recompute(self, candles):
+        self.reset(window=len(candles))
+        for i in range(len(candles) - 1):
+            self._commit(candles[i])
+        self.full_recomputes += 1
+
+    # --- MATH ---
+    @staticmethod
+    def _ema_step(prev, seed, length, x, alpha):
+        if prev is not None:
+            return prev + (x - prev) * alpha
+        if len(seed) + 1 == length:
+            return (sum(seed) + x) / length
+        return NAN
+
+    def _atr_step(self, tr):
+        """Next rma state after one true range (NaNs only decay the older weights)."""
+        num, den, seen = self._atr
+        decay = 1.0 - 1.0 / self.atr_length
+        num, den = num * decay, den * decay
+        if not math.isnan(tr):
+            num, den, seen = num + tr, den + 1.0, seen + 1
+        return num, den, seen
+
+    @staticmethod
+    def _window_mean(window, x, length):
+        if len(window.values) < length - 1 or window.nans or math.isnan(x):
+            return NAN
+        return (window.total + x) / length
+
+    def _bar_values(self, candle):
+        o = _num(candle['open'])
+        h = _num(candle['high'])
+        low = _num(candle['low'])
+        c = _num(candle['close'])
+        v = _num(candle.get('volume'))
+
+        hl = h - low
+        if self._prev_close is None:
+            tr = NAN  # No previous close (pandas_ta leaves the first true range undefined)
+        else:
+            tr = max(hl, abs(h - self._prev_close), abs(low - self._prev_close))
+
+        # Up/down tick delta when the volume feed supplied one, else estimated from the bar shape
+        delta = _num(candle.get('delta'))
+        if math.isnan(delta):
+            delta = ((c - o) / (hl if hl != 0 else 1)) * v
+        return {'close': c, 'volume': v, 'vp': ((h + low + c) / 3) * v, 'tr': tr, 'delta': delta}
+
+    def _evaluate(self, bar):
+        c, v, delta = bar['close'], bar['volume'], bar['delta']
+
+        ema_fast = self._ema_step(self._ema_fast, self._fast_seed, self.ema_fast_length, c,
+                                  2.0 / (self.ema_fast_length + 1))
+        ema_slow = self._ema_step(self._ema_slow, self._slow_seed, self.ema_slow_length, c,
+                                  2.0 / (self.ema_slow_length + 1))
+        atr_num, atr_den, atr_seen = self._atr_step(bar['tr'])
+        atr = atr_num / atr_den if atr_seen >= self.atr_length else NAN
+
+        # VWAP skips missing volume like pandas cumsum does; None if there is none at all
+        cum_vp = self._vp.total + (0.0 if math.isnan(bar['vp']) else bar['vp'])
+        cum_vol = self._vol.total + (0.0 if math.isnan(v) else v)
+        has_volume = len(self._vol.values) > self._vol.nans or not math.isnan(v)
+        vwap = cum_vp / cum_vol if has_volume and cum_vol != 0 else None
+
+        if len(self._deltas) >= self.momentum_lag:
+            momentum = delta - self._deltas[0]
+        else:
+            momentum = 0
+
+        return {
+            'close': c,
+            'vwap': vwap,
+            'ema_fast': ema_fast,
+            'ema_slow': ema_slow,
+            'atr': atr,
+            'delta': delta,
+            'delta_ma': self._window_mean(self._delta_ma, abs(delta), self.ma_length),
+            'delta_momentum': momentum,
+            'volume': v,
+            'volume_ma': self._window_mean(self._vol_ma, v, self.ma_length),
+        }
+
+    def _commit(self, candle):
+        bar = self._bar_values(candle)
+        values = self._evaluate(bar)
+
+        self._ema_fast, self._fast_seed = _carry(self._ema_fast, self._fast_seed, values['ema_fast'], bar['close'])
+        self._ema_slow, self._slow_seed = _carry(self._ema_slow, self._slow_seed, values['ema_slow'], bar['close'])
+        self._atr = self._atr_step(bar['tr'])
+        self._prev_close = bar['close']
+
+        self._vp.push(bar['vp'])
+        self._vol.push(bar['volume'])
+        self._vol_ma.push(bar['volume'])
+        self._delta_ma.push(abs(bar['delta']))
+        self._deltas.append(bar['delta'])
+
+        self._closed_keys.append(bar_key(candle))
+        self.closed_count += 1
@@ -0,0 +1,154 @@
+"""
+Numpy indicator kernels shared by brain, scraper and the backtest code.
+
+Every kernel takes float64 arrays (oldest -> newest) and returns arrays of the same
+length with NaN where the indicator is not defined yet. Results follow pandas_ta's
+defaults within float tolerance: SMA-seeded EMA, and RSI/ATR on pandas_ta's rma
+(adjusted ewm, alpha=1/length, min_periods=length) with a NaN first true range.
+"""
+import numpy as np
+
+
+def as_array(values):
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def _first_valid(x):
+    idx = np.flatnonzero(~np.isnan(x))
+    return int(idx[0]) if len(idx) else len(x)
+
+
+def _recursive(x, alpha, start, seed):
+    """out[start] = seed, then out[i] = out[i-1] + alpha * (x[i] - out[i-1])."""
+    out = np.full(len(x), np.nan)
+    if start >= len(x):
+        return out
+    values = x.tolist()
+    result = out.tolist()
+    prev = seed
+    result[start] = prev
+    for i in range(start + 1, len(values)):
+        prev = prev + alpha * (values[i] - prev)
+        result[i] = prev
+    return np.array(result)
+
+
+# --- 1. MOVING AVERAGES ---
+def sma(x, length):
+    """Rolling mean; NaN until `length` values and wherever the window holds a NaN."""
+    x = as_array(x)
+    out = np.full(len(x), np.nan)
+    if length <= 0 or len(x) < length:
+        return out
+    nans = np.isnan(x)
+    csum = np.concatenate(([0.0], np.cumsum(np.where(nans, 0.0, x))))
+    cnan = np.concatenate(([0], np.cumsum(nans)))
+    window_sum = csum[length:] - csum[:-length]
+    window_nan = cnan[length:] - cnan[:-length]
+    out[length - 1:] = np.where(window_nan > 0, np.nan, window_sum / length)
+    return out
+
+
+def ema(x, length, alpha=None, presma=True):
+    """EMA seeded with the SMA of the first `length` valid values (pandas_ta presma)."""
+    x = as_array(x)
+    alpha = 2.0 / (length + 1) if alpha is None else alpha
+    first = _first_valid(x)
+    if presma:
+        start = first + length - 1
+        if start >= len(x):
+            return np.full(len(x), np.nan)
+        seed = float(np.nanmean(x[first:start + 1]))
+    else:
+        start = first
+        if start >= len(x):
+            return np.full(len(x), np.nan)
+        seed = float(x[start])
+    return _recursive(x, alpha, start, seed)
+
+
+def rma(x, length):
+    """Wilder's moving average as pandas_ta computes it: ewm(alpha=1/length, min_periods=length).mean()."""
+    x = as_array(x)
+    out = np.full(len(x), np.nan)
+    decay = 1.0 - 1.0 / length
+    num = den = 0.0
+    seen = 0
+    for i, value in enumerate(x.tolist()):
+        # Adjusted weights: every older value decays each step, NaNs included (ignore_na=False)
+        num *= decay
+        den *= decay
+        if value == value:
+            num += value
+            den += 1.0
+            seen += 1
+        if seen >= length:
+            out[i] = num / den
+    return out
+
+
+# --- 2. VOLATILITY ---
+def true_range(high, low, close):
+    """NaN on the first bar, which has no previous close (pandas_ta drift=1)."""
+    high, low, close = as_array(high), as_array(low), as_array(close)
+    if not len(close):
+        return np.full(0, np.nan)
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    ranges = np.vstack((high - low, np.abs(high - prev_close), np.abs(low - prev_close)))
+    tr = np.nanmax(ranges, axis=0)
+    tr[0] = np.nan
+    return tr
+
+
+def atr(high, low, close, length=14):
+    """Wilder ATR: rma of the true range; the first value is at index `length`."""
+    return rma(true_range(high, low, close), length)
+
+
+def bollinger(close, length=20, std=2.0, ddof=1):
+    """Returns (lower, mid, upper)."""
+    close = as_array(close)
+    mid = sma(close, length)
+    dev = np.full(len(close), np.nan)
+    if len(close) >= length:
+        windows = np.lib.stride_tricks.sliding_window_view(close, length)
+        dev[length - 1:] = windows.std(axis=1, ddof=ddof)
+    return mid - std * dev, mid, mid + std * dev
+
+
+# --- 3. MOMENTUM ---
+def rsi(close, length=14):
+    close = as_array(close)
+    diff = np.concatenate(([np.nan], np.diff(close)))
+    up = rma(np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0)), length)
+    down = rma(np.where(diff < 0, -diff, np.where(np.isnan(diff), np.nan, 0.0)), length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100.0 * up / (up + down)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """Returns (macd, signal, histogram); the signal EMA starts at the first valid MACD value."""
+    close = as_array(close)
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+# --- 4. VOLUME / FLOW ---
+def vwap(high, low, close, volume):
+    """Cumulative VWAP over the whole array; bars without volume are NaN."""
+    high, low, close, volume = as_array(high), as_array(low), as_array(close), as_array(volume)
+    vp = (high + low + close) / 3 * volume
+    cum_vol = np.nancumsum(volume)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = np.nancumsum(vp) / cum_vol
+    # Like pandas cumsum: running totals continue past gaps, the gap bars themselves are NaN
+    out[np.isnan(vp)] = np.nan
+    return out
+
+
+def delta_flow(open_, high, low, close, volume):
+    """Signed volume: ((close - open) / (high - low)) * volume, zero ranges count as 1."""
+    open_, high, low, close, volume = (as_array(a) for a in (open_, high, low, close, volume))
+    rng = high - low
+    return ((close - open_) / np.where(rng == 0, 1.0, rng)) * volume
@@ -0,0 +1,132 @@
+"""
+Renderer heap watch for long-running terminal tabs.
+
+The web terminal's JS heap creeps up over days until the tab crashes. A MemoryGuard
+samples the heap of the account's terminal tab every HEAP_CHECK_SECONDS and, once it
+crosses TRADING_BOT_HEAP_RELOAD_MB, asks the bot loop for a reload. The loop runs it
+only at a safe moment (no position, no order in flight, no dialog open); while the
+reload is pending no new trade is opened, so an open position is left to close on its
+own and the reload follows once the account is flat. A reload never cuts off a position.
+
+Everything the bot has built up lives in Python (candle stores, history checkpoint,
+warm-up and sync timers), so a reload only costs the page; the page bridge and the axis
+calibration re-attach on their own after it.
+"""
+import time
+
+HEAP_CHECK_SECONDS = 60
+MIN_RELOAD_INTERVAL = 600  # A heap still high right after a reload must not cause a reload loop
+
+# [used, total, limit] bytes; null where performance.memory isn't exposed
+HEAP_JS = "const m = performance.memory; return m ? [m.usedJSHeapSize, m.totalJSHeapSize, m.jsHeapSizeLimit] : null;"
+
+# True while a terminal dialog (order, position, account selection) is on screen
+DIALOG_JS = """
+return Array.from(
+    document.querySelectorAll('div.dialog, .trade-dialog-content, .position-window, .account-select-dialog'),
+    (el) => el.offsetParent !== null
+).some(Boolean);
+"""
+
+# GLOBAL STATE
+MEMORY_GUARDS = {}  # { account_id: MemoryGuard }
+
+
+def get_memory_guard(account_id):
+    """The account's guard, or None when the heap guard is off."""
+    return MEMORY_GUARDS.get(account_id)
+
+
+class MemoryGuard:
+    """`reload_func()` reloads the terminal tab and brings it back to the bot's chart; True on success."""
+
+    def __init__(self, driver, threshold_mb, reload_func):
+        self.driver = driver
+        self.threshold_mb = threshold_mb
+        self.reload_func = reload_func
+        self.heap_mb = None
+        self.peak_mb = 0.0
+        self.limit_mb = None
+        self.last_check = 0
+        self.requested_at = None  # Set when the threshold was crossed, cleared by a reload
+        self.last_reload = 0
+        self.reloads = 0
+        self.cdp_enabled = False
+
+    # --- SAMPLING ---
+    def sample(self):
+        """Used JS heap (MB) of the current tab, or None if neither source answers."""
+        used = None
+        try:
+            heap = self.driver.execute_script(HEAP_JS)
+            if heap:
+                used = heap[0]
+                self.limit_mb = round(heap[2] / 1048576, 1)
+        except Exception:
+            pass
+        if used is None:
+            try:
+                if not self.cdp_enabled:
+                    self.driver.execute_cdp_cmd("Performance.enable", {})
+                    self.cdp_enabled = True
+                metrics = self.driver.execute_cdp_cmd("Performance.getMetrics", {})['metrics']
+                used = next((m['value'] for m in metrics if m['name'] == 'JSHeapUsedSize'), None)
+            except Exception:
+                pass
+        if used is None:
+            return None
+        self.heap_mb = round(used / 1048576, 1)
+        self.peak_mb = max(self.peak_mb, self.heap_mb)
+        return self.heap_mb
+
+    def check(self, now=None):
+        """Samples when due; True while a reload is wanted."""
+        now = now or time.time()
+        if now - self.last_check >= HEAP_CHECK_SECONDS:
+            self.last_check = now
+            heap = self.sample()
+            if (heap is not None and heap >= self.threshold_mb and self.requested_at is None
+                    and now - self.last_reload >= MIN_RELOAD_INTERVAL):
+                self.requested_at = now
+        return self.pending
+
+    @property
+    def pending(self):
+        """A reload is wanted: the bot loop opens no new trade until it has run."""
+        return self.pending
+
+    # --- RELOAD ---
+    def dialog_open(self):
+        try:
+            return bool(self.driver.execute_script(DIALOG_JS))
+        except Exception:
+            return True  # Can't tell: wait for a tick where we can
+
+    def is_safe(self, trade_pending):
+        """No order or position in flight and no dialog the reload would cut off."""
+        if trade_pending:
+            return False
+        return not self.dialog_open()
+
+    def reload(self):
+        """Runs the reload; returns (ok, heap MB before, heap MB after)."""
+        before = self.heap_mb
+        try:
+            ok = self.reload_func()
+        except Exception:
+            ok = False
+        self.requested_at = None
+        self.last_reload = self.last_check = time.time()
+        self.reloads += 1
+        self.sample()
+        return ok, before, self.heap_mb
+
+    def stats(self):
+        return {
+            'heap_mb': self.heap_mb,
+            'peak_mb': self.peak_mb,
+            'limit_mb': self.limit_mb,
+            'threshold_mb': self.threshold_mb,
+            'pending': self.pending,
+            'reloads': self.reloads,
+        }
@@ -0,0 +1,198 @@
+"""
+Parallel parameter sweep over the backtest engine.
+
+The price columns are written once to .npy files and every worker process opens them
+with mmap_mode='r', so the dataset lives in the page cache once no matter how many
+workers run. Configurations are ranked by a risk-adjusted score, optionally inside
+walk-forward folds (pick the best on the train slice, report it on the next slice).
+
+Run from the project root:
+    python -m core.trading_bot.optimizer gold_m5.csv --samples 200 --folds 4 --no-dxy
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .backtest import DEFAULT_PARAMS, load_ohlcv_csv, run_backtest
+
+# Values tried for each tunable constant (names as in backtest.DEFAULT_PARAMS)
+SEARCH_SPACE = {
+    'be_trigger': [0.5, 1.0, 1.5, 2.0],
+    'trail_trigger': [2.0, 3.0, 4.0, 5.0],
+    'trail_distance': [0.5, 1.0, 1.5],
+    'sl_atr_premium': [1.0, 1.5, 2.0],
+    'sl_atr': [1.5, 2.0, 2.5],
+    'tp_atr_premium': [2.0, 3.0, 4.0],
+    'tp_atr': [3.0, 4.0, 5.0],
+    'volume_big': [1.2, 1.5, 2.0, 2.5],
+    'min_sl_gap': [10.0, 20.0, 30.0],
+}
+
+COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'dxy_change')
+
+# Worker-side dataset (memory-mapped views set by _init_worker)
+_DATA = None
+
+
+# --- 1. CANDIDATES ---
+def grid(space):
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def random_samples(space, count, seed=0):
+    """Random configurations; list values are picked from, (low, high) tuples are sampled uniformly."""
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(count):
+        config = {}
+        for key, values in space.items():
+            if isinstance(values, tuple):
+                config[key] = round(rng.uniform(*values), 4)
+            else:
+                config[key] = rng.choice(values)
+        samples.append(config)
+    return samples
+
+
+def score(stats, metric='sharpe', min_trades=20):
+    if stats['trades'] < min_trades:
+        return float('-inf')
+    if metric == 'calmar':
+        return stats['net_pnl'] / stats['max_drawdown'] if stats['max_drawdown'] > 0 else stats['net_pnl']
+    return stats[metric]
+
+
+# --- 2. SHARED DATA ---
+def write_shared_arrays(data, directory):
+    """Dumps the price columns to .npy files; returns {column: path}."""
+    paths = {}
+    for col in COLUMNS:
+        if data.get(col) is None:
+            continue
+        path = os.path.join(directory, f'{col}.npy')
+        np.save(path, np.ascontiguousarray(data[col], dtype=np.float64))
+        paths[col] = path
+    return paths
+
+
+def _init_worker(paths):
+    global _DATA
+    _DATA = {col: np.load(path, mmap_mode='r') for col, path in paths.items()}
+
+
+def _evaluate(job):
+    config, start, stop = job
+    data = {col: np.asarray(arr[start:stop]) for col, arr in _DATA.items()}
+    stats = run_backtest(data, config)['stats']
+    return config, stats
+
+
+# --- 3. SWEEPS ---
+def walk_forward_splits(n, folds, warmup):
+    """
+    Rolling (train, test) index ranges: the data is cut into folds + 1 equal blocks and
+    each fold trains on one block and tests on the next. Test ranges start `warmup`
+    bars early so indicators are warm at the first tested bar.
+    """
+    block = n // (folds + 1)
+    splits = []
+    for k in range(folds):
+        train = (k * block, (k + 1) * block)
+        test_stop = (k + 2) * block if k < folds - 1 else n
+        test = (max(train[1] - warmup, 0), test_stop)
+        splits.append((train, test))
+    return splits
+
+
+def run_sweep(data, configs, base_params=None, workers=None, metric='sharpe', min_trades=20, folds=0):
+    """
+    Evaluates every config over the dataset (or each walk-forward fold) in a process pool.
+    Returns {'ranking': [...], 'folds': [...]}; ranking is sorted best-first.
+    """
+    base = {**(base_params or {})}
+    configs = [{**base, **c} for c in configs]
+    n = len(data['close'])
+    warmup = base.get('window', DEFAULT_PARAMS['window']) - 1
+
+    with tempfile.TemporaryDirectory(prefix='bot_sweep_') as tmp:
+        paths = write_shared_arrays(data, tmp)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(paths,)) as pool:
+            if not folds:
+                results = list(pool.map(_evaluate, [(c, 0, n) for c in configs], chunksize=4))
+                ranking = _rank(results, metric, min_trades)
+                return {'ranking': ranking, 'folds': []}
+
+            fold_reports = []
+            for train, test in walk_forward_splits(n, folds, warmup):
+                results = list(pool.map(_evaluate, [(c, train[0], train[1]) for c in configs], chunksize=4))
+                ranking = _rank(results, metric, min_trades)
+                best = ranking[0]
+                _, test_stats = next(pool.map(_evaluate, [(best['params'], test[0], test[1])]))
+                fold_reports.append({
+                    'train': train,
+                    'test': test,
+                    'params': best['params'],
+                    'train_stats': best['stats'],
+                    'test_stats': test_stats,
+                    'test_score': score(test_stats, metric, 0),
+                })
+
+    # Configs chosen on more folds first, then by their mean out-of-sample score
+    by_config = {}
+    for report in fold_reports:
+        key = json.dumps(report['params'], sort_keys=True)
+        entry = by_config.setdefault(key, {'params': report['params'], 'folds': 0, 'scores': []})
+        entry['folds'] += 1
+        entry['scores'].append(report['test_score'])
+    ranking = sorted(
+        ({'params': e['params'], 'folds': e['folds'], 'score': float(np.mean(e['scores']))} for e in by_config.values()),
+        key=lambda e: (e['folds'], e['score']), reverse=True
+    )
+    return {'ranking': ranking, 'folds': fold_reports}
+
+
+def _rank(results, metric, min_trades):
+    ranked = [{'params': c, 'stats': s, 'score': score(s, metric, min_trades)} for c, s in results]
+    ranked.sort(key=lambda r: r['score'], reverse=True)
+    return ranked
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Parameter sweep for the brain rules over an OHLCV CSV.')
+    parser.add_argument('csv')
+    parser.add_argument('--samples', type=int, default=0, help='Random configs to try (0 = full grid)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--folds', type=int, default=0, help='Walk-forward folds (0 = whole dataset)')
+    parser.add_argument('--metric', default='sharpe', choices=['sharpe', 'calmar', 'net_pnl', 'profit_factor'])
+    parser.add_argument('--min-trades', type=int, default=20)
+    parser.add_argument('--dxy-column')
+    parser.add_argument('--no-dxy', action='store_true')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', help='Write the full report to this file')
+    args = parser.parse_args(argv)
+
+    data = load_ohlcv_csv(args.csv, args.dxy_column)
+    configs = random_samples(SEARCH_SPACE, args.samples, args.seed) if args.samples else grid(SEARCH_SPACE)
+    report = run_sweep(
+        data, configs, {'require_dxy': not args.no_dxy},
+        workers=args.workers, metric=args.metric, min_trades=args.min_trades, folds=args.folds
+    )
+
+    for row in report['ranking'][:args.top]:
+        print(json.dumps({k: v for k, v in row.items() if k != 'params'}), json.dumps(row['params']))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+import time
+
+from .chart_axis import get_axis_calibration
+from .scraper import (
+    CANDLE_PARSER_JS, TerminalSnapshot,
+    _cache_candles, _candles_from_raw, _clean_price, _parse_money, _position_from_cells, get_terminal_snapshot
+)
+
+# GLOBAL STATE
+PAGE_BRIDGES = {}  # { account_id: PageBridge }
+
+BRIDGE_VERSION = 3
+
+# Installs window.__cyborgBridge: MutationObservers on the chart, the order-button prices,
+# the account summary and the positions table. Changes are queued as small events and
+# drain() hands them over (and clears the queue) in one call.
+BRIDGE_JS = CANDLE_PARSER_JS + """
+if (window.__cyborgBridge && window.__cyborgBridge.version === %(version)d) return true;
+if (window.__cyborgBridge) window.__cyborgBridge.disconnect();
+
+const TAIL_CHILDREN = %(tail)d;   // Last children (rect + line per bar) re-read on a forming-bar tick
+const MAX_EVENTS = %(max_events)d;
+
+const SELECTORS = {
+    chart: 'g.candlestick-plot, .highcharts-series-group',
+    ask: '.order-control .order-button.buy .price',
+    bid: '.order-control .order-button.sell .price',
+    balance: '.summary-cell.balance .amount-label-text',
+    equity: '.summary-cell.equity .amount-label-text',
+    positions: '.positions-table',
+};
+
+const bridge = {
+    version: %(version)d,
+    events: [],
+    overflow: false,
+    targets: {},
+    observers: {},
+    chartChildren: 0,
+    rows: new Map(),
+    rowsLoaded: false,  // The first positions read after install/overflow is state, not news
+};
+
+function push(event, coalesce) {
+    // Keep only the newest event of the same kind (prices, account, forming bar)
+    if (coalesce) {
+        for (let i = bridge.events.length - 1; i >= 0; i--) {
+            if (coalesce(bridge.events[i])) { bridge.events.splice(i, 1); break; }
+        }
+    }
+    if (bridge.events.length >= MAX_EVENTS) {
+        // Python stopped draining: drop the backlog and re-emit full state on the next attach()
+        bridge.events = []; bridge.overflow = true;
+        bridge.targets = {}; bridge.rows = new Map(); bridge.rowsLoaded = false;
+    }
+    bridge.events.push(event);
+}
+
+function fullBars(chart) {
+    bridge.chartChildren = chart.children.length;
+    // A full read supersedes every queued bar event
+    bridge.events = bridge.events.filter((e) => e.t !== 'bars');
+    push({t: 'bars', full: true, bars: parseCandles(chart) || []});
+}
+
+function onChart(records) {
+    const chart = bridge.targets.chart;
+    const children = chart.children;
+    if (children.length !== bridge.chartChildren) return fullBars(chart);
+
+    // Forming-bar ticks only touch the last rect/line; anything else (rescale, scroll) needs a full read
+    const tailStart = children.length - TAIL_CHILDREN;
+    for (const r of records) {
+        let el = r.target;
+        while (el && el.parentNode !== chart) el = el.parentNode;
+        if (!el || Array.prototype.indexOf.call(children, el) < tailStart) return fullBars(chart);
+    }
+    push({t: 'bars', full: false, tail: parseCandles(chart, TAIL_CHILDREN) || []},
+         (e) => e.t === 'bars' && !e.full);
+}
+
+function onText(kind) {
+    return () => {
+        const el = bridge.targets[kind];
+        push({t: kind, text: el ? el.textContent : null}, (e) => e.t === kind);
+    };
+}
+
+function readRows() {
+    const rows = new Map();
+    let idx = 0;
+    for (const row of document.querySelectorAll(SELECTORS.positions + ' .data-table-row')) {
+        const cells = Array.from(row.querySelectorAll('span'), (c) => c.innerText);
+        rows.set(cells[0] || ('row' + idx), cells);
+        idx++;
+    }
+    return rows;
+}
+
+function onPositions() {
+    // Table not rendered (other tab selected, page loading): no news either way
+    if (!bridge.targets.positions) return;
+    const rows = readRows();
+    const initial = !bridge.rowsLoaded;
+    bridge.rowsLoaded = true;
+    for (const [ticket, cells] of rows) {
+        const old = bridge.rows.get(ticket);
+        if (!old) push({t: 'position', op: 'open', ticket, cells, initial});
+        else if (old.join('|') !== cells.join('|')) {
+            push({t: 'position', op: 'update', ticket, cells},
+                 (e) => e.t === 'position' && e.op === 'update' && e.ticket === ticket);
+        }
+    }
+    for (const ticket of bridge.rows.keys()) {
+        if (!rows.has(ticket)) push({t: 'position', op: 'close', ticket});
+    }
+    bridge.rows = rows;
+}
+
+const HANDLERS = {
+    chart: [onChart, {childList: true, subtree: true, attributes: true}],
+    ask: [onText('ask'), {childList: true, subtree: true, characterData: true}],
+    bid: [onText('bid'), {childList: true, subtree: true, characterData: true}],
+    balance: [onText('balance'), {childList: true, subtree: true, characterData: true}],
+    equity: [onText('equity'), {childList: true, subtree: true, characterData: true}],
+    positions: [onPositions, {childList: true, subtree: true, characterData: true}],
+};
+
+bridge.attach = function () {
+    // (Re)binds observers to elements the app has (re)rendered since the last call
+    const attached = {};
+    for (const kind in HANDLERS) {
+        const el = document.querySelector(SELECTORS[kind]);
+        if (el !== bridge.targets[kind]) {
+            if (bridge.observers[kind]) bridge.observers[kind].disconnect();
+            delete bridge.observers[kind];
+            bridge.targets[kind] = el;
+            const [handler, options] = HANDLERS[kind];
+            if (el) {
+                const obs = new MutationObserver(handler);
+                obs.observe(el, options);
+                bridge.observers[kind] = obs;
+            }
+            // Emit the current state of a newly bound (or vanished) target
+            if (kind === 'chart') { if (el) fullBars(el); }
+            else handler([]);
+        }
+        attached[kind] = !!el;
+    }
+    return attached;
+};
+
+bridge.drain = function (axisKey) {
+    const attached = bridge.attach();
+    const axis = bridge.targets.chart ? readAxis(bridge.targets.chart, axisKey) : null;
+    const out = {events: bridge.events, overflow: bridge.overflow, attached, axis};
+    bridge.events = [];
+    bridge.overflow = false;
+    return out;
+};
+
+bridge.disconnect = function () {
+    for (const kind in bridge.observers) bridge.observers[kind].disconnect();
+    bridge.observers = {};
+};
+
+window.__cyborgBridge = bridge;
+return true;
+""" % {'version': BRIDGE_VERSION, 'tail': 6, 'max_events': 5000}
+
+DRAIN_JS = "return window.__cyborgBridge ? window.__cyborgBridge.drain(arguments[0]) : null;"
+
+
+def get_page_bridge(account_id, driver):
+    bridge = PAGE_BRIDGES.get(account_id)
+    if bridge is None or bridge.driver is not driver:
+        bridge = PageBridge(driver, get_axis_calibration(account_id))
+        PAGE_BRIDGES[account_id] = bridge
+    return bridge
+
+
+class PageBridge:
+    """
+    Python side of the in-page observer: applies the drained deltas to a local copy of
+    the terminal state, so each tick moves only what changed across WebDriver.
+    """
+
+    def __init__(self, driver, axis):
+        self.driver = driver
+        self.axis = axis  # The account's main-chart AxisCalibration
+        self._reset()
+
+    def _reset(self):
+        self.bars = []
+        self.ask = None
+        self.bid = None
+        self.balance = 0.0
+        self.equity = 0.0
+        self.positions = {}  # ticket -> span texts, in table order
+        self.attached = {}
+        self.installed = False
+        self.last_events = []
+
+    @property
+    def ready(self):
+        return self.installed and self.attached.get('chart') and bool(self.bars)
+
+    def install(self):
+        self.driver.execute_script(BRIDGE_JS)
+        self.installed = True
+
+    def poll(self):
+        """Drains the page queue into local state and returns the applied events (installs the bridge if missing)."""
+        result = self.driver.execute_script(DRAIN_JS, self.axis.key)
+        if result is None:
+            # First call, or the page was reloaded and the bridge is gone
+            self._reset()
+            self.install()
+            result = self.driver.execute_script(DRAIN_JS, self.axis.key)
+        if result.get('overflow'):
+            # Events were dropped; the same drain carries a full re-read of every target
+            self.bars = []
+            self.positions = {}
+        self.attached = result.get('attached', {})
+        self.axis.update(result.get('axis'))
+
+        events = result.get('events') or []
+        for event in events:
+            self._apply(event)
+        self.last_events = events
+        return events
+
+    def _apply(self, event):
+        kind = event['t']
+        if kind == 'bars':
+            if event['full']:
+                self.bars = event['bars']
+            elif len(self.bars) >= len(event['tail']):
+                self.bars[len(self.bars) - len(event['tail']):] = event['tail']
+        elif kind in ('ask', 'bid'):
+            setattr(self, kind, _clean_price(event['text']))
+        elif kind in ('balance', 'equity'):
+            try:
+                setattr(self, kind, _parse_money(event['text']) if event['text'] else 0.0)
+            except ValueError: pass
+        elif kind == 'position':
+            if event['op'] == 'close':
+                self.positions.pop(event['ticket'], None)
+            else:
+                self.positions[event['ticket']] = event['cells']
+
+    def position_changes(self):
+        """
+        Open/close events from the last poll, e.g. [('open', '#123'), ('close', '#120')].
+        Positions loaded by the first read after an install (page load, reload) or an
+        overflow were already open and are not reported.
+        """
+        return [
+            (e['op'], e['ticket']) for e in self.last_events
+            if e['t'] == 'position' and e['op'] != 'update' and not e.get('initial')
+        ]
+
+    def snapshot(self):
+        snap = TerminalSnapshot(
+            bid=self.bid, ask=self.ask, balance=self.balance, equity=self.equity, taken_at=time.time()
+        )
+        for cells in self.positions.values():
+            try:
+                trade = _position_from_cells(cells)
+                if trade: snap.positions.append(trade)
+            except Exception: continue
+        if self.bars:
+            snap.candles = _candles_from_raw(self.bars, calibration=self.axis)
+            _cache_candles(snap.candles, self.axis)
+        return snap
+
+    def read(self):
+        """Snapshot from the bridged state; a full get_terminal_snapshot while the bridge isn't usable."""
+        start = time.perf_counter()
+        try:
+            self.poll()
+        except Exception:
+            self.installed = False
+            return get_terminal_snapshot(self.driver, self.axis)
+        if not self.ready:
+            return get_terminal_snapshot(self.driver, self.axis)
+        snap = self.snapshot()
+        snap.elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+        return snap
@@ -0,0 +1,108 @@
+"""
+Resident memory and CPU time of browser process trees, read straight from /proc
+(Linux hosts, no extra dependency). Elsewhere every figure comes back as None.
+"""
+import os
+import time
+
+PAGE_KB = os.sysconf('SC_PAGE_SIZE') // 1024 if hasattr(os, 'sysconf') else 4
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def children_map():
+    """{ ppid: [pid, ...] } for every process visible in /proc."""
+    children = {}
+    if not os.path.isdir('/proc'):
+        return children
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as f:
+                # The command name may contain spaces; fields after ')' are fixed
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(name))
+    return children
+
+
+def process_tree(pid, children=None):
+    """pid and all its descendants (a Chrome browser plus its renderer/GPU/utility processes)."""
+    if children is None:
+        children = children_map()
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, ()))
+    return tree
+
+
+def rss_mb(pids):
+    """Summed resident memory (MB) of the given pids; processes that exited are skipped."""
+    total_kb = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                total_kb += int(f.read().split()[1]) * PAGE_KB
+        except (OSError, IndexError, ValueError):
+            continue
+    return round(total_kb / 1024, 1)
+
+
+def cpu_seconds(pids):
+    """Summed user + system CPU time (s) the given pids have used so far."""
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            total += int(fields[11]) + int(fields[12])  # utime, stime
+        except (OSError, IndexError, ValueError):
+            continue
+    return total / CLOCK_TICKS
+
+
+def driver_pid(driver):
+    """Chrome's pid for an undetected_chromedriver driver, else the chromedriver service pid."""
+    pid = getattr(driver, 'browser_pid', None)
+    if pid:
+        return pid
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+def driver_rss_mb(driver, children=None):
+    if not os.path.isdir('/proc'):
+        return None
+    pid = driver_pid(driver)
+    if pid is None:
+        return None
+    return rss_mb(process_tree(pid, children))
+
+
+class UsageMeter:
+    """RSS and CPU share of one driver's browser tree; CPU % is over the time since the previous sample."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.last_cpu = None
+        self.last_at = None
+
+    def sample(self):
+        if not os.path.isdir('/proc'):
+            return None
+        pid = driver_pid(self.driver)
+        if pid is None:
+            return None
+        pids = process_tree(pid)
+        now, cpu = time.time(), cpu_seconds(pids)
+        cpu_pct = None
+        if self.last_at is not None and now > self.last_at:
+            # Exited renderers take their CPU time with them; clamp instead of going negative
+            cpu_pct = round(max(0.0, cpu - self.last_cpu) / (now - self.last_at) * 100, 1)
+        self.last_cpu, self.last_at = cpu, now
+        return {'rss_mb': rss_mb(pids), 'cpu_pct': cpu_pct, 'cpu_seconds': round(cpu, 1), 'processes': len(pids)}
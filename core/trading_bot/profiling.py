@@ -0,0 +1,89 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+WINDOW = 500  # Samples kept per component
+LOG_SAMPLE_EVERY = 100  # Log 1 in N messages per key
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250)
+
+# GLOBAL STATE
+COMPONENT_TIMERS = {}  # { account_id: ComponentTimer }
+TIMINGS_IN_UPDATES = set()  # account_ids whose analysis_update payload carries timings
+_LOG_COUNTERS = {}
+
+
+def get_component_timer(account_id):
+    timer = COMPONENT_TIMERS.get(account_id)
+    if timer is None:
+        timer = ComponentTimer()
+        COMPONENT_TIMERS[account_id] = timer
+    return timer
+
+
+def set_timings_in_updates(account_id, enabled):
+    if enabled:
+        TIMINGS_IN_UPDATES.add(account_id)
+    else:
+        TIMINGS_IN_UPDATES.discard(account_id)
+
+
+def log_sampled(logger, level, key, msg, *args, every=LOG_SAMPLE_EVERY):
+    """Logs the first message for `key` and then one in every `every`."""
+    if not logger.isEnabledFor(level):
+        return
+    count = _LOG_COUNTERS.get(key, 0)
+    _LOG_COUNTERS[key] = count + 1
+    if count % every == 0:
+        logger.log(level, msg, *args)
+
+
+class ComponentTimer:
+    """Rolling per-component latency samples (monotonic clock) with percentile/histogram snapshots."""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+
+    def record(self, name, seconds):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+        samples.append(seconds)
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    @contextmanager
+    def measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def reset(self):
+        self.samples.clear()
+        self.counts.clear()
+
+    def snapshot(self, histogram=False):
+        """{ component: {count, last_ms, p50_ms, p90_ms, p99_ms, max_ms[, histogram]} } over the window."""
+        out = {}
+        for name, samples in self.samples.items():
+            if not samples: continue
+            ms = np.fromiter(samples, dtype=float, count=len(samples)) * 1000.0
+            p50, p90, p99 = np.percentile(ms, (50, 90, 99))
+            stats = {
+                'count': self.counts[name],
+                'last_ms': round(float(ms[-1]), 4),
+                'p50_ms': round(float(p50), 4),
+                'p90_ms': round(float(p90), 4),
+                'p99_ms': round(float(p99), 4),
+                'max_ms': round(float(ms.max()), 4),
+            }
+            if histogram:
+                counts = np.bincount(np.searchsorted(BUCKETS_MS, ms), minlength=len(BUCKETS_MS) + 1)
+                labels = [f'<={b}' for b in BUCKETS_MS] + [f'>{BUCKETS_MS[-1]}']
+                stats['histogram'] = dict(zip(labels, counts.tolist()))
+            out[name] = stats
+        return out
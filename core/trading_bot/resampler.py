@@ -0,0 +1,85 @@
+import numpy as np
+
+from .candle_buffer import CandleBuffer
+
+# Bar length in seconds per timeframe label
+TIMEFRAMES = {
+    'm1': 60,
+    'm5': 300,
+    'm15': 900,
+    'm30': 1800,
+    'h1': 3600,
+    'h4': 14400,
+    'd1': 86400,
+}
+
+
+def align(time_ms, timeframe):
+    """Open time (ms) of the `timeframe` bar containing time_ms (UTC boundaries)."""
+    period = TIMEFRAMES[timeframe] * 1000
+    return (int(time_ms) // period) * period
+
+
+def _columns(candles):
+    if isinstance(candles, CandleBuffer):
+        return candles.view()
+    fields = ('time', 'open', 'high', 'low', 'close', 'volume', 'delta')
+    return {f: np.array([c.get(f, np.nan) for c in candles], dtype=float) for f in fields}
+
+
+def resample(candles, timeframe, partial_first=False):
+    """
+    Builds `timeframe` bars from lower-timeframe candles (list of dicts or CandleBuffer,
+    oldest -> newest, times in ms). Bars are keyed by their aligned open time; the last
+    one is the forming bar. The first bar is dropped when the source starts after its
+    open (it would be missing its real open/high/low) unless partial_first is set.
+    Returns candle dicts like the scraper's.
+    """
+    cols = _columns(candles)
+    times = cols['time']
+    if not len(times):
+        return []
+
+    period = TIMEFRAMES[timeframe] * 1000
+    buckets = (times // period) * period
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    ends = np.concatenate((starts[1:], [len(times)])) - 1
+
+    out = {
+        'time': buckets[starts],
+        'open': cols['open'][starts],
+        'high': np.maximum.reduceat(cols['high'], starts),
+        'low': np.minimum.reduceat(cols['low'], starts),
+        'close': cols['close'][ends],
+    }
+    # Volume and tick delta add up over the bars that have them (NaN if none do)
+    for f in ('volume', 'delta'):
+        has_value = ~np.isnan(cols[f])
+        total = np.add.reduceat(np.where(has_value, cols[f], 0.0), starts)
+        seen = np.add.reduceat(has_value.astype(int), starts)
+        out[f] = np.where(seen > 0, total, np.nan)
+
+    first = 1 if not partial_first and times[0] > buckets[0] else 0
+
+    bars = []
+    for i in range(first, len(starts)):
+        bar = {
+            'time': int(out['time'][i]),
+            'open': float(out['open'][i]),
+            'high': float(out['high'][i]),
+            'low': float(out['low'][i]),
+            'close': float(out['close'][i]),
+        }
+        for f in ('volume', 'delta'):
+            if not np.isnan(out[f][i]):
+                bar[f] = float(out[f][i])
+        bars.append(bar)
+    return bars
+
+
+def resample_into(buffer, candles, timeframe):
+    """Resamples `candles` and merges the result into `buffer` (older backfilled bars are kept)."""
+    bars = resample(candles, timeframe)
+    if bars:
+        buffer.merge(bars)
+    return bars
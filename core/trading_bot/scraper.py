@@ -1,68 +1,83 @@
 import time
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import List, Optional
+import numpy as np
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from . import indicators
+from .candle_buffer import CandleBuffer
+from .chart_axis import AXIS_JS, AxisCalibration, get_axis_calibration
+from .resampler import TIMEFRAMES, resample
+
 # --- GLOBAL CONTEXT & CACHE ---
 # Added 'strategy' default
 MTF_CONTEXT = { "h1": "UNKNOWN", "m15": "UNKNOWN", "m5": "UNKNOWN", "strategy": "NORMAL" }
-CANDLE_CACHE = [] 
+CANDLE_CACHE = CandleBuffer(capacity=200)  # Last good M5 parse
+CHART_WINDOWS = {}  # { account_id: { "m5": main_handle, "h1": handle, "m15": handle } } pinned chart tabs
+M5_INTERVAL_MS = 5 * 60 * 1000
+CHART_SELECTOR = "g.candlestick-plot, .highcharts-series-group"
 
 # --- 1. MACD & MATH CALCULATION (YOUR CODE) ---
 def calculate_ema(prices, days, smoothing=2):
     if not prices: return []
-    ema = [sum(prices[:days]) / days]
-    multiplier = smoothing / (days + 1)
-    for price in prices[days:]:
-        ema.append((price - ema[-1]) * multiplier + ema[-1])
-    return ema
+    ema = indicators.ema(prices, days, alpha=smoothing / (days + 1))
+    return ema[days - 1:].tolist()
 
 def get_macd_data(candles):
     if not candles or len(candles) < 35: return {'macd': [], 'signal': [], 'hist': []}
     try:
-        closes = [float(c['close']) for c in candles]
-        ema12 = calculate_ema(closes, 12)
-        ema26 = calculate_ema(closes, 26)
-        min_len = min(len(ema12), len(ema26))
-        macd_line = [e12 - e26 for e12, e26 in zip(ema12[-min_len:], ema26[-min_len:])]
-        signal_line = calculate_ema(macd_line, 9)
-        min_sig = min(len(macd_line), len(signal_line))
-        histogram = [m - s for m, s in zip(macd_line[-min_sig:], signal_line[-min_sig:])]
-        return { 'macd': macd_line[-50:], 'signal': signal_line[-50:], 'hist': histogram[-50:] }
+        closes = indicators.as_array([c['close'] for c in candles])
+        macd_line, signal_line, histogram = indicators.macd(closes, 12, 26, 9)
+        # Same lengths as before: MACD from the slow EMA's first value, signal/hist 8 bars later
+        valid = ~np.isnan(histogram)
+        return {
+            'macd': macd_line[~np.isnan(macd_line)][-50:].tolist(),
+            'signal': signal_line[valid][-50:].tolist(),
+            'hist': histogram[valid][-50:].tolist()
+        }
     except:
         return {'macd': [], 'signal': [], 'hist': []}
 
 # --- 2. PRECISE PRICE FINDER (YOUR CODE) ---
+def _clean_price(raw_text):
+    clean_price = (raw_text or "").strip().replace("\n", "").replace(" ", "")
+    if clean_price and clean_price.replace(".", "").isdigit():
+        return float(clean_price)
+    return None
+
 def get_real_price(driver):
     try:
         price_el = driver.find_element(By.CSS_SELECTOR, ".order-control .order-button.buy .price")
         raw_text = driver.execute_script("return arguments[0].textContent;", price_el)
-        clean_price = raw_text.strip().replace("\n", "").replace(" ", "")
-        if clean_price and clean_price.replace(".", "").isdigit():
-            return float(clean_price)
+        price = _clean_price(raw_text)
+        if price is not None: return price
     except:
         try:
             price_el = driver.find_element(By.CSS_SELECTOR, ".order-control .order-button.sell .price")
             raw_text = driver.execute_script("return arguments[0].textContent;", price_el)
-            clean_price = raw_text.strip().replace("\n", "").replace(" ", "")
-            if clean_price and clean_price.replace(".", "").isdigit():
-                return float(clean_price)
+            price = _clean_price(raw_text)
+            if price is not None: return price
         except: pass
     return "0.00"
 
 # --- 3. BALANCE & METRICS (YOUR CODE) ---
+def _parse_money(text):
+    return float(text.replace('$','').replace(',','').strip())
+
 def get_account_metrics(driver):
     metrics = {"balance": 0.0, "equity": 0.0}
     try:
         try:
             bal_el = driver.find_element(By.CSS_SELECTOR, ".summary-cell.balance .amount-label-text")
-            metrics['balance'] = float(bal_el.text.replace('$','').replace(',','').strip())
+            metrics['balance'] = _parse_money(bal_el.text)
         except: pass
         
         try:
             eq_el = driver.find_element(By.CSS_SELECTOR, ".summary-cell.equity .amount-label-text")
-            metrics['equity'] = float(eq_el.text.replace('$','').replace(',','').strip())
+            metrics['equity'] = _parse_money(eq_el.text)
         except: pass
 
         if metrics['balance'] == 0:
@@ -94,33 +109,37 @@ def get_active_positions(driver):
         rows = driver.find_elements(By.CSS_SELECTOR, ".positions-table .data-table-row")
         for row in rows:
             try:
-                cells = row.find_elements(By.TAG_NAME, "span")
-                if len(cells) < 14: continue 
-                
-                pnl_text = "0.00"
-                for cell in cells:
-                    txt = cell.text
-                    if "$" in txt and ("+" in txt or "−" in txt or "-" in txt):
-                        pnl_text = txt.replace('$', '').replace('−', '-').replace(' ', '')
-                        break
-                
-                if pnl_text == "0.00" and len(cells) > 14:
-                     pnl_text = cells[14].text.replace('$', '').replace('−', '-').replace(' ', '')
-
-                trades.append({
-                    "ticket_id": cells[0].text.strip() or f"#{int(time.time())}", 
-                    "symbol": cells[2].text.strip(),
-                    "direction": cells[3].text.strip().upper(),
-                    "volume": cells[4].text.strip(),
-                    "open_price": cells[5].text.strip(),
-                    "current_price": cells[6].text.strip(),
-                    "profit": pnl_text,
-                    "entry": cells[5].text.strip()
-                })
+                cells = [cell.text for cell in row.find_elements(By.TAG_NAME, "span")]
+                trade = _position_from_cells(cells)
+                if trade: trades.append(trade)
             except: continue
     except: pass
     return trades
 
+def _position_from_cells(cells):
+    """One positions-table row (span texts, in order) -> trade dict; None for short rows."""
+    if len(cells) < 14: return None
+    
+    pnl_text = "0.00"
+    for txt in cells:
+        if "$" in txt and ("+" in txt or "−" in txt or "-" in txt):
+            pnl_text = txt.replace('$', '').replace('−', '-').replace(' ', '')
+            break
+    
+    if pnl_text == "0.00" and len(cells) > 14:
+         pnl_text = cells[14].replace('$', '').replace('−', '-').replace(' ', '')
+
+    return {
+        "ticket_id": cells[0].strip() or f"#{int(time.time())}", 
+        "symbol": cells[2].strip(),
+        "direction": cells[3].strip().upper(),
+        "volume": cells[4].strip(),
+        "open_price": cells[5].strip(),
+        "current_price": cells[6].strip(),
+        "profit": pnl_text,
+        "entry": cells[5].strip()
+    }
+
 def check_for_active_trades(driver):
     return len(get_active_positions(driver)) > 0
 
@@ -179,76 +198,100 @@ def switch_timeframe(driver, tf_name, log_func=None, account_id=None):
     if log_func: log_func(account_id, f"❌ Could not switch to {tf_name}")
     return False
 # --- 6. CANDLE PARSER (YOUR CODE PRESERVED) ---
-def parse_candles(driver, use_cache=True):
-    global CANDLE_CACHE
+# SVG candles -> [{high, low, open, close}] (y axis flipped); shared with the terminal snapshot.
+# Values are pixels until an AxisCalibration (chart_axis.py) maps them to prices.
+CANDLE_PARSER_JS = AXIS_JS + """
+function parseBar(rect) {
+    let line = rect.previousElementSibling;
+    if (!line || line.tagName !== 'line') line = rect.nextElementSibling;
+    if (!line || line.tagName !== 'line') return null;
+    const y1 = parseFloat(line.getAttribute('y1'));
+    const y2 = parseFloat(line.getAttribute('y2'));
+    const rectY = parseFloat(rect.getAttribute('y'));
+    const rectH = parseFloat(rect.getAttribute('height'));
+    const fill = rect.getAttribute('fill');
+    const offset = 10000; 
+    const high = offset - Math.min(y1, y2);
+    const low = offset - Math.max(y1, y2);
+    const bodyTop = offset - rectY;
+    const bodyBottom = offset - (rectY + rectH);
+    let open, close;
+    if (fill === '#109a21' || fill.includes('green')) { 
+        open = bodyBottom; close = bodyTop; 
+    } else { 
+        open = bodyTop; close = bodyBottom; 
+    }
+    return { high, low, open, close };
+}
+
+function parseCandles(container, limit) {
+    const children = container.children;
+    const data = [];
+    // If children is empty, return null to trigger python retry
+    if (children.length === 0) return null; 
+
+    const startIdx = Math.max(0, children.length - (limit || 200));
+    for (let i = startIdx; i < children.length; i++) {
+        if (children[i].tagName === 'rect') {
+            const bar = parseBar(children[i]);
+            if (bar) data.push(bar);
+        }
+    }
+    return data;
+}
+"""
+
+def _cache_candles(candles, calibration):
+    """Keeps a parse as the fallback, unless it is pixel bars from a chart that had a fit."""
+    # The cache keeps no calibration flag, so pixel bars in it would reach the store as prices
+    if calibration.valid or not calibration.fits:
+        CANDLE_CACHE.load(candles)
+
+def _candles_from_raw(raw_data, interval_ms=M5_INTERVAL_MS, calibration=None):
+    """Stamps the newest 120 parsed bars with open times; the last bar is the one forming now."""
+    # Open time of the current bar, so times sit on bar boundaries (needed for resampling)
+    last_open_ms = (int(time.time() * 1000) // interval_ms) * interval_ms
+    raw_data = raw_data[-120:]
+    if calibration: raw_data = calibration.apply(raw_data)
+    # Tells CandleStore whether these are prices or still pixels (no calibration = unknown)
+    calibrated = calibration.valid if calibration else None
     candles = []
+    for idx, c in enumerate(raw_data):
+        time_offset = (len(raw_data) - 1 - idx) * interval_ms
+        candles.append({
+            'time': last_open_ms - time_offset, 
+            'open': c['open'], 
+            'high': c['high'], 
+            'low': c['low'], 
+            'close': c['close'],
+            **({'calibrated': calibrated} if calibrated is not None else {})
+        })
+    return candles
+
+def parse_candles(driver, use_cache=True, interval_ms=M5_INTERVAL_MS, calibration=None):
+    """`calibration`: the account's AxisCalibration for this chart (a one-off fit when omitted)."""
+    candles = []
+    calibration = calibration or AxisCalibration()
     
     # RETRY LOOP: Try 3 times to find candles (Wait up to 3 seconds)
     for attempt in range(3):
         try:
             # 1. Find the container
-            container = driver.find_element(By.CSS_SELECTOR, "g.candlestick-plot, .highcharts-series-group")
+            container = driver.find_element(By.CSS_SELECTOR, CHART_SELECTOR)
             
-            # 2. Run the Parsing Script
-            script = """
-            const children = arguments[0].children;
-            const data = [];
-            // If children is empty, return null to trigger python retry
-            if (children.length === 0) return null; 
-
-            const startIdx = Math.max(0, children.length - 200);
-            for (let i = startIdx; i < children.length; i++) {
-                const el = children[i];
-                if (el.tagName === 'rect') {
-                    const rect = el;
-                    let line = rect.previousElementSibling;
-                    if (!line || line.tagName !== 'line') line = rect.nextElementSibling;
-                    if (line && line.tagName === 'line') {
-                        const y1 = parseFloat(line.getAttribute('y1'));
-                        const y2 = parseFloat(line.getAttribute('y2'));
-                        const rectY = parseFloat(rect.getAttribute('y'));
-                        const rectH = parseFloat(rect.getAttribute('height'));
-                        const fill = rect.getAttribute('fill');
-                        const offset = 10000; 
-                        const high = offset - Math.min(y1, y2);
-                        const low = offset - Math.max(y1, y2);
-                        const bodyTop = offset - rectY;
-                        const bodyBottom = offset - (rectY + rectH);
-                        let open, close;
-                        if (fill === '#109a21' || fill.includes('green')) { 
-                            open = bodyBottom; close = bodyTop; 
-                        } else { 
-                            open = bodyTop; close = bodyBottom; 
-                        }
-                        data.push({ high, low, open, close });
-                    }
-                }
-            }
-            return data;
-            """
-            raw_data = driver.execute_script(script, container)
+            # 2. Run the Parsing Script (axis labels only come back when the chart layout changed)
+            result = driver.execute_script(
+                CANDLE_PARSER_JS + "return {bars: parseCandles(arguments[0]), axis: readAxis(arguments[0], arguments[1])};",
+                container, calibration.key
+            )
+            raw_data = result['bars']
             
             # 3. Validation: If we got data, break the loop!
             if raw_data and len(raw_data) > 0:
-                # Process the data (Same as before)
-                now_ms = int(time.time() * 1000)
-                interval_ms = 5 * 60 * 1000 
-                raw_data = raw_data[-120:]
-                
-                temp_candles = []
-                for idx, c in enumerate(raw_data):
-                    time_offset = (len(raw_data) - 1 - idx) * interval_ms
-                    temp_candles.append({
-                        'time': now_ms - time_offset, 
-                        'open': c['open'], 
-                        'high': c['high'], 
-                        'low': c['low'], 
-                        'close': c['close']
-                    })
-                
                 # Save to cache and return
-                candles = temp_candles
-                CANDLE_CACHE = candles
+                calibration.update(result['axis'])
+                candles = _candles_from_raw(raw_data, interval_ms, calibration)
+                if interval_ms == M5_INTERVAL_MS: _cache_candles(candles, calibration)
                 return candles
 
         except Exception:
@@ -258,40 +301,169 @@ def parse_candles(driver, use_cache=True):
         time.sleep(1)
 
     # Fallback to cache if all 3 attempts failed
-    if use_cache: return CANDLE_CACHE
+    if use_cache: return CANDLE_CACHE.to_dicts()
     return []
 
-# --- 7. CONTROLLER ALIASES ---
+def read_pinned_candles(driver, account_id, label):
+    """
+    Candles from the tab pinned to `label` ("h1", "m15") by get_or_login_driver: a
+    window-handle switch and one parse, no timeframe clicking. [] if there is no such tab.
+    """
+    windows = CHART_WINDOWS.get(account_id, {})
+    handle = windows.get(label)
+    if not handle: return []
+    try:
+        driver.switch_to.window(handle)
+        return parse_candles(driver, use_cache=False, interval_ms=TIMEFRAMES[label] * 1000,
+                             calibration=get_axis_calibration(account_id, label))
+    except Exception:
+        return []
+    finally:
+        try: driver.switch_to.window(windows['m5'])
+        except Exception: pass
+
+# --- 7. TERMINAL SNAPSHOT (ONE ROUND TRIP) ---
+@dataclass
+class TerminalSnapshot:
+    bid: Optional[float] = None
+    ask: Optional[float] = None
+    balance: float = 0.0
+    equity: float = 0.0
+    positions: List[dict] = field(default_factory=list)
+    candles: List[dict] = field(default_factory=list)
+    taken_at: float = 0.0
+    elapsed_ms: float = 0.0
+
+    @property
+    def price(self):
+        """Same as get_real_price: the buy-side price, else the sell side, else "0.00"."""
+        if self.ask is not None: return self.ask
+        if self.bid is not None: return self.bid
+        return "0.00"
+
+
+SNAPSHOT_JS = CANDLE_PARSER_JS + """
+const text = (sel) => { const el = document.querySelector(sel); return el ? el.textContent : null; };
+const inner = (sel) => { const el = document.querySelector(sel); return el ? el.innerText : null; };
+
+// Balance fallback: first two "$" amounts on the page (same as get_account_metrics)
+let fallback = null;
+const balanceText = inner('.summary-cell.balance .amount-label-text');
+if (!balanceText) {
+    let bal = 0; let eq = 0;
+    for (let el of document.querySelectorAll('span, div')) {
+        let txt = el.innerText;
+        if (txt && txt.includes('$') && txt.length < 20) {
+            let val = parseFloat(txt.replace(/[^0-9.]/g, ''));
+            if (val > 0) {
+                if (bal === 0) bal = val;
+                else if (eq === 0) { eq = val; break; }
+            }
+        }
+    }
+    fallback = {balance: bal, equity: eq};
+}
+
+const positions = [];
+for (let row of document.querySelectorAll('.positions-table .data-table-row')) {
+    positions.push(Array.from(row.querySelectorAll('span'), (c) => c.innerText));
+}
+
+const container = document.querySelector('g.candlestick-plot, .highcharts-series-group');
+return {
+    ask: text('.order-control .order-button.buy .price'),
+    bid: text('.order-control .order-button.sell .price'),
+    balance: balanceText,
+    equity: inner('.summary-cell.equity .amount-label-text'),
+    fallback: fallback,
+    positions: positions,
+    candles: container ? parseCandles(container) : null,
+    axis: container ? readAxis(container, arguments[0]) : null
+};
+"""
+
+def get_terminal_snapshot(driver, calibration=None):
+    """
+    Price, balance/equity, open positions and the chart's candles from a single
+    execute_script call. Fields that can't be read keep their defaults.
+    `calibration`: the account's main-chart AxisCalibration (a one-off fit when omitted).
+    """
+    start = time.perf_counter()
+    snap = TerminalSnapshot(taken_at=time.time())
+    calibration = calibration or AxisCalibration()
+    try:
+        raw = driver.execute_script(SNAPSHOT_JS, calibration.key) or {}
+    except Exception:
+        raw = {}
+
+    snap.ask = _clean_price(raw.get('ask'))
+    snap.bid = _clean_price(raw.get('bid'))
+
+    for key in ('balance', 'equity'):
+        try:
+            if raw.get(key): setattr(snap, key, _parse_money(raw[key]))
+        except ValueError: pass
+    fallback = raw.get('fallback')
+    if fallback and snap.balance == 0:
+        if fallback['balance'] > 0: snap.balance = fallback['balance']
+        if fallback['equity'] > 0: snap.equity = fallback['equity']
+
+    for cells in raw.get('positions') or []:
+        try:
+            trade = _position_from_cells(cells)
+            if trade: snap.positions.append(trade)
+        except Exception: continue
+
+    if raw.get('candles'):
+        calibration.update(raw.get('axis'))
+        snap.candles = _candles_from_raw(raw['candles'], calibration=calibration)
+        _cache_candles(snap.candles, calibration)
+
+    snap.elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+    return snap
+
+# --- 8. CONTROLLER ALIASES ---
 def get_chart_data(driver):
     return parse_candles(driver, use_cache=True)
 
 def get_open_trades_from_ui(driver):
     return get_active_positions(driver)
 
-# --- 8. THE TREND SYNC LOGIC (FIXED: INCLUDES 5M) ---
-def get_technical_trends(driver, log_func=None, account_id=None):
+# --- 9. THE TREND SYNC LOGIC (FIXED: INCLUDES 5M) ---
+def get_technical_trends(driver, log_func=None, account_id=None, backfill=False):
     """
-    Switches to H1 -> M15 -> M5.
-    Captures ALL charts so the frontend doesn't blank out.
+    H1/M15 trends and charts. By default they are rebuilt from the M5 chart already on
+    screen (no clicking); backfill=True switches H1 -> M15 -> M5 and scrapes each,
+    which is only needed for history older than the M5 chart shows.
     """
     trends = {"h1": "UNKNOWN", "m15": "UNKNOWN"}
     charts = {} 
 
+    if not backfill:
+        candles_m5 = parse_candles(driver, use_cache=False)
+        if candles_m5:
+            charts["candles_m5"] = candles_m5
+            for label in ("h1", "m15"):
+                bars = resample(candles_m5, label)
+                if bars:
+                    charts[f"candles_{label}"] = bars
+                    trends[label] = candle_trend(bars[-1])
+        elif log_func: log_func(account_id, "⚠️ CRITICAL: M5 Chart is blank after retry!")
+        return trends, charts
+
     # 1. Check H1
     if switch_timeframe(driver, "1 hour", log_func, account_id):
-        candles = parse_candles(driver, use_cache=False)
+        candles = parse_candles(driver, use_cache=False, interval_ms=TIMEFRAMES['h1'] * 1000)
         if candles:
             charts["candles_h1"] = candles
-            last = candles[-1]
-            trends["h1"] = "BULLISH" if last['close'] > last['open'] else "BEARISH"
+            trends["h1"] = candle_trend(candles[-1])
 
     # 2. Check M15
     if switch_timeframe(driver, "15 minutes", log_func, account_id):
-        candles = parse_candles(driver, use_cache=False)
+        candles = parse_candles(driver, use_cache=False, interval_ms=TIMEFRAMES['m15'] * 1000)
         if candles:
             charts["candles_m15"] = candles
-            last = candles[-1]
-            trends["m15"] = "BULLISH" if last['close'] > last['open'] else "BEARISH"
+            trends["m15"] = candle_trend(candles[-1])
 
     # 3. Return to M5 AND SCRAPE IT
     if switch_timeframe(driver, "5 minutes", log_func, account_id):
@@ -301,10 +473,11 @@ def get_technical_trends(driver, log_func=None, account_id=None):
         
         if candles_m5:
             charts["candles_m5"] = candles_m5
-            global CANDLE_CACHE
-            CANDLE_CACHE = candles_m5
         else:
             # Debug Log if it fails
             if log_func: log_func(account_id, "⚠️ CRITICAL: M5 Chart is blank after retry!")
     
-    return trends, charts
\ No newline at end of file
+    return trends, charts
+
+def candle_trend(candle):
+    return "BULLISH" if candle['close'] > candle['open'] else "BEARISH"
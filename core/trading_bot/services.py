@@ -7,6 +7,8 @@ import threading
 import shutil
 import subprocess
 import re
+import json
+from contextlib import contextmanager
 from datetime import datetime
 from django.conf import settings
 from selenium import webdriver
@@ -23,6 +25,13 @@ import undetected_chromedriver as uc
 # IMPORT MODELS & CONTROLLER
 from .models import TradingAccount
 from .controller import start_trading_loop 
+from .cdp_feed import enable_performance_log
+from .browser_pool import BROWSER_POOLS, BrowserPool, is_alive
+from .lean_browser import apply_lean_options, block_urls, size_window
+from .memory_guard import MEMORY_GUARDS, MemoryGuard
+from .process_stats import UsageMeter
+from .shared_browser import SHARED_BROWSERS, BrowserScheduler, get_browser_scheduler
+from .scraper import CHART_WINDOWS, CHART_SELECTOR, switch_timeframe
 
 # GLOBAL STATE
 ACTIVE_DRIVERS = {}   # { account_id: SeleniumDriver }
@@ -41,8 +50,14 @@ def log_step(account_id, message):
 def should_abort(account_id):
     return STOP_FLAGS.get(account_id, False)
 
-def get_chrome_version():
-    """Get installed Chrome major version"""
+def get_chrome_version(user_data_dir=None):
+    """Get installed Chrome major version (from the profile's "Last Version" file when there is one)"""
+    if user_data_dir:
+        try:
+            with open(os.path.join(user_data_dir, "Last Version")) as f:
+                return int(f.read().strip().split('.')[0])
+        except (OSError, ValueError):
+            pass
     try:
         result = subprocess.run(['google-chrome', '--version'], 
                                capture_output=True, text=True)
@@ -75,65 +90,277 @@ def human_type(driver, element, text):
     except:
         driver.execute_script("arguments[0].value = arguments[1];", element, text)
 
-# --- 1. DRIVER MANAGER (The Reusable Browser) ---
-def get_or_login_driver(account_id):
+def select_trading_account(driver, account_id, account, wait):
+    """Picks the account in the terminal's account selection dialog, if it shows up."""
+    log_step(account_id, "🔍 Checking for Account Selection Dialog...")
+    try:
+        wait.until(EC.presence_of_element_located((By.CLASS_NAME, "account-select-dialog")))
+        
+        target_number = str(account.account_number).strip()
+        items = driver.find_elements(By.CLASS_NAME, "account-menu-item")
+        
+        found = False
+        for item in items:
+            try:
+                name_el = item.find_element(By.CLASS_NAME, "account-name")
+                if target_number in name_el.text:
+                    log_step(account_id, f"✔ Found matching account in dialog: {name_el.text}")
+                    simulate_mouse_click(driver, item)
+                    found = True
+                    break
+            except:
+                continue
+        
+        if not found:
+             log_step(account_id, f"⚠️ Account number '{target_number}' not found. Clicking first available.")
+             if items:
+                 simulate_mouse_click(driver, items[0])
+
+    except Exception as e:
+        log_step(account_id, "ℹ️ No Account Selection Dialog found. Assuming ready.")
+        pass
+
+def open_pinned_charts(driver, account_id, account):
     """
-    Checks if a driver exists and is alive.
-    If yes: Returns it (skips login).
-    If no: Launches new Chrome, performs Login, returns it.
+    Opens the terminal in extra tabs pinned to H1 and M15, so their candles can be read
+    with a window switch instead of re-clicking the main chart's timeframe. The main tab
+    stays on M5 and stays current; handles go to CHART_WINDOWS.
     """
-    global ACTIVE_DRIVERS
-    
-    # A. REUSE CHECK
-    if account_id in ACTIVE_DRIVERS:
+    main = driver.current_window_handle
+    terminal_url = driver.current_url
+    windows = {"m5": main}
+
+    for tf, label in [("1 hour", "h1"), ("15 minutes", "m15")]:
         try:
-            driver = ACTIVE_DRIVERS[account_id]
-            _ = driver.title
-            log_step(account_id, "♻️ Reusing existing Chrome Session...")
-            return driver
-        except:
-            log_step(account_id, "⚠️ Existing driver died. Restarting...")
+            driver.switch_to.new_window('tab')
+            if settings.TRADING_BOT_LEAN_BROWSER: block_urls(driver)
+            driver.get(terminal_url)
+            select_trading_account(driver, account_id, account, WebDriverWait(driver, 10))
+            WebDriverWait(driver, 25).until(EC.presence_of_element_located((By.CSS_SELECTOR, CHART_SELECTOR)))
+            if switch_timeframe(driver, tf, log_step, account_id):
+                windows[label] = driver.current_window_handle
+                log_step(account_id, f"📌 {label.upper()} chart pinned in its own tab")
+            else:
+                driver.close()
+        except Exception as e:
+            log_step(account_id, f"⚠️ Could not pin {label.upper()} chart: {e}")
             try:
-                ACTIVE_DRIVERS[account_id].quit()
-            except:
-                pass
-            del ACTIVE_DRIVERS[account_id]
+                if driver.current_window_handle != main: driver.close()
+            except: pass
+        finally:
+            driver.switch_to.window(main)
 
-    # B. LAUNCH NEW
-    log_step(account_id, "🚀 Launching New Chrome...")
-    driver = None
-    
+    CHART_WINDOWS[account_id] = windows
+    return windows
+
+# --- 1. DRIVER MANAGER (The Reusable Browser) ---
+DATA_ROOT = os.path.expanduser("~/.local/share/cyborgbot")
+PROFILE_ROOT = os.path.join(DATA_ROOT, "profiles")  # One persistent Chrome user-data dir per account
+DRIVER_CACHE_DIR = os.path.join(DATA_ROOT, "chromedriver")  # Patched drivers, one per Chrome major version
+SESSION_FILE = "cyborg_session.json"
+COOKIE_FIELDS = ('name', 'value', 'domain', 'path', 'expires', 'httpOnly', 'secure', 'sameSite')
+WARM_TERMINAL_TIMEOUT = 20
+
+@contextmanager
+def timed_stage(stages, name):
+    start = time.perf_counter()
     try:
-        account = TradingAccount.objects.get(id=account_id)
-        
-        # Clear ChromeDriver cache to force fresh download
-        chrome_driver_dir = os.path.expanduser("~/.local/share/undetected_chromedriver")
-        if os.path.exists(chrome_driver_dir):
-            log_step(account_id, "🧹 Clearing ChromeDriver cache...")
-            shutil.rmtree(chrome_driver_dir, ignore_errors=True)
-        
-        # Get Chrome version and use matching ChromeDriver
-        chrome_version = get_chrome_version()
-        log_step(account_id, f"📊 Detected Chrome version: {chrome_version}")
-        
-        options = uc.ChromeOptions()
+        yield
+    finally:
+        stages[name] = time.perf_counter() - start
+
+def log_stages(account_id, stages, route):
+    parts = " | ".join(f"{name} {seconds:.1f}s" for name, seconds in stages.items())
+    log_step(account_id, f"⏱️ Startup ({route}): {parts} | total {sum(stages.values()):.1f}s")
+
+def profile_dir(account_id):
+    return os.path.join(PROFILE_ROOT, f"account_{account_id}")
+
+def cached_driver_path(version):
+    if not version: return None
+    path = os.path.join(DRIVER_CACHE_DIR, str(version), "chromedriver")
+    return path if os.path.exists(path) else None
+
+def cache_driver_binary(driver, version):
+    """Keeps the binary uc just patched, so the next start on this Chrome version skips download + patch."""
+    if not version or cached_driver_path(version): return
+    try:
+        target = os.path.join(DRIVER_CACHE_DIR, str(version), "chromedriver")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy2(driver.patcher.executable_path, target)
+    except Exception:
+        pass
+
+def launch_chrome(version, user_data_dir=None, driver_path=None):
+    options = uc.ChromeOptions()
+    if settings.TRADING_BOT_LEAN_BROWSER:
+        apply_lean_options(options, settings.TRADING_BOT_LEAN_JS_HEAP_MB)
+    else:
         options.add_argument("--start-maximized")
-        
-        # Force the correct ChromeDriver version
-        if chrome_version:
-            driver = uc.Chrome(options=options, version_main=chrome_version)
-        else:
-            driver = uc.Chrome(options=options)
-            
-        ACTIVE_DRIVERS[account_id] = driver
-        wait = WebDriverWait(driver, 25)
+    if settings.TRADING_BOT_CDP_FEED:
+        enable_performance_log(options)
 
-        # ---------------------------------------------------------
-        # 1. LOGIN SEQUENCE
-        # ---------------------------------------------------------
-        driver.get("https://direct.fxpro.com/login")
-        time.sleep(5)
-        
+    kwargs = {}
+    if version: kwargs['version_main'] = version  # Force the matching ChromeDriver
+    if user_data_dir: kwargs['user_data_dir'] = user_data_dir
+    if driver_path: kwargs['driver_executable_path'] = driver_path  # Already patched: uc skips download + patch
+    return uc.Chrome(options=options, **kwargs)
+
+def start_browser(account_id):
+    """
+    Chrome on the account's persistent profile with the cached driver for its version.
+    Falls back to a re-detected version and a fresh driver, then to a temporary profile.
+    """
+    user_data_dir = None
+    if settings.TRADING_BOT_WARM_START:
+        user_data_dir = profile_dir(account_id)
+        os.makedirs(user_data_dir, exist_ok=True)
+
+    version = get_chrome_version(user_data_dir)
+    driver_path = cached_driver_path(version)
+    log_step(account_id, f"📊 Chrome {version} | driver: {'cached' if driver_path else 'fresh'} | profile: {'persistent' if user_data_dir else 'temporary'}")
+
+    try:
+        driver = launch_chrome(version, user_data_dir, driver_path)
+    except Exception as e:
+        # Chrome updated since the profile last ran, or the cached driver is broken
+        log_step(account_id, f"⚠️ Warm launch failed ({str(e)[:60]}). Re-detecting Chrome...")
+        if driver_path:
+            shutil.rmtree(os.path.dirname(driver_path), ignore_errors=True)
+        version = get_chrome_version()
+        try:
+            driver = launch_chrome(version, user_data_dir)
+        except Exception:
+            if not user_data_dir: raise
+            # Profile still locked by a Chrome that outlived its driver
+            log_step(account_id, "⚠️ Profile in use. Launching with a temporary profile...")
+            driver = launch_chrome(version)
+
+    cache_driver_binary(driver, version)
+    return driver
+
+def pooled_launch():
+    """Launcher for the browser pool: temporary profile (the account isn't known yet), cached driver."""
+    version = get_chrome_version()
+    driver = launch_chrome(version, driver_path=cached_driver_path(version))
+    cache_driver_binary(driver, version)
+    return driver
+
+def get_browser_pool():
+    """The shared pool of idle browsers (started on first use), or None when TRADING_BOT_BROWSER_POOL_SIZE is 0."""
+    if not settings.TRADING_BOT_BROWSER_POOL_SIZE:
+        return None
+    pool = BROWSER_POOLS.get("default")
+    if pool is None:
+        pool = BrowserPool(
+            pooled_launch,
+            settings.TRADING_BOT_BROWSER_POOL_SIZE,
+            settings.TRADING_BOT_BROWSER_POOL_MEMORY_MB,
+            # Shared-browser accounts all point at one driver: count each browser once
+            in_use=lambda: list({id(d): d for d in ACTIVE_DRIVERS.values()}.values()),
+            log_func=lambda msg: log_step("pool", msg),
+        )
+        BROWSER_POOLS["default"] = pool
+        pool.start()
+    return pool
+
+def release_driver(account_id):
+    """Detaches the account's browser and hands it back to the pool (which recycles it), or quits it."""
+    MEMORY_GUARDS.pop(account_id, None)
+    scheduler = get_browser_scheduler(account_id)
+    if scheduler:
+        scheduler.release(account_id)  # In case the loop died holding the driver
+        if len(scheduler.handles) > 1:
+            # Shared browser still serving other accounts: only this account's tab goes
+            with scheduler.focus(account_id) as driver:
+                try: driver.close()
+                except: pass
+            scheduler.unregister(account_id)
+            ACTIVE_DRIVERS.pop(account_id, None)
+            return
+        if not BROWSER_POOLS.get("default"):
+            return  # Last tab: the browser stays open (and shared) for the next start
+        scheduler.unregister(account_id)
+    driver = ACTIVE_DRIVERS.pop(account_id, None)
+    CHART_WINDOWS.pop(account_id, None)
+    if driver is None:
+        return
+    pool = BROWSER_POOLS.get("default")
+    if pool:
+        pool.release(driver)
+    else:
+        try: driver.quit()
+        except: pass
+
+def save_session(driver, account_id):
+    """Terminal URL and every cookie (session cookies too, which Chrome drops on exit) in the profile dir."""
+    path = os.path.join(profile_dir(account_id), SESSION_FILE)
+    try:
+        cookies = driver.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies', [])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'terminal_url': driver.current_url, 'cookies': cookies, 'saved_at': time.time()}, f)
+        os.chmod(path, 0o600)
+    except Exception as e:
+        log_step(account_id, f"⚠️ Could not save session: {e}")
+
+def restore_session(driver, account_id):
+    """Re-applies the saved cookies; returns the saved terminal URL, or None without a saved session."""
+    try:
+        with open(os.path.join(profile_dir(account_id), SESSION_FILE)) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    cookies = []
+    for saved in data.get('cookies', []):
+        cookie = {k: saved[k] for k in COOKIE_FIELDS if k in saved}
+        if saved.get('session') or cookie.get('expires', -1) < 0:
+            cookie.pop('expires', None)
+        cookies.append(cookie)
+    if cookies:
+        try:
+            driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+        except Exception:
+            pass
+    return data.get('terminal_url')
+
+def open_terminal_warm(driver, account_id, account, terminal_url):
+    """Loads the saved terminal URL; True once its chart renders, False if it bounces to a login page."""
+    driver.get(terminal_url)
+
+    def settled(d):
+        if "login" in d.current_url: return "login"
+        if d.find_elements(By.CLASS_NAME, "account-select-dialog"): return "dialog"
+        if d.find_elements(By.CSS_SELECTOR, CHART_SELECTOR): return "chart"
+        return False
+
+    try:
+        state = WebDriverWait(driver, WARM_TERMINAL_TIMEOUT).until(settled)
+    except Exception:
+        return False
+    if state == "login":
+        return False
+
+    select_trading_account(driver, account_id, account, WebDriverWait(driver, 10 if state == "dialog" else 2))
+    try:
+        WebDriverWait(driver, WARM_TERMINAL_TIMEOUT).until(EC.presence_of_element_located((By.CSS_SELECTOR, CHART_SELECTOR)))
+    except Exception:
+        return False
+    return True
+
+def full_login(driver, account_id, account, wait):
+    """Credentials -> wallet -> Trade -> Launch -> account dialog: the cold path into the terminal."""
+    # ---------------------------------------------------------
+    # 1. LOGIN SEQUENCE
+    # ---------------------------------------------------------
+    driver.get("https://direct.fxpro.com/login")
+    time.sleep(5)
+
+    if "wallet" in driver.current_url:
+        # The persistent profile is still signed in
+        log_step(account_id, "✔ Already logged in.")
+    else:
         if driver.find_elements(By.TAG_NAME, "iframe"):
             driver.switch_to.frame(driver.find_element(By.TAG_NAME, "iframe"))
 
@@ -146,138 +373,285 @@ def get_or_login_driver(account_id):
         pass_el = wait.until(EC.visibility_of_element_located((By.XPATH, "/html/body/div[3]/div/div/div[1]/div[2]/div/input")))
         time.sleep(1)
         human_type(driver, pass_el, account.password)
-        
+
         submit_btn = wait.until(EC.element_to_be_clickable((By.XPATH, "/html/body/div[3]/div/div/div[3]/button")))
         simulate_mouse_click(driver, submit_btn)
-        
+
         driver.switch_to.default_content()
         wait.until(EC.url_contains("wallet"))
         log_step(account_id, "✔ Login Successful.")
 
-        # ---------------------------------------------------------
-        # 2. TERMINAL NAVIGATION
-        # ---------------------------------------------------------
-        time.sleep(4)
-        
+    # ---------------------------------------------------------
+    # 2. TERMINAL NAVIGATION
+    # ---------------------------------------------------------
+    time.sleep(4)
+
+    try:
+        accounts_tab_xp = "//div[contains(text(), 'Accounts') or contains(@class, 'account')]" 
+    except:
+        pass 
+
+    time.sleep(2)
+
+    if account.account_type == 'LIVE':
+        log_step(account_id, "🔍 Using LIVE Navigation XPaths...")
+        if account.name == 'Ahmed Abdo Live':
+            log_step(account_id, "🔍 Using Ahmed abdo XPaths...")
+            trade_btn_xpath = "/html/body/div[1]/div[5]/div[3]/main/div[2]/div/div[2]/div[2]/div/div[1]/div[5]/div[2]"
+        else:
+            trade_btn_xpath = "/html/body/div[1]/div[5]/div[3]/main/div[2]/div/div[2]/div[2]/div/div[2]/div[5]/div[2]"
+
         try:
-            accounts_tab_xp = "//div[contains(text(), 'Accounts') or contains(@class, 'account')]" 
-        except:
-            pass 
+            trade_btn = wait.until(EC.element_to_be_clickable((By.XPATH, trade_btn_xpath)))
+            simulate_mouse_click(driver, trade_btn)
+            log_step(account_id, "✅ Clicked Trade button (Live)")
+        except Exception as e:
+            log_step(account_id, "❌ Live Trade button XPath failed.")
+            raise e
 
-        time.sleep(2)
+        time.sleep(5)
 
-        if account.account_type == 'LIVE':
-            log_step(account_id, "🔍 Using LIVE Navigation XPaths...")
-            if account.name == 'Ahmed Abdo Live':
-                log_step(account_id, "🔍 Using Ahmed abdo XPaths...")
-                trade_btn_xpath = "/html/body/div[1]/div[5]/div[3]/main/div[2]/div/div[2]/div[2]/div/div[1]/div[5]/div[2]"
-            else:
-                trade_btn_xpath = "/html/body/div[1]/div[5]/div[3]/main/div[2]/div/div[2]/div[2]/div/div[2]/div[5]/div[2]"
-            
-            try:
-                trade_btn = wait.until(EC.element_to_be_clickable((By.XPATH, trade_btn_xpath)))
-                simulate_mouse_click(driver, trade_btn)
-                log_step(account_id, "✅ Clicked Trade button (Live)")
+        launch_btn_xpath = "/html/body/div[1]/div[3]/div/div[3]/div[2]/div/div[3]/div[1]"
+        try:
+            launch_btn = wait.until(EC.element_to_be_clickable((By.XPATH, launch_btn_xpath)))
+            simulate_mouse_click(driver, launch_btn)
+            log_step(account_id, "✅ Clicked Launch/Tenant button (Live)")
+        except Exception as e:
+            log_step(account_id, "❌ Live Launch button XPath failed.")
+            raise e
+
+    else:
+        log_step(account_id, f"🔍 Using DEMO Navigation Logic...")
+
+        try:
+            demo_tab = wait.until(EC.element_to_be_clickable((By.XPATH, "//div[@data-testid='tab-demo-account']")))
+            simulate_mouse_click(driver, demo_tab)
+            log_step(account_id, "✅ Clicked 'Demo accounts' tab")
+            time.sleep(3) 
+        except:
+            try: 
+                demo_tab = driver.find_element(By.XPATH, "/html/body/div[1]/div[5]/div[3]/main/div[3]/div/div[2]/div[1]/div[2]")
+                simulate_mouse_click(driver, demo_tab)
+                log_step(account_id, "✅ Clicked 'Demo accounts' tab (Fallback)")
+                time.sleep(3)
             except Exception as e:
-                log_step(account_id, "❌ Live Trade button XPath failed.")
-                raise e
+                log_step(account_id, f"⚠️ Demo Tab interaction failed: {e}")
 
-            time.sleep(5)
+        trade_btn_xpath = "/html/body/div[1]/div[5]/div[3]/main/div[3]/div/div[2]/div[2]/div/div[1]/div[5]/div[2]"
+        try:
+            trade_btn = wait.until(EC.element_to_be_clickable((By.XPATH, trade_btn_xpath)))
+            simulate_mouse_click(driver, trade_btn)
+            log_step(account_id, f"✅ Clicked Trade button (Demo)")
+        except Exception as e:
+            log_step(account_id, f"❌ Demo Trade button failed.")
+            raise e
 
-            launch_btn_xpath = "/html/body/div[1]/div[3]/div/div[3]/div[2]/div/div[3]/div[1]"
+        time.sleep(5)
+
+        try:
+            launch_xpath = "//div[contains(@class, 'ui-button')]//span[contains(text(), 'Launch') or contains(text(), 'Web')]/ancestor::div[contains(@class, 'ui-button')]"
+            launch_btn = wait.until(EC.element_to_be_clickable((By.XPATH, launch_xpath)))
+            simulate_mouse_click(driver, launch_btn)
+            log_step(account_id, "✅ Clicked Launch button (Demo)")
+        except Exception as e:
+            log_step(account_id, "⚠️ Demo Launch button not found by text. Trying fallback...")
             try:
-                launch_btn = wait.until(EC.element_to_be_clickable((By.XPATH, launch_btn_xpath)))
+                launch_btn_xpath = "/html/body/div[1]/div[3]/div/div[3]/div[2]/div/div[3]/div[1]"
+                launch_btn = driver.find_element(By.XPATH, launch_btn_xpath)
                 simulate_mouse_click(driver, launch_btn)
-                log_step(account_id, "✅ Clicked Launch/Tenant button (Live)")
-            except Exception as e:
-                log_step(account_id, "❌ Live Launch button XPath failed.")
+            except:
+                log_step(account_id, "❌ All Launch attempts failed.")
                 raise e
 
-        else:
-            log_step(account_id, f"🔍 Using DEMO Navigation Logic...")
-            
+    time.sleep(5)
+    if len(driver.window_handles) > 1:
+        driver.switch_to.window(driver.window_handles[-1])
+        log_step(account_id, "✅ Switched to Trading Tab")
+    else:
+        log_step(account_id, "⚠️ No new tab detected. Checking if it opened in same window...")
+
+    select_trading_account(driver, account_id, account, wait)
+
+    time.sleep(3)
+
+def close_pinned_charts(driver, account_id):
+    """Closes the account's H1/M15 tabs and goes back to its main tab."""
+    windows = CHART_WINDOWS.pop(account_id, {})
+    main = windows.get("m5", driver.current_window_handle)
+    for label, handle in windows.items():
+        if handle == main: continue
+        try:
+            driver.switch_to.window(handle)
+            driver.close()
+        except: pass
+    driver.switch_to.window(main)
+    return len(windows) > 1
+
+def reload_terminal(driver, account_id, account):
+    """
+    Controlled reload for the memory guard: same terminal URL, account re-selected, chart
+    back on M5. Pinned tabs are reopened too: they hold a heap of their own, and a
+    fallback login leaves them on a dead session.
+    """
+    pinned = close_pinned_charts(driver, account_id)
+    if not open_terminal_warm(driver, account_id, account, driver.current_url):
+        log_step(account_id, "⚠️ Reload landed outside the terminal. Logging in again...")
+        full_login(driver, account_id, account, WebDriverWait(driver, 25))
+    switch_timeframe(driver, "5 minutes", log_step, account_id)
+    if pinned:
+        open_pinned_charts(driver, account_id, account)
+    return True
+
+def attach_memory_guard(driver, account_id, account):
+    """Heap guard for the account's terminal tab (TRADING_BOT_HEAP_RELOAD_MB = 0 turns it off)."""
+    if not settings.TRADING_BOT_HEAP_RELOAD_MB:
+        return None
+    guard = MemoryGuard(driver, settings.TRADING_BOT_HEAP_RELOAD_MB, lambda: reload_terminal(driver, account_id, account))
+    MEMORY_GUARDS[account_id] = guard
+    return guard
+
+def log_usage(account_id, driver, when):
+    """Browser RSS / CPU time with the profile in use, so lean and full runs can be compared."""
+    usage = UsageMeter(driver).sample()
+    if usage:
+        profile = "lean" if settings.TRADING_BOT_LEAN_BROWSER else "full"
+        log_step(account_id, f"🧮 Browser {when} ({profile}): {usage['rss_mb']} MB RSS | {usage['cpu_seconds']}s CPU | {usage['processes']} processes")
+
+def shares_browser(account):
+    """Only demo accounts share: a live account keeps a browser (and its failures) to itself."""
+    return settings.TRADING_BOT_SHARED_BROWSER and account.account_type != TradingAccount.AccountType.LIVE
+
+def open_account_tab(scheduler, account_id, account):
+    """
+    Opens the account's terminal in a new tab of an already logged-in shared browser
+    (same broker login, so the session cookies are already there) and registers it.
+    """
+    stages = {}
+    handle = None
+    with scheduler.focus(account_id) as driver:
+        try:
+            with timed_stage(stages, "tab"):
+                terminal_url = driver.current_url
+                driver.switch_to.new_window('tab')
+                handle = driver.current_window_handle
+                if settings.TRADING_BOT_LEAN_BROWSER: block_urls(driver)
+                driver.get(terminal_url)
+                select_trading_account(driver, account_id, account, WebDriverWait(driver, 10))
+                WebDriverWait(driver, 25).until(EC.presence_of_element_located((By.CSS_SELECTOR, CHART_SELECTOR)))
+        except Exception:
+            if handle:
+                try: driver.close()
+                except: pass
+            raise
+    scheduler.register(account_id, handle)
+    ACTIVE_DRIVERS[account_id] = scheduler.driver
+    attach_memory_guard(scheduler.driver, account_id, account)
+    log_step(account_id, f"🗂️ Joined the shared browser of {account.login_id} ({len(scheduler.handles)} accounts).")
+    log_stages(account_id, stages, "shared tab")
+    return scheduler.driver
+
+def get_or_login_driver(account_id):
+    """
+    Checks if a driver exists and is alive.
+    If yes: Returns it (skips login).
+    If no: Launches Chrome on the account's profile, tries the saved session (warm start)
+    and falls back to the full login; returns it.
+    """
+    global ACTIVE_DRIVERS
+    
+    # A. REUSE CHECK
+    if account_id in ACTIVE_DRIVERS:
+        try:
+            driver = ACTIVE_DRIVERS[account_id]
+            _ = driver.title
+            log_step(account_id, "♻️ Reusing existing Chrome Session...")
+            return driver
+        except:
+            log_step(account_id, "⚠️ Existing driver died. Restarting...")
             try:
-                demo_tab = wait.until(EC.element_to_be_clickable((By.XPATH, "//div[@data-testid='tab-demo-account']")))
-                simulate_mouse_click(driver, demo_tab)
-                log_step(account_id, "✅ Clicked 'Demo accounts' tab")
-                time.sleep(3) 
+                ACTIVE_DRIVERS[account_id].quit()
             except:
-                try: 
-                    demo_tab = driver.find_element(By.XPATH, "/html/body/div[1]/div[5]/div[3]/main/div[3]/div/div[2]/div[1]/div[2]")
-                    simulate_mouse_click(driver, demo_tab)
-                    log_step(account_id, "✅ Clicked 'Demo accounts' tab (Fallback)")
-                    time.sleep(3)
-                except Exception as e:
-                    log_step(account_id, f"⚠️ Demo Tab interaction failed: {e}")
-
-            trade_btn_xpath = "/html/body/div[1]/div[5]/div[3]/main/div[3]/div/div[2]/div[2]/div/div[1]/div[5]/div[2]"
+                pass
+            scheduler = get_browser_scheduler(account_id)
+            if scheduler: scheduler.unregister(account_id)
+            del ACTIVE_DRIVERS[account_id]
+            CHART_WINDOWS.pop(account_id, None)
+
+    account = TradingAccount.objects.get(id=account_id)
+
+    # B. SHARED BROWSER: a new tab in the browser already logged in with this login
+    if shares_browser(account):
+        scheduler = SHARED_BROWSERS.get(account.login_id)
+        if scheduler and is_alive(scheduler.driver):
             try:
-                trade_btn = wait.until(EC.element_to_be_clickable((By.XPATH, trade_btn_xpath)))
-                simulate_mouse_click(driver, trade_btn)
-                log_step(account_id, f"✅ Clicked Trade button (Demo)")
+                return open_account_tab(scheduler, account_id, account)
             except Exception as e:
-                log_step(account_id, f"❌ Demo Trade button failed.")
+                log_step(account_id, f"⚠️ Could not open a tab in the shared browser: {e}")
                 raise e
 
-            time.sleep(5)
+    # C. LAUNCH NEW
+    log_step(account_id, "🚀 Launching New Chrome...")
+    driver = None
+    stages = {}
+    route = "cold"
+    
+    try:
 
-            try:
-                launch_xpath = "//div[contains(@class, 'ui-button')]//span[contains(text(), 'Launch') or contains(text(), 'Web')]/ancestor::div[contains(@class, 'ui-button')]"
-                launch_btn = wait.until(EC.element_to_be_clickable((By.XPATH, launch_xpath)))
-                simulate_mouse_click(driver, launch_btn)
-                log_step(account_id, "✅ Clicked Launch button (Demo)")
-            except Exception as e:
-                log_step(account_id, "⚠️ Demo Launch button not found by text. Trying fallback...")
-                try:
-                    launch_btn_xpath = "/html/body/div[1]/div[3]/div/div[3]/div[2]/div/div[3]/div[1]"
-                    launch_btn = driver.find_element(By.XPATH, launch_btn_xpath)
-                    simulate_mouse_click(driver, launch_btn)
-                except:
-                    log_step(account_id, "❌ All Launch attempts failed.")
-                    raise e
-        
-        time.sleep(5)
-        if len(driver.window_handles) > 1:
-            driver.switch_to.window(driver.window_handles[-1])
-            log_step(account_id, "✅ Switched to Trading Tab")
-        else:
-            log_step(account_id, "⚠️ No new tab detected. Checking if it opened in same window...")
+        with timed_stage(stages, "launch"):
+            pool = get_browser_pool()
+            driver = pool.acquire() if pool else None
+            if driver:
+                log_step(account_id, "🏊 Using a pre-warmed browser from the pool.")
+            else:
+                driver = start_browser(account_id)
+        ACTIVE_DRIVERS[account_id] = driver
+        wait = WebDriverWait(driver, 25)
 
-        log_step(account_id, "🔍 Checking for Account Selection Dialog...")
-        try:
-            wait.until(EC.presence_of_element_located((By.CLASS_NAME, "account-select-dialog")))
-            
-            target_number = str(account.account_number).strip()
-            items = driver.find_elements(By.CLASS_NAME, "account-menu-item")
-            
-            found = False
-            for item in items:
-                try:
-                    name_el = item.find_element(By.CLASS_NAME, "account-name")
-                    if target_number in name_el.text:
-                        log_step(account_id, f"✔ Found matching account in dialog: {name_el.text}")
-                        simulate_mouse_click(driver, item)
-                        found = True
-                        break
-                except:
-                    continue
-            
-            if not found:
-                 log_step(account_id, f"⚠️ Account number '{target_number}' not found. Clicking first available.")
-                 if items:
-                     simulate_mouse_click(driver, items[0])
+        if settings.TRADING_BOT_LEAN_BROWSER:
+            size_window(driver)
+            if not block_urls(driver):
+                log_step(account_id, "⚠️ Lean profile: CDP URL blocking unavailable.")
 
-        except Exception as e:
-            log_step(account_id, "ℹ️ No Account Selection Dialog found. Assuming ready.")
-            pass
-            
-        time.sleep(3)
+        # 1. WARM START: saved cookies + terminal URL, straight to account selection
+        if settings.TRADING_BOT_WARM_START:
+            with timed_stage(stages, "warm"):
+                terminal_url = restore_session(driver, account_id)
+                if terminal_url and open_terminal_warm(driver, account_id, account, terminal_url):
+                    route = "warm"
+            if route == "warm":
+                log_step(account_id, "⚡ Warm start: terminal already authenticated.")
+            elif terminal_url:
+                log_step(account_id, "⚠️ Saved session expired. Falling back to full login...")
+
+        # 2. FULL LOGIN
+        if route == "cold":
+            with timed_stage(stages, "login"):
+                full_login(driver, account_id, account, wait)
+
+        if settings.TRADING_BOT_WARM_START:
+            with timed_stage(stages, "save"):
+                save_session(driver, account_id)
+
+        if shares_browser(account):
+            # Later accounts with this login open their tabs here (no pinned charts: the
+            # scheduler switches between account tabs, not timeframe tabs)
+            scheduler = BrowserScheduler(driver, account.login_id)
+            scheduler.register(account_id, driver.current_window_handle)
+            SHARED_BROWSERS[account.login_id] = scheduler
+        elif settings.TRADING_BOT_PINNED_CHARTS:
+            with timed_stage(stages, "pinned"):
+                open_pinned_charts(driver, account_id, account)
+
+        attach_memory_guard(driver, account_id, account)
+        log_stages(account_id, stages, route)
+        log_usage(account_id, driver, "after startup")
         return driver
 
     except Exception as e:
         log_step(account_id, f"❌ Driver Init Failed: {e}")
         if account_id in ACTIVE_DRIVERS: 
             del ACTIVE_DRIVERS[account_id]
+        CHART_WINDOWS.pop(account_id, None)
         if driver:
             try:
                 driver.quit()
@@ -302,7 +676,14 @@ def run_bot_engine(account_id):
         except Exception as e:
             log_step(account_id, f"❌ Thread Crash: {e}")
         finally:
-            log_step(account_id, "🛑 Bot Logic Stopped (Driver kept open).")
+            if BROWSER_POOLS.get("default"):
+                release_driver(account_id)
+                log_step(account_id, "🛑 Bot Logic Stopped (browser returned to the pool).")
+            elif get_browser_scheduler(account_id):
+                release_driver(account_id)
+                log_step(account_id, "🛑 Bot Logic Stopped (shared browser tab released).")
+            else:
+                log_step(account_id, "🛑 Bot Logic Stopped (Driver kept open).")
 
     t = threading.Thread(target=_worker, daemon=True)
     RUNNING_THREADS[account_id] = t
@@ -0,0 +1,82 @@
+"""
+Several accounts in one Chrome: each account gets its own terminal tab and the
+accounts' bot loops take turns at the driver.
+
+A WebDriver can only look at one tab at a time, so a BrowserScheduler hands driver
+focus to one account at a time, first come first served: a loop holds it for one
+tick and gives it up while it sleeps (smart_sleep), and the next account's tab is
+switched in. Everything else per account (candle stores, indicator engines,
+decision caches, page bridges, history checkpoints) is already keyed by account_id.
+"""
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# GLOBAL STATE
+SHARED_BROWSERS = {}  # { login_id: BrowserScheduler }  one browser per broker login (the tabs share its cookies)
+ACCOUNT_SCHEDULERS = {}  # { account_id: BrowserScheduler }
+
+
+def get_browser_scheduler(account_id):
+    """The scheduler of the shared browser the account runs in, or None when it has its own browser."""
+    return ACCOUNT_SCHEDULERS.get(account_id)
+
+
+class BrowserScheduler:
+    """Round-robin driver focus for the accounts (tabs) of one shared browser."""
+
+    def __init__(self, driver, login_id):
+        self.driver = driver
+        self.login_id = login_id
+        self.handles = {}  # account_id -> window handle of its terminal tab
+        self.cond = threading.Condition()
+        self.waiting = deque()
+        self.owner = None
+        self.switches = 0
+
+    def register(self, account_id, handle):
+        self.handles[account_id] = handle
+        ACCOUNT_SCHEDULERS[account_id] = self
+
+    def unregister(self, account_id):
+        self.handles.pop(account_id, None)
+        if ACCOUNT_SCHEDULERS.get(account_id) is self:
+            del ACCOUNT_SCHEDULERS[account_id]
+        if not self.handles and SHARED_BROWSERS.get(self.login_id) is self:
+            del SHARED_BROWSERS[self.login_id]
+
+    def acquire(self, account_id):
+        """Blocks until it is this account's turn, then focuses its tab."""
+        with self.cond:
+            self.waiting.append(account_id)
+            while self.owner is not None or self.waiting[0] != account_id:
+                self.cond.wait()
+            self.waiting.popleft()
+            self.owner = account_id
+        handle = self.handles.get(account_id)
+        try:
+            if handle and self.driver.current_window_handle != handle:
+                self.driver.switch_to.window(handle)
+                self.switches += 1
+        except Exception:
+            # Tab or browser gone: the caller's next driver call raises and its loop handles it
+            pass
+
+    def release(self, account_id):
+        with self.cond:
+            if self.owner == account_id:
+                self.owner = None
+                self.cond.notify_all()
+
+    @contextmanager
+    def focus(self, account_id):
+        self.acquire(account_id)
+        try:
+            yield self.driver
+        finally:
+            self.release(account_id)
+
+    def stats(self):
+        with self.cond:
+            waiting = list(self.waiting)
+        return {'accounts': sorted(self.handles), 'owner': self.owner, 'waiting': waiting, 'switches': self.switches}
@@ -1,3 +1,415 @@
-from django.test import TestCase
+import os
+from datetime import datetime, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+try:
+    import pandas_ta
+except ImportError:  # The written-out references below still run
+    pandas_ta = None
+
+from . import history_manager, indicators
+from .candle_buffer import CandleBuffer
+from .candle_store import MAX_SHIFT, CandleStore
+from .cdp_feed import CDPPriceFeed, ReplayDriver
+from .indicator_engine import IndicatorEngine
+from .scraper import TerminalSnapshot, get_macd_data
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class CDPFeedReplayTests(SimpleTestCase):
+    """The synthetic websocket frames (see cdp_feed) replayed through the feed, offline."""
+
+    def replay(self):
+        driver = ReplayDriver(os.path.join(FIXTURES, "cdp_frames_synthetic.jsonl"))
+        feed = CDPPriceFeed(driver)
+        events = []
+        while not driver.exhausted:
+            feed.poll()
+            events.extend(feed.position_changes())
+        return feed, events
+
+    def test_ticks_and_last_quote(self):
+        feed, _ = self.replay()
+        self.assertEqual(feed.frames, 282)
+        self.assertEqual(len(feed.ticks), 240)
+        self.assertEqual((feed.bid, feed.ask), (2634.07, 2634.25))
+
+    def test_position_open_and_close(self):
+        feed, events = self.replay()
+        self.assertEqual(events, [('open', '48213377'), ('close', '48213377')])
+        self.assertEqual(feed.positions, {})
+
+    def test_snapshot_merge(self):
+        driver = ReplayDriver(os.path.join(FIXTURES, "cdp_frames_synthetic.jsonl"), batch=100)
+        feed = CDPPriceFeed(driver)
+        feed.poll()  # Up to the first position updates
+        self.assertIn('48213377', feed.positions)
+        now = feed.positions['48213377']['seen_at']
+
+        snap = feed.apply(TerminalSnapshot(positions=[{"ticket_id": "#48213377", "profit": "0.00"}]), now=now)
+        self.assertEqual(len(snap.positions), 1)
+        self.assertEqual(snap.positions[0]["ticket_id"], "#48213377")
+        self.assertEqual(snap.positions[0]["direction"], "BUY")
+
+        # Stale websocket data leaves the DOM rows alone
+        dom = [{"ticket_id": "#1", "profit": "1.00"}]
+        self.assertEqual(feed.apply(TerminalSnapshot(positions=list(dom)), now=now + 3600).positions[0], dom[0])
+
+        while not driver.exhausted:
+            feed.poll()
+        # Closed on the websocket: dropped even while the DOM table still shows it
+        snap = feed.apply(TerminalSnapshot(positions=[{"ticket_id": "#48213377"}]), now=now)
+        self.assertEqual(snap.positions, [])
+
+
+# pandas_ta's default formulas, written out in pandas as the reference (checked against the
+# pinned pandas-ta itself in PandasTaTests when it is installed)
+def ref_ema(close, length):
+    close = close.copy()
+    first = close.first_valid_index()
+    close = close.loc[first:]
+    seed = close.iloc[:length].mean()
+    close.iloc[:length - 1] = np.nan
+    close.iloc[length - 1] = seed
+    return close.ewm(span=length, adjust=False).mean().reindex(range(first + len(close))).values
+
+
+def ref_rma(series, length):
+    return series.ewm(alpha=1.0 / length, min_periods=length).mean().values
+
+
+def ref_true_range(high, low, close):
+    prev = close.shift(1)
+    tr = pd.concat([high - low, (high - prev).abs(), (low - prev).abs()], axis=1).max(axis=1)
+    tr.iloc[0] = np.nan
+    return tr
+
+
+class RandomWalkTestCase(SimpleTestCase):
+    """300 random-walk OHLCV bars, as arrays and as candle dicts."""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        close = 2600 + np.cumsum(rng.normal(0, 1.5, 300))
+        spread = rng.uniform(0.2, 3.0, 300)
+        self.open = close + rng.normal(0, 0.5, 300)
+        self.high = np.maximum(close, self.open) + spread
+        self.low = np.minimum(close, self.open) - spread
+        self.close = close
+        self.volume = rng.integers(1, 500, 300).astype(float)
+        self.candles = [{'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+                        for o, h, l, c, v in zip(self.open, self.high, self.low, self.close, self.volume)]
+
+    def assertClose(self, actual, expected):
+        np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+class IndicatorKernelTests(RandomWalkTestCase):
+    """numpy kernels vs pandas_ta-style references on a random walk."""
+
+    def test_sma(self):
+        self.assertClose(indicators.sma(self.close, 20), pd.Series(self.close).rolling(20).mean().values)
+
+    def test_ema(self):
+        for length in (9, 12, 26, 50):
+            self.assertClose(indicators.ema(self.close, length), ref_ema(pd.Series(self.close), length))
+
+    def test_rma(self):
+        self.assertClose(indicators.rma(self.close, 14), ref_rma(pd.Series(self.close), 14))
+
+    def test_true_range_and_atr(self):
+        h, l, c = pd.Series(self.high), pd.Series(self.low), pd.Series(self.close)
+        tr = ref_true_range(h, l, c)
+        self.assertClose(indicators.true_range(self.high, self.low, self.close), tr.values)
+        atr = indicators.atr(self.high, self.low, self.close, 14)
+        self.assertClose(atr, ref_rma(tr, 14))
+        self.assertTrue(np.isnan(atr[13]) and not np.isnan(atr[14]))
+
+    def test_rsi(self):
+        diff = pd.Series(self.close).diff()
+        up = ref_rma(diff.clip(lower=0), 14)
+        down = ref_rma((-diff).clip(lower=0), 14)
+        self.assertClose(indicators.rsi(self.close, 14), 100 * up / (up + down))
+
+    def test_bollinger(self):
+        close = pd.Series(self.close)
+        mid = close.rolling(20).mean()
+        dev = close.rolling(20).std(ddof=1)
+        lower, middle, upper = indicators.bollinger(self.close, 20, 2.0)
+        self.assertClose(lower, (mid - 2 * dev).values)
+        self.assertClose(middle, mid.values)
+        self.assertClose(upper, (mid + 2 * dev).values)
+
+    def test_macd(self):
+        close = pd.Series(self.close)
+        line = ref_ema(close, 12) - ref_ema(close, 26)
+        signal = ref_ema(pd.Series(line), 9)
+        macd, sig, hist = indicators.macd(self.close, 12, 26, 9)
+        self.assertClose(macd, line)
+        self.assertClose(sig, signal)
+        self.assertClose(hist, line - signal)
+
+    def test_vwap_and_delta_flow(self):
+        h, l, c, v = (pd.Series(a) for a in (self.high, self.low, self.close, self.volume))
+        tp = (h + l + c) / 3
+        self.assertClose(indicators.vwap(self.high, self.low, self.close, self.volume), ((tp * v).cumsum() / v.cumsum()).values)
+        rng = (h - l).replace(0, 1)
+        self.assertClose(indicators.delta_flow(self.open, self.high, self.low, self.close, self.volume),
+                         (((c - pd.Series(self.open)) / rng) * v).values)
+
+    def test_macd_data_lengths(self):
+        # Same list lengths as the pre-kernel implementation: macd from bar 26, signal/hist from bar 34
+        for n in (35, 60, 82, 120):
+            data = get_macd_data([{'close': c} for c in self.close[:n]])
+            self.assertEqual(len(data['macd']), min(50, n - 25))
+            self.assertEqual(len(data['hist']), min(50, n - 33))
+            self.assertEqual(len(data['signal']), len(data['hist']))
+
+    def test_engine_atr_matches_kernel(self):
+        candles = self.candles
+        atr = indicators.atr(self.high, self.low, self.close, 14)
+        for n in (14, 15, 60):
+            self.assertClose(IndicatorEngine().update(candles[:n])['atr'], atr[n - 1])
+        engine = IndicatorEngine()
+        engine.update(candles[:120])
+        for n in range(121, 130):  # Sliding window: incremental commits
+            value = engine.update(candles[n - 120:n])['atr']
+        self.assertClose(value, atr[128])
+        self.assertEqual(engine.stats['full_recomputes'], 1)
+
+
+    # --- IndicatorEngine: incremental updates vs a full recompute of the same window ---
+    WINDOW = 120
+    WINDOWED = ('vwap', 'volume_ma', 'delta', 'delta_ma', 'delta_momentum')  # Depend on the window only
+
+    def window(self, start):
+        return [dict(c) for c in self.candles[start:start + self.WINDOW]]
+
+    def assertEngineMatches(self, values, candles, keys=WINDOWED + ('ema_fast', 'ema_slow', 'atr')):
+        expected = IndicatorEngine().update(candles)
+        for key in keys:
+            self.assertClose(values[key], expected[key])
+
+    def assertSeriesKernels(self, values, end, start=0):
+        """EMAs and ATR carry over the whole series since the last recompute, not just the window."""
+        h, l, c = self.high[start:end], self.low[start:end], self.close[start:end]
+        self.assertClose(values['ema_fast'], indicators.ema(c, 9)[-1])
+        self.assertClose(values['ema_slow'], indicators.ema(c, 21)[-1])
+        self.assertClose(values['atr'], indicators.atr(h, l, c, 14)[-1])
+
+    def test_engine_forming_bar_update(self):
+        engine = IndicatorEngine()
+        candles = self.window(0)
+        engine.update(candles)
+        # A tick on the forming bar: new close and high, more volume
+        last = candles[-1]
+        candles[-1] = dict(last, close=last['close'] + 0.8, high=last['high'] + 0.8, volume=last['volume'] + 25)
+        values = engine.update(candles)
+        self.assertEqual((engine.stats['full_recomputes'], engine.stats['incremental_updates']), (1, 1))
+        self.assertEngineMatches(values, candles)
+        self.assertClose(values['volume_ma'], indicators.sma([c['volume'] for c in candles], 20)[-1])
+
+    def test_engine_bar_close(self):
+        engine = IndicatorEngine()
+        engine.update(self.window(0))
+        for start in (1, 2, 5, 10):  # One bar closed, another, then three and MAX_SHIFT at once
+            candles = self.window(start)
+            values = engine.update(candles)
+            self.assertEngineMatches(values, candles, self.WINDOWED)
+            self.assertSeriesKernels(values, start + self.WINDOW)
+        self.assertEqual(engine.stats['full_recomputes'], 1)
+
+    def test_engine_gap_beyond_max_shift_recomputes(self):
+        engine = IndicatorEngine()
+        engine.update(self.window(0))
+        start = IndicatorEngine.MAX_SHIFT + 1
+        candles = self.window(start)
+        values = engine.update(candles)
+        self.assertEqual(engine.stats['full_recomputes'], 2)
+        self.assertEngineMatches(values, candles)
+        self.assertSeriesKernels(values, start + self.WINDOW, start)
+
+    def test_engine_changed_bar_key_recomputes(self):
+        engine = IndicatorEngine()
+        candles = self.window(0)
+        engine.update(candles)
+        # The volume feed writes the last closed bar's volume back: its bar_key no longer matches
+        candles[-2] = dict(candles[-2], volume=candles[-2]['volume'] + 40)
+        values = engine.update(candles)
+        self.assertEqual(engine.stats['full_recomputes'], 2)
+        self.assertEngineMatches(values, candles)
+
+
+class CandleStoreTests(SimpleTestCase):
+    """Scrape windows merged into one continuous M5 series."""
+
+    T0 = 1_700_000_100_000  # A 5-minute boundary (ms)
+
+    def setUp(self):
+        self.store = CandleStore(CandleBuffer(50), 'm5')
+        self.interval = self.store.interval_ms
+
+    def bars(self, start, end, shift=0, **extra):
+        """Bars start..end-1 with distinct prices, stamped `shift` ms off their real open time."""
+        return [dict({'time': self.T0 + i * self.interval + shift, 'open': 2600.0 + i, 'high': 2602.0 + i,
+                      'low': 2599.0 + i, 'close': 2601.0 + i}, **extra) for i in range(start, end)]
+
+    def times(self):
+        return [(t - self.T0) / self.interval for t in self.store.buffer.column('time')]
+
+    def test_clock_offset_restamps_scrape(self):
+        self.store.merge(self.bars(0, 10))
+        # The clock moved on a bar before the chart drew it: every stamp is one bar late
+        late = self.bars(2, 11, shift=self.interval)
+        self.assertEqual(self.store._clock_offset(late), -self.interval)
+        self.store.merge(late)
+        self.assertEqual(self.times(), list(range(11)))
+        # Too far off to be clock skew (or anchors missing): left alone
+        self.assertEqual(self.store._clock_offset(self.bars(2, 11, shift=(MAX_SHIFT + 1) * self.interval)), 0)
+        self.assertEqual(self.store._clock_offset(self.bars(20, 30)), 0)
+
+    def test_carry_volume(self):
+        self.store.merge(self.bars(0, 10))
+        self.store.buffer.write_column('volume', [float(i) for i in range(10)])
+        self.store.buffer.write_column('delta', [-float(i) for i in range(10)])
+        merged = self.store._carry_volume(self.bars(7, 11) + self.bars(11, 12, volume=99.0))
+        self.assertEqual([(c.get('volume'), c.get('delta')) for c in merged],
+                         [(7.0, -7.0), (8.0, -8.0), (9.0, -9.0), (None, None), (99.0, None)])
+
+    def test_bar_closed_events(self):
+        seen = []
+        self.store.subscribe(seen.append)
+        self.store.merge(self.bars(0, 10))
+        self.assertEqual(self.store.merge(self.bars(4, 10)), [])  # Forming bar re-scraped, nothing closed
+        events = self.store.merge(self.bars(5, 12))
+        self.assertEqual([(name, (bar['time'] - self.T0) / self.interval) for name, bar in events],
+                         [('bar_closed', 9), ('bar_closed', 10)])
+        self.assertEqual(events[0][1]['close'], 2610.0)
+        self.assertEqual(seen, events)
+        self.assertEqual(self.store.closed_count, 2)
+
+    def test_gap_event(self):
+        self.store.merge(self.bars(0, 10))
+        events = self.store.merge(self.bars(14, 20))
+        self.assertEqual(events[0], ('gap', {'from': self.T0 + 10 * self.interval, 'to': self.T0 + 14 * self.interval,
+                                             'missing': 4}))
+        self.assertEqual([e[0] for e in events[1:]], ['bar_closed'] * 6)  # Bar 9, then 14..18
+        self.assertEqual(self.store.gap_count, 1)
+        self.assertEqual(self.times(), list(range(10)) + list(range(14, 20)))
+
+    def test_pixel_history_cleared_by_calibrated_scrape(self):
+        self.store.merge(self.bars(0, 10, calibrated=False))
+        self.assertFalse(self.store.calibrated)
+        # First price-space scrape replaces the pixel-space history outright
+        self.assertEqual(self.store.merge(self.bars(30, 40, calibrated=True)), [])
+        self.assertTrue(self.store.calibrated)
+        self.assertEqual(self.times(), list(range(30, 40)))
+        # From then on pixel scrapes (failed refit) are skipped, unflagged ones (cache) merged
+        self.assertEqual(self.store.merge(self.bars(31, 45, calibrated=False)), [])
+        self.assertEqual(self.times(), list(range(30, 40)))
+        self.store.merge(self.bars(31, 41))
+        self.assertEqual(self.times(), list(range(30, 41)))
+
+
+@skipUnless(pandas_ta, "pandas-ta is not installed")
+class PandasTaTests(RandomWalkTestCase):
+    """numpy kernels vs the pandas-ta version pinned in pyproject.toml."""
+
+    def test_moving_averages(self):
+        close = pd.Series(self.close)
+        self.assertClose(indicators.sma(self.close, 20), pandas_ta.sma(close, 20, talib=False).values)
+        for length in (9, 12, 26, 50):
+            self.assertClose(indicators.ema(self.close, length), pandas_ta.ema(close, length, talib=False).values)
+        self.assertClose(indicators.rma(self.close, 14), pandas_ta.rma(close, 14).values)
+
+    def test_atr_and_rsi(self):
+        h, l, c = pd.Series(self.high), pd.Series(self.low), pd.Series(self.close)
+        self.assertClose(indicators.true_range(self.high, self.low, self.close),
+                         pandas_ta.true_range(h, l, c, talib=False).values)
+        self.assertClose(indicators.atr(self.high, self.low, self.close, 14), pandas_ta.atr(h, l, c, 14, talib=False).values)
+        self.assertClose(indicators.rsi(self.close, 14), pandas_ta.rsi(c, 14, talib=False).values)
+
+
+class HistoryDriver:
+    """Stands in for the terminal: every rows read returns the next page of the History table."""
+
+    def __init__(self, *pages):
+        self.pages = list(pages)
+        self.reads = 0
+
+    def find_element(self, *args):
+        return object()
+
+    def execute_script(self, script, *args):
+        if script == history_manager.HISTORY_ROWS_JS:
+            page = self.pages[min(self.reads, len(self.pages) - 1)]
+            self.reads += 1
+            return page
+        return None
+
+
+class SyncTradeHistoryTests(SimpleTestCase):
+    """sync_trade_history's checkpoint, with the DB write patched out."""
+
+    ACCOUNT_ID = 1
+
+    def setUp(self):
+        history_manager.reset_history_checkpoint(self.ACCOUNT_ID)
+        self.base = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        self.stored = []
+        self.failing = set()
+        for target, name, value in ((history_manager, 'TradingAccount', mock.DEFAULT),
+                                    (history_manager, '_store_history_row', self.store),
+                                    (history_manager.time, 'sleep', mock.DEFAULT)):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def store(self, cells, account):
+        if cells[1] in self.failing:
+            raise RuntimeError("DB error")
+        self.stored.append(cells[1])
+        return None  # Nothing changed: no history_update broadcast
+
+    def row(self, ticket, minute=0, date=None):
+        """Cell texts of one history row, closed `minute` minutes after noon today."""
+        date = date or (self.base + timedelta(minutes=minute)).strftime("%d/%m/%Y %H:%M:%S")
+        return [date, ticket, 'XAUUSD', '', 'Buy', '0.01', '', '', '-0.10', '', '1.00', '']
+
+    def yesterday(self):
+        return self.row('0', date=(self.base - timedelta(days=1)).strftime("%d/%m/%Y %H:%M:%S"))
+
+    def sync(self, *rows):
+        self.stored = []
+        history_manager.sync_trade_history(HistoryDriver(list(rows) + [self.yesterday()]), self.ACCOUNT_ID, lambda *a: None)
+        return self.stored
+
+    def checkpoint(self):
+        return history_manager.HISTORY_CHECKPOINTS.get(self.ACCOUNT_ID)
+
+    def test_equal_close_times_share_the_checkpoint(self):
+        self.assertEqual(self.sync(self.row('B', 5), self.row('A', 5), self.row('C', 1)), ['B', 'A', 'C'])
+        self.assertEqual(self.checkpoint(), (self.base + timedelta(minutes=5), {'A', 'B'}))
+        # A third trade closed in the same second shows up later: only it is new
+        self.assertEqual(self.sync(self.row('D', 5), self.row('B', 5), self.row('A', 5), self.row('C', 1)), ['D'])
+        self.assertEqual(self.checkpoint(), (self.base + timedelta(minutes=5), {'A', 'B', 'D'}))
+
+    def test_checkpoint_stops_below_oldest_failed_row(self):
+        self.failing = {'Y'}
+        self.assertEqual(self.sync(self.row('X', 9), self.row('Y', 5), self.row('Z', 1)), ['X', 'Z'])
+        self.assertEqual(self.checkpoint(), (self.base + timedelta(minutes=1), {'Z'}))
+        # Next sync retries Y (and re-reads X above it), not Z below the checkpoint
+        self.failing = set()
+        self.assertEqual(self.sync(self.row('X', 9), self.row('Y', 5), self.row('Z', 1)), ['X', 'Y'])
+        self.assertEqual(self.checkpoint(), (self.base + timedelta(minutes=9), {'X'}))
+
+    def test_failed_undated_row_holds_the_checkpoint(self):
+        self.failing = {'U'}
+        undated = self.row('U', date=self.base.strftime("%d/%m/%Y") + " --:--:--")
+        self.assertEqual(self.sync(self.row('X', 9), undated, self.row('Z', 1)), ['X', 'Z'])
+        self.assertIsNone(self.checkpoint())
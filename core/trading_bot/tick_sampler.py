@@ -0,0 +1,185 @@
+"""
+Background bid/ask sampling, independent of the controller loop.
+
+A daemon thread reads the two order-button prices with one tiny execute_script call
+at TRADING_BOT_TICK_HZ and records every quote change in a fixed-size ring buffer.
+ChromeDriver runs a session's commands one at a time, so these reads slot in between
+the controller's own (heavier) calls instead of racing them.
+"""
+import threading
+import time
+
+import numpy as np
+
+from .scraper import _clean_price
+
+DEFAULT_HZ = 5
+TICK_CAPACITY = 20000  # ~1 hour of quote changes in a busy market
+FRESH_SECONDS = 2.0
+
+PRICE_JS = """
+const q = (sel) => { const el = document.querySelector(sel); return el ? el.textContent : null; };
+return [q('.order-control .order-button.buy .price'), q('.order-control .order-button.sell .price')];
+"""
+
+# GLOBAL STATE
+TICK_SAMPLERS = {}  # { account_id: TickSampler }
+
+
+def get_tick_sampler(account_id):
+    return TICK_SAMPLERS.get(account_id)
+
+
+def start_tick_sampler(account_id, driver, hz=DEFAULT_HZ):
+    """Starts (or returns the running) sampler for the account's driver."""
+    sampler = TICK_SAMPLERS.get(account_id)
+    if sampler and sampler.driver is driver and sampler.running:
+        return sampler
+    if sampler:
+        sampler.stop()
+    sampler = TickSampler(driver, hz)
+    sampler.start()
+    TICK_SAMPLERS[account_id] = sampler
+    return sampler
+
+
+def stop_tick_sampler(account_id):
+    sampler = TICK_SAMPLERS.pop(account_id, None)
+    if sampler:
+        sampler.stop()
+
+
+class TickBuffer:
+    """
+    Ring buffer of (timestamp, bid, ask) rows with a single writer.
+
+    The writer fills a row before bumping `count`, so readers never see a half-written
+    tick and no lock is needed; reads copy the rows they return, and drop the oldest
+    ones if the writer wrapped around onto them during the copy.
+    """
+
+    def __init__(self, capacity=TICK_CAPACITY):
+        self.capacity = capacity
+        self._data = np.full((3, capacity), np.nan)
+        self.count = 0  # Ticks ever written
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, ts, bid, ask):
+        pos = self.count % self.capacity
+        self._data[0, pos] = ts
+        self._data[1, pos] = np.nan if bid is None else bid
+        self._data[2, pos] = np.nan if ask is None else ask
+        self.count += 1
+
+    def latest(self):
+        if not self.count:
+            return None
+        ts, bid, ask = self._data[:, (self.count - 1) % self.capacity].tolist()
+        return ts, bid, ask
+
+    def last(self, n):
+        """(timestamps, bids, asks) arrays of the newest n ticks, oldest first."""
+        count = self.count
+        n = min(n, count, self.capacity)
+        idx = np.arange(count - n, count) % self.capacity
+        rows = self._data[:, idx]  # Fancy indexing: a copy
+        # Slots the writer touched meanwhile: count .. self.count, the last one possibly half-written
+        overwritten = self.count - count + 1 - (self.capacity - n)
+        if overwritten > 0:
+            rows = rows[:, min(overwritten, n):]
+        return rows[0], rows[1], rows[2]
+
+    def since(self, ts):
+        times, bids, asks = self.last(self.capacity)
+        start = int(np.searchsorted(times, ts, side='left'))
+        return times[start:], bids[start:], asks[start:]
+
+
+class TickSampler:
+    """Polls bid/ask on a daemon thread; ticks (quote changes) go into a TickBuffer."""
+
+    def __init__(self, driver, hz=DEFAULT_HZ, capacity=TICK_CAPACITY):
+        self.driver = driver
+        self.interval = 1.0 / hz
+        self.ticks = TickBuffer(capacity)
+        self.bid = None
+        self.ask = None
+        self.last_sample_at = None
+        self.samples = 0
+        self.errors = 0
+        self.running = False
+        self.thread = None
+
+    def sample(self):
+        """One read; returns True when the quote changed (a new tick was recorded)."""
+        ask_text, bid_text = self.driver.execute_script(PRICE_JS)
+        now = time.time()
+        bid, ask = _clean_price(bid_text), _clean_price(ask_text)
+        self.samples += 1
+        if bid is None and ask is None:
+            return False
+        self.last_sample_at = now
+        if bid == self.bid and ask == self.ask:
+            return False
+        self.bid, self.ask = bid, ask
+        self.ticks.append(now, bid, ask)
+        return True
+
+    def _loop(self):
+        while self.running:
+            start = time.perf_counter()
+            try:
+                self.sample()
+            except Exception:
+                # Page reloading, tab switched away, driver busy closing...
+                self.errors += 1
+            time.sleep(max(0.0, self.interval - (time.perf_counter() - start)))
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def stop(self):
+        self.running = False
+
+    # --- READS ---
+    def is_fresh(self, now=None):
+        if self.last_sample_at is None:
+            return False
+        return (now or time.time()) - self.last_sample_at <= FRESH_SECONDS
+
+    def price(self, default="0.00"):
+        """Buy-side price like TerminalSnapshot.price; `default` when the sampler has gone stale."""
+        if not self.is_fresh():
+            return default
+        if self.ask is not None: return self.ask
+        if self.bid is not None: return self.bid
+        return default
+
+    def spread(self):
+        if self.bid is None or self.ask is None:
+            return None
+        return round(self.ask - self.bid, 5)
+
+    def stats(self, seconds=60, now=None):
+        """Latest quote plus tick-count and spread aggregates over the last `seconds`."""
+        now = now or time.time()
+        times, bids, asks = self.ticks.since(now - seconds)
+        spreads = asks - bids
+        spreads = spreads[~np.isnan(spreads)]
+        return {
+            'bid': self.bid,
+            'ask': self.ask,
+            'spread': self.spread(),
+            'ticks': int(len(times)),
+            'ticks_per_sec': round(len(times) / seconds, 3),
+            'avg_spread': round(float(spreads.mean()), 5) if len(spreads) else None,
+            'max_spread': round(float(spreads.max()), 5) if len(spreads) else None,
+            'samples': self.samples,
+            'errors': self.errors,
+            'age': round(now - self.last_sample_at, 3) if self.last_sample_at else None,
+        }
@@ -1,5 +1,5 @@
 import threading
-from rest_framework import viewsets, status, generics
+from rest_framework import viewsets, status, generics, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -12,7 +12,10 @@ from .serializers import (
     TradePositionSerializer
 )
 # Import the checker function
-from .services import run_bot_engine, is_bot_running 
+from .services import run_bot_engine, is_bot_running, stop_bot_engine, get_browser_pool
+from .profiling import COMPONENT_TIMERS, TIMINGS_IN_UPDATES, set_timings_in_updates
+from .history_manager import request_full_scan
+from .browser_pool import BROWSER_POOLS
 
 # --- 1. PAGINATION CONFIGURATION ---
 class StandardResultsSetPagination(PageNumberPagination):
@@ -82,9 +85,52 @@ class BotControlViewSet(viewsets.ModelViewSet):
         # Setting this to False triggers the loop inside run_bot_engine to break
         account.is_active = False
         account.save()
+        stop_bot_engine(account.id)
         
         return Response({'status': 'Stop signal sent', 'is_active': False})
 
+    @action(detail=False, methods=['get', 'post'])
+    def browser_pool(self, request):
+        """Idle pre-launched browsers and their memory; POST starts filling the pool before any bot starts."""
+        if request.method == 'POST':
+            pool = get_browser_pool()
+        else:
+            pool = BROWSER_POOLS.get("default")
+        if pool is None:
+            return Response({'enabled': False})
+        return Response({'enabled': True, **pool.stats()})
+
+    @action(detail=True, methods=['post'])
+    def resync_history(self, request, pk=None):
+        """Next history sync re-reads all of today's closed trades instead of only new ones."""
+        account = self.get_object()
+        request_full_scan(account.id)
+        return Response({'status': 'Full history re-scan queued', 'account_id': account.id})
+
+    @action(detail=True, methods=['get', 'post'])
+    def timings(self, request, pk=None):
+        """
+        Rolling per-component latency of get_market_decision for this account.
+        POST {"include_in_updates": true|false, "reset": true} toggles the timings
+        in the live analysis_update payload and/or clears the window.
+        """
+        account = self.get_object()
+        timer = COMPONENT_TIMERS.get(account.id)
+
+        if request.method == 'POST':
+            # Strict booleans: bool("false") is True; anything unrecognised is a 400
+            flag = serializers.BooleanField()
+            if 'include_in_updates' in request.data:
+                set_timings_in_updates(account.id, flag.to_internal_value(request.data['include_in_updates']))
+            if flag.to_internal_value(request.data.get('reset', False)) and timer:
+                timer.reset()
+
+        return Response({
+            'account_id': account.id,
+            'include_in_updates': account.id in TIMINGS_IN_UPDATES,
+            'components': timer.snapshot(histogram=True) if timer else {},
+        })
+
 
 # --- 3. HISTORY VIEWSET (PAGINATED) ---
 class HistoryViewSet(viewsets.ReadOnlyModelViewSet):
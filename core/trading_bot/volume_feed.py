@@ -0,0 +1,89 @@
+"""
+Bar volume for a chart that doesn't show any.
+
+The terminal's chart carries no volume, so the brain's VWAP, volume profile, delta and
+spike checks had nothing to work with. Two sources fill the candle store's volume:
+  - "ticks": tick volume (quote changes per bar) from the TickSampler, with up/down
+    ticks (tick rule) as the bar's delta;
+  - "dom": the heights of the chart's volume histogram bars, when that pane is shown
+    (relative units, no delta).
+"""
+import numpy as np
+
+from .resampler import TIMEFRAMES
+
+VOLUME_SELECTOR = "g.volume-plot, .highcharts-series-group .highcharts-column-series"
+
+# Heights of the volume pane's bars, oldest -> newest
+VOLUME_PARSER_JS = """
+const pane = document.querySelector('%(selector)s');
+if (!pane) return null;
+return Array.from(pane.querySelectorAll('rect'), (r) => parseFloat(r.getAttribute('height')) || 0);
+""" % {'selector': VOLUME_SELECTOR}
+
+
+# --- 1. TICK VOLUME ---
+def tick_volume(times, bids, asks, bar_times, interval_ms):
+    """
+    Per-bar (volume, delta) arrays for bars opening at `bar_times` (ms) from ticks at
+    `times` (seconds). A tick above the previous mid is an up tick, below a down tick;
+    unchanged mids keep the last direction. Bars that opened before the first tick are NaN.
+    """
+    bar_times = np.asarray(bar_times, dtype=float)
+    n = len(bar_times)
+    volume = np.full(n, np.nan)
+    delta = np.full(n, np.nan)
+    if not n or not len(times):
+        return volume, delta
+
+    mids = np.where(np.isnan(bids), asks, np.where(np.isnan(asks), bids, (bids + asks) / 2))
+    moves = np.sign(np.diff(mids, prepend=mids[0]))
+    moves[np.isnan(moves)] = 0
+    last_move = np.where(moves != 0, np.arange(len(moves)), 0)
+    np.maximum.accumulate(last_move, out=last_move)
+    side = moves[last_move]
+
+    ms = np.asarray(times, dtype=float) * 1000.0
+    idx = np.searchsorted(bar_times, ms, side='right') - 1
+    inside = (idx >= 0) & (ms < bar_times[np.maximum(idx, 0)] + interval_ms)
+    idx, side = idx[inside], side[inside]
+
+    counts = np.bincount(idx, minlength=n).astype(float)
+    net = np.bincount(idx, weights=side, minlength=n)
+    covered = bar_times >= ms[0]
+    volume[covered] = counts[covered]
+    delta[covered] = net[covered]
+    return volume, delta
+
+
+def attach_tick_volume(store, sampler):
+    """Writes tick volume/delta into the store's bars the sampler fully covers; returns how many."""
+    buf = store.buffer
+    times, bids, asks = sampler.ticks.last(sampler.ticks.capacity)
+    if not len(buf) or not len(times):
+        return 0
+    volume, delta = tick_volume(times, bids, asks, buf.column('time'), TIMEFRAMES[store.timeframe] * 1000)
+    covered = ~np.isnan(volume)
+    if not covered.any():
+        return 0
+    first = int(np.argmax(covered))  # Coverage is always the newest bars
+    buf.write_column('volume', volume[first:])
+    buf.write_column('delta', delta[first:])
+    return len(volume) - first
+
+
+# --- 2. DOM VOLUME ---
+def read_dom_volume(driver):
+    """Volume pane bar heights (oldest -> newest), or [] when the chart has no volume pane."""
+    try:
+        return driver.execute_script(VOLUME_PARSER_JS) or []
+    except Exception:
+        return []
+
+
+def attach_dom_volume(store, heights):
+    """Writes histogram heights onto the newest bars (both lists end at the forming bar)."""
+    if not heights or not len(store.buffer):
+        return 0
+    store.buffer.write_column('volume', heights)
+    return min(len(heights), len(store.buffer))